@@ -2,3 +2,4 @@
 # flake8: noqa: F408
 
 from bus.core import Bus, Halt, Road, RoadSegment, Route
+from bus.db import BusDB
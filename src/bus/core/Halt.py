@@ -1,19 +1,47 @@
-from dataclasses import dataclass
+import sys
+from dataclasses import dataclass, field
 
 from utils_future import IDMixin, LatLng, String
 
 
-@dataclass
+@dataclass(slots=True)
 class Halt:
-    road_id: int  # E.g. 'galle-road'
+    road_id: str  # E.g. 'galle-road'
     road_index: int  # E.g. 2
     name: str  # E.g. "Colombo Museum"
     latlng: LatLng  # E.g. LatLng(6.9271, 79.8612)
+    _id: str | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self):
+        # Many halts share a road: keep one copy of each road_id.
+        self.road_id = sys.intern(self.road_id)
 
     @property
     def id(self) -> str:
-        # E.g. "galle-road-002-colombo-museum"
-        return IDMixin.from_items(
-            self.road_id,
-            String.to_kebab_case(self.name),
+        # E.g. "galle-road-colombo-museum". Cached on first use: road_id
+        # and name make up the id, so a renamed halt is a new Halt.
+        if self._id is None:
+            self._id = IDMixin.from_items(
+                self.road_id,
+                String.to_kebab_case(self.name),
+            )
+        return self._id
+
+    def to_dict(self) -> dict:
+        return {
+            "road_id": self.road_id,
+            "road_index": self.road_index,
+            "name": self.name,
+            "latlng": self.latlng.to_dict(),
+        }
+
+    @staticmethod
+    def from_dict(d: dict) -> "Halt":
+        return Halt(
+            road_id=d["road_id"],
+            road_index=d["road_index"],
+            name=d["name"],
+            latlng=LatLng.from_dict(d["latlng"]),
         )
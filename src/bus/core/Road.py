@@ -1,14 +1,35 @@
-from dataclasses import dataclass
+import sys
+from dataclasses import dataclass, field
 
 from utils_future import IDMixin
 from utils_future.String import String
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Road(IDMixin):
     name: str  # E.g. "Galle Road"
     direction: str  # E.g. "S", "N", "E", "W"
+    _id: str | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
 
     @property
     def id(self) -> str:
-        return f"{String.to_kebab_case(self.name)}-{self.direction.lower()}"
+        if self._id is None:
+            # Interned, so it is shared with the road_id of every halt.
+            object.__setattr__(
+                self,
+                "_id",
+                sys.intern(
+                    f"{String.to_kebab_case(self.name)}-"
+                    + self.direction.lower()
+                ),
+            )
+        return self._id
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "direction": self.direction}
+
+    @staticmethod
+    def from_dict(d: dict) -> "Road":
+        return Road(name=d["name"], direction=d["direction"])
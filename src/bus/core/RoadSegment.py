@@ -1,18 +1,46 @@
-from dataclasses import dataclass
+import sys
+from dataclasses import dataclass, field
 
 from utils_future import IDMixin
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class RoadSegment:
     road_id: str
     start_road_index: int
     end_road_index: int
+    _id: str | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self):
+        object.__setattr__(self, "road_id", sys.intern(self.road_id))
 
     @property
     def id(self) -> str:
-        return IDMixin.from_items(
-            self.road_id,
-            f"{self.start_road_index:03d}",
-            f"{self.end_road_index:03d}",
+        if self._id is None:
+            object.__setattr__(
+                self,
+                "_id",
+                IDMixin.from_items(
+                    self.road_id,
+                    f"{self.start_road_index:03d}",
+                    f"{self.end_road_index:03d}",
+                ),
+            )
+        return self._id
+
+    def to_dict(self) -> dict:
+        return {
+            "road_id": self.road_id,
+            "start_road_index": self.start_road_index,
+            "end_road_index": self.end_road_index,
+        }
+
+    @staticmethod
+    def from_dict(d: dict) -> "RoadSegment":
+        return RoadSegment(
+            road_id=d["road_id"],
+            start_road_index=d["start_road_index"],
+            end_road_index=d["end_road_index"],
         )
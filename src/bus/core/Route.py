@@ -1,10 +1,43 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
-@dataclass
+@dataclass(slots=True)
 class Route:
     code: str  # E.g. 138
     direction: str  # E.g. Southbound
     road_segment_id_list: list[
         str
     ]  # E.g. ["galle-road-000-002", "galle-road-002-004", ...]
+    _id: str | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    DIRECTION_NAMES = {
+        "N": "northbound",
+        "S": "southbound",
+        "E": "eastbound",
+        "W": "westbound",
+    }
+
+    @property
+    def id(self) -> str:
+        # E.g. "138-southbound". Cached on first use: code and direction
+        # make up the id, so they are not reassigned.
+        if self._id is None:
+            self._id = f"{self.code}-{Route.DIRECTION_NAMES[self.direction]}"
+        return self._id
+
+    def to_dict(self) -> dict:
+        return {
+            "code": self.code,
+            "direction": self.direction,
+            "road_segment_id_list": self.road_segment_id_list,
+        }
+
+    @staticmethod
+    def from_dict(d: dict) -> "Route":
+        return Route(
+            code=d["code"],
+            direction=d["direction"],
+            road_segment_id_list=d["road_segment_id_list"],
+        )
@@ -0,0 +1,264 @@
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+from bus.core import Halt, Road, RoadSegment, Route
+from bus.db.JSONStore import JSONStore
+from bus.db.ResolvedRoute import ResolvedRoute
+from bus.db.RoadHaltIndex import RoadHaltIndex
+from bus.db.RouteProfile import RouteProfile
+from bus.db.RouteResolver import RouteResolver
+from bus.db.SegmentIndex import SegmentIndex
+from bus.db.SQLiteStore import SQLiteStore
+from bus.db.Transaction import Transaction
+from utils_future import SpatialIndex
+
+
+class BusDB:
+    """In-memory repository over a store: the per-entity JSON tree under
+    ``db/`` (JSONStore), or a single SQLite file (SQLiteStore).
+
+    The store is read once, when the BusDB is constructed. Reads are then
+    served from memory, and every change is written through to the store.
+    Changes made inside ``with db.transaction():`` are committed together.
+    """
+
+    HALTS = "halts"
+    ROADS = "roads"
+    ROAD_SEGMENTS = "road_segments"
+    ROUTES = "routes"
+
+    def __init__(
+        self,
+        store: JSONStore | SQLiteStore | str,
+        on_save: Callable[[str], None] | None = None,
+    ):
+        if isinstance(store, str):
+            store = BusDB.open_store(store)
+        self.store = store
+        self.on_save = on_save
+        self.tx: Transaction | None = None
+        self.reload()
+
+    @staticmethod
+    def open_store(path: str) -> JSONStore | SQLiteStore:
+        """SQLiteStore for .sqlite/.sqlite3/.db files, else JSONStore."""
+        if SQLiteStore.is_sqlite_path(path):
+            return SQLiteStore(path)
+        return JSONStore(path)
+
+    def reload(self) -> None:
+        """(Re)read every entity from the store and rebuild the indexes."""
+        data = self.store.load()
+
+        self.halts: dict[str, Halt] = {
+            k: Halt.from_dict(d) for k, d in sorted(data[self.HALTS].items())
+        }
+        self.roads: dict[str, Road] = {
+            k: Road.from_dict(d) for k, d in sorted(data[self.ROADS].items())
+        }
+        self.road_segments: dict[str, RoadSegment] = {
+            k: RoadSegment.from_dict(d)
+            for k, d in sorted(data[self.ROAD_SEGMENTS].items())
+        }
+        self.routes: dict[str, Route] = {
+            k: Route.from_dict(d) for k, d in sorted(data[self.ROUTES].items())
+        }
+
+        self.halt_index = SpatialIndex()
+        self.road_halt_index = RoadHaltIndex()
+        for halt_id, halt in self.halts.items():
+            self.halt_index.add(halt_id, halt.latlng)
+            self.road_halt_index.add(halt_id, halt.road_id, halt.road_index)
+        self.segment_index = SegmentIndex()
+        for seg_id, seg in self.road_segments.items():
+            self.segment_index.add_segment(seg_id, seg.road_id)
+        for route_id, route in self.routes.items():
+            self.segment_index.add_route(route_id, route.road_segment_id_list)
+        self.route_resolver = RouteResolver(self)
+
+    # -----------------------------------------------------------------------
+    # Store
+    # -----------------------------------------------------------------------
+
+    @contextmanager
+    def transaction(self) -> Iterator[Transaction]:
+        """Stage every write inside the block and commit them together.
+
+        Nested blocks join the outermost transaction. If the block raises,
+        nothing is written and the in-memory state is reloaded from disk.
+        """
+        if self.tx is not None:
+            yield self.tx
+            return
+
+        self.tx = Transaction()
+        try:
+            yield self.tx
+            written_paths = self.store.commit(self.tx)
+        except BaseException:
+            self.reload()
+            raise
+        finally:
+            self.tx = None
+
+        if self.on_save is not None:
+            for path in written_paths:
+                self.on_save(path)
+
+    def _write(self, kind: str, entity_id: str, data: dict) -> None:
+        with self.transaction() as tx:
+            tx.write(kind, entity_id, data)
+
+    def _remove(self, kind: str, entity_id: str) -> None:
+        with self.transaction() as tx:
+            tx.delete(kind, entity_id)
+
+    # -----------------------------------------------------------------------
+    # Reads
+    # -----------------------------------------------------------------------
+
+    def halts_on_road(
+        self,
+        road_id: str,
+        start_road_index: int = 0,
+        end_road_index: int | None = None,
+    ) -> list[Halt]:
+        """Halts on the road in [start, end], sorted by road_index."""
+        if end_road_index is None:
+            end_road_index = self.road_halt_index.max_index(road_id) or 0
+        return [
+            self.halts[hid]
+            for hid in self.road_halt_index.in_range(
+                road_id, start_road_index, end_road_index
+            )
+        ]
+
+    def previous_halt(self, road_id: str, road_index: int) -> Halt | None:
+        """The halt immediately before road_index on the road, if any."""
+        halt_id = self.road_halt_index.previous(road_id, road_index)
+        return self.halts[halt_id] if halt_id is not None else None
+
+    def route_ids_for_road(self, road_id: str) -> set[str]:
+        """Routes with at least one segment on the road."""
+        return self.segment_index.route_ids_for_road(road_id)
+
+    def route_ids_for_halt(self, halt_id: str) -> set[str]:
+        """Routes with a segment whose range covers the halt."""
+        halt = self.halts[halt_id]
+        return {
+            route_id
+            for seg_id in self.segment_index.segment_ids_on_road(halt.road_id)
+            if self.road_segments[seg_id].start_road_index
+            <= halt.road_index
+            <= self.road_segments[seg_id].end_road_index
+            for route_id in self.segment_index.route_ids_for_segment(seg_id)
+        }
+
+    def resolve_route(self, route_id: str) -> ResolvedRoute:
+        """The route's ordered halts and coordinates (cached)."""
+        return self.route_resolver.resolve(route_id)
+
+    def route_profile(self, route_id: str) -> RouteProfile:
+        """The route's cumulative distance profile (cached until its halts
+        change).
+        """
+        return self.route_resolver.profile(route_id)
+
+    # -----------------------------------------------------------------------
+    # Writes
+    # -----------------------------------------------------------------------
+
+    def save_halt(self, halt: Halt) -> None:
+        if halt.id in self.road_halt_index.halt_to_entry:
+            self.route_resolver.invalidate_halt(
+                *self.road_halt_index.halt_to_entry[halt.id]
+            )
+        self.route_resolver.invalidate_halt(halt.road_id, halt.road_index)
+        self.halts[halt.id] = halt
+        self.halt_index.add(halt.id, halt.latlng)
+        self.road_halt_index.add(halt.id, halt.road_id, halt.road_index)
+        self._write(self.HALTS, halt.id, halt.to_dict())
+
+    def save_road(self, road: Road) -> None:
+        self.roads[road.id] = road
+        self._write(self.ROADS, road.id, road.to_dict())
+
+    def save_road_segment(self, road_segment: RoadSegment) -> None:
+        self.route_resolver.invalidate_segment(road_segment.id)
+        self.road_segments[road_segment.id] = road_segment
+        self.segment_index.add_segment(road_segment.id, road_segment.road_id)
+        self._write(
+            self.ROAD_SEGMENTS, road_segment.id, road_segment.to_dict()
+        )
+
+    def save_route(self, route: Route) -> None:
+        self.route_resolver.invalidate_route(route.id)
+        self.routes[route.id] = route
+        self.segment_index.add_route(route.id, route.road_segment_id_list)
+        self._write(self.ROUTES, route.id, route.to_dict())
+
+    def delete_road_segment(self, road_segment_id: str) -> None:
+        self.route_resolver.invalidate_segment(road_segment_id)
+        del self.road_segments[road_segment_id]
+        self.segment_index.remove_segment(road_segment_id)
+        self._remove(self.ROAD_SEGMENTS, road_segment_id)
+
+    def shift_road_indices(self, road_id: str, from_road_index: int) -> None:
+        """Make room at from_road_index on a road.
+
+        Halts and segment bounds at or after from_road_index move up by 1.
+        Segments whose id changes are renamed, and every route that uses
+        them is updated. All of it is written as one transaction.
+        """
+        with self.transaction():
+            self._shift_road_indices(road_id, from_road_index)
+
+    def insert_halt(self, halt: Halt) -> None:
+        """Save a new halt at its road_index, first shifting any halts and
+        segment bounds at or after it up by 1, as one transaction.
+        """
+        with self.transaction():
+            max_index = self.road_halt_index.max_index(halt.road_id)
+            if max_index is not None and halt.road_index <= max_index:
+                self._shift_road_indices(halt.road_id, halt.road_index)
+            self.save_halt(halt)
+
+    def _shift_road_indices(self, road_id: str, from_road_index: int) -> None:
+        for halt in self.halts_on_road(
+            road_id, start_road_index=from_road_index
+        ):
+            halt.road_index += 1
+            self.save_halt(halt)
+
+        renames: dict[str, RoadSegment] = {}
+        for seg_id in sorted(self.segment_index.segment_ids_on_road(road_id)):
+            seg = self.road_segments[seg_id]
+            start, end = seg.start_road_index, seg.end_road_index
+            if start < from_road_index and end < from_road_index:
+                continue
+            renames[seg_id] = RoadSegment(
+                road_id=road_id,
+                start_road_index=start + (start >= from_road_index),
+                end_road_index=end + (end >= from_road_index),
+            )
+
+        # Remove every old id before saving any new one, so that a shifted
+        # segment never clobbers one that has not been shifted yet (on disk,
+        # the transaction then writes each file once).
+        for seg_id in renames:
+            self.delete_road_segment(seg_id)
+        for new_seg in renames.values():
+            self.save_road_segment(new_seg)
+
+        route_ids = {
+            route_id
+            for seg_id in renames
+            for route_id in self.segment_index.route_ids_for_segment(seg_id)
+        }
+        for route_id in sorted(route_ids):
+            route = self.routes[route_id]
+            route.road_segment_id_list = [
+                renames[s].id if s in renames else s
+                for s in route.road_segment_id_list
+            ]
+            self.save_route(route)
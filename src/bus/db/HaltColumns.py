@@ -0,0 +1,318 @@
+from __future__ import annotations
+
+import json
+import os
+from typing import TYPE_CHECKING, Iterable
+
+from bus.core import Halt
+from bus.db.JSONStore import JSONStore
+from bus.db.Snapshot import Snapshot
+from bus.db.Transaction import Transaction
+from utils_future import IDMixin, LatLng, String
+
+if TYPE_CHECKING:
+    import numpy as np
+
+    from utils_future.BatchSpatialIndex import BatchSpatialIndex
+
+
+class HaltColumns:
+    """The halt table as columns: lat/lng float64, road_index int32, and
+    road_code int32 indexing into the road_ids string table.
+
+    save() writes one .npy file per column plus strings.json, under a
+    directory. load() memory-maps the columns read-only, so worker
+    processes that load the same directory share the pages, with no copy.
+    Columns built from a db/ tree record its fingerprint (see
+    Snapshot.fingerprint), and load_if_fresh() refuses them once the
+    tree has changed.
+    """
+
+    DIR_NAME = "halt_columns"
+    STRINGS_FILE_NAME = "strings.json"
+    COLUMNS = {
+        "lat": "float64",
+        "lng": "float64",
+        "road_code": "int32",
+        "road_index": "int32",
+    }
+
+    def __init__(
+        self,
+        lat: np.ndarray,
+        lng: np.ndarray,
+        road_code: np.ndarray,
+        road_index: np.ndarray,
+        road_ids: list[str],
+        names: list[str],
+        fingerprint: str = "",
+    ):
+        self.lat = lat
+        self.lng = lng
+        self.road_code = road_code
+        self.road_index = road_index
+        self.road_ids = road_ids  # road_code -> road_id
+        self.names = names  # One per halt
+        self.fingerprint = fingerprint  # Of the db/ tree, if built from one
+        self.road_id_to_code = {r: i for i, r in enumerate(road_ids)}
+        self._batch_index: BatchSpatialIndex | None = None
+        self._halt_ids: np.ndarray | None = None
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    # -----------------------------------------------------------------------
+    # Conversions
+    # -----------------------------------------------------------------------
+
+    @staticmethod
+    def from_halts(halts: Iterable[Halt]) -> "HaltColumns":
+        import numpy as np
+
+        halts = list(halts)
+        road_ids = sorted({halt.road_id for halt in halts})
+        road_id_to_code = {r: i for i, r in enumerate(road_ids)}
+        return HaltColumns(
+            lat=np.array([h.latlng.lat for h in halts], dtype=np.float64),
+            lng=np.array([h.latlng.lng for h in halts], dtype=np.float64),
+            road_code=np.array(
+                [road_id_to_code[h.road_id] for h in halts], dtype=np.int32
+            ),
+            road_index=np.array([h.road_index for h in halts], dtype=np.int32),
+            road_ids=road_ids,
+            names=[h.name for h in halts],
+        )
+
+    def halt(self, i: int) -> Halt:
+        return Halt(
+            road_id=self.road_ids[self.road_code[i]],
+            road_index=int(self.road_index[i]),
+            name=self.names[i],
+            latlng=LatLng(lat=float(self.lat[i]), lng=float(self.lng[i])),
+        )
+
+    def to_halts(self) -> list[Halt]:
+        return [self.halt(i) for i in range(len(self))]
+
+    def halt_id(self, i: int) -> str:
+        return IDMixin.from_items(
+            self.road_ids[self.road_code[i]],
+            String.to_kebab_case(self.names[i]),
+        )
+
+    @property
+    def halt_ids(self) -> np.ndarray:
+        """Every halt id, as an object array indexed by row."""
+        import numpy as np
+
+        if self._halt_ids is None:
+            self._halt_ids = np.array(
+                [self.halt_id(i) for i in range(len(self))], dtype=object
+            )
+        return self._halt_ids
+
+    @staticmethod
+    def from_json_tree(dir_path: str) -> "HaltColumns":
+        """From the halts of a db/ tree (or its snapshot, if fresh)."""
+        # Before reading, so a change made meanwhile makes them stale.
+        fingerprint = Snapshot.fingerprint(dir_path)
+        halt_dicts = JSONStore(dir_path).load()["halts"]
+        columns = HaltColumns.from_halts(
+            Halt.from_dict(halt_dicts[halt_id])
+            for halt_id in sorted(halt_dicts)
+        )
+        columns.fingerprint = fingerprint
+        return columns
+
+    def to_json_tree(self, dir_path: str) -> list[str]:
+        """Write every halt to a db/ tree in one commit.
+
+        Returns the paths written.
+        """
+        tx = Transaction()
+        for i in range(len(self)):
+            tx.write("halts", self.halt_id(i), self.halt(i).to_dict())
+        return JSONStore(dir_path).commit(tx)
+
+    # -----------------------------------------------------------------------
+    # Files
+    # -----------------------------------------------------------------------
+
+    @staticmethod
+    def path(db_dir: str) -> str:
+        return os.path.join(db_dir, HaltColumns.DIR_NAME)
+
+    def save(self, dir_path: str) -> None:
+        import numpy as np
+
+        os.makedirs(dir_path, exist_ok=True)
+        for column, dtype in HaltColumns.COLUMNS.items():
+            tmp_path = os.path.join(dir_path, f"{column}.tmp.npy")
+            np.save(tmp_path, np.asarray(getattr(self, column), dtype=dtype))
+            os.replace(tmp_path, os.path.join(dir_path, f"{column}.npy"))
+        tmp_path = os.path.join(dir_path, HaltColumns.STRINGS_FILE_NAME)
+        with open(tmp_path + ".tmp", "w") as f:
+            json.dump(
+                {
+                    "road_ids": self.road_ids,
+                    "names": self.names,
+                    "fingerprint": self.fingerprint,
+                },
+                f,
+            )
+        os.replace(tmp_path + ".tmp", tmp_path)
+
+    @staticmethod
+    def load(dir_path: str, mmap: bool = True) -> "HaltColumns":
+        import numpy as np
+
+        columns = {
+            column: np.load(
+                os.path.join(dir_path, f"{column}.npy"),
+                mmap_mode="r" if mmap else None,
+            )
+            for column in HaltColumns.COLUMNS
+        }
+        with open(os.path.join(dir_path, HaltColumns.STRINGS_FILE_NAME)) as f:
+            strings = json.load(f)
+        return HaltColumns(
+            **columns,
+            road_ids=strings["road_ids"],
+            names=strings["names"],
+            fingerprint=strings.get("fingerprint", ""),
+        )
+
+    @staticmethod
+    def load_if_fresh(
+        db_dir: str, dir_path: str | None = None, mmap: bool = True
+    ) -> "HaltColumns | None":
+        """The columns under dir_path (default: path(db_dir)), or None if
+        there are none or they were not built from db_dir as it is now.
+        """
+        dir_path = dir_path or HaltColumns.path(db_dir)
+        if not os.path.exists(
+            os.path.join(dir_path, HaltColumns.STRINGS_FILE_NAME)
+        ):
+            return None
+        columns = HaltColumns.load(dir_path, mmap=mmap)
+        if columns.fingerprint != Snapshot.fingerprint(db_dir):
+            return None
+        return columns
+
+    # -----------------------------------------------------------------------
+    # Queries
+    # -----------------------------------------------------------------------
+
+    def on_road(self, road_id: str) -> np.ndarray:
+        """Row indices of the halts on a road, sorted by road_index."""
+        import numpy as np
+
+        code = self.road_id_to_code.get(road_id)
+        if code is None:
+            return np.empty(0, dtype=np.intp)
+        rows = np.flatnonzero(self.road_code == code)
+        return rows[np.argsort(self.road_index[rows], kind="stable")]
+
+    def distances_from(self, latlng: LatLng) -> np.ndarray:
+        """Distance in metres from latlng to every halt."""
+        from utils_future.Haversine import Haversine
+
+        return Haversine.one_to_many(
+            latlng.lat, latlng.lng, self.lat, self.lng
+        )
+
+    def query_radius(
+        self, latlng: LatLng, radius_m: float
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """(rows, distances) of halts within radius_m, nearest first."""
+        import numpy as np
+
+        from utils_future.Haversine import Haversine
+
+        # Latitude band first, so only nearby rows are measured.
+        radius_deg = np.degrees(radius_m / Haversine.R)
+        rows = np.flatnonzero(np.abs(self.lat - latlng.lat) <= radius_deg)
+        dists = Haversine.one_to_many(
+            latlng.lat, latlng.lng, self.lat[rows], self.lng[rows]
+        )
+        within = dists <= radius_m
+        rows, dists = rows[within], dists[within]
+        order = np.lexsort((rows, dists))
+        return rows[order], dists[order]
+
+    def nearest(
+        self, latlng: LatLng, k: int = 1
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """(rows, distances) of the k halts nearest latlng, nearest first."""
+        import numpy as np
+
+        dists = self.distances_from(latlng)
+        k = min(k, len(dists))
+        if k == 0:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float64)
+        kth_dist = dists[np.argpartition(dists, k - 1)[k - 1]]
+        # Every row tied with the k-th, so ties break by row, not by chance.
+        rows = np.flatnonzero(dists <= kth_dist)
+        rows = rows[np.lexsort((rows, dists[rows]))][:k]
+        return rows, dists[rows]
+
+    def in_bbox(
+        self, min_lat: float, min_lng: float, max_lat: float, max_lng: float
+    ) -> np.ndarray:
+        """Row indices of the halts inside the bounding box."""
+        import numpy as np
+
+        return np.flatnonzero(
+            (self.lat >= min_lat)
+            & (self.lat <= max_lat)
+            & (self.lng >= min_lng)
+            & (self.lng <= max_lng)
+        )
+
+    def pairs_within(
+        self, radius_m: float
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(rows_i, rows_j, distances) of every halt pair within radius_m."""
+        from utils_future.Haversine import Haversine
+
+        return Haversine.pairs_within(self.lat, self.lng, radius_m)
+
+    # -----------------------------------------------------------------------
+    # Batch queries
+    # -----------------------------------------------------------------------
+
+    @property
+    def batch_index(self) -> BatchSpatialIndex:
+        """Grid over every halt, built on first use."""
+        from utils_future.BatchSpatialIndex import BatchSpatialIndex
+
+        if self._batch_index is None:
+            self._batch_index = BatchSpatialIndex(self.lat, self.lng)
+        return self._batch_index
+
+    def nearest_many(
+        self, lats: np.ndarray, lngs: np.ndarray, k: int = 1
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """(halt_ids, distances), each (n_points, k), of the k halts
+        nearest each point, nearest first. Missing halts (fewer than k)
+        are None at distance inf.
+        """
+        import numpy as np
+
+        rows, dists = self.batch_index.nearest(lats, lngs, k)
+        halt_ids = np.full(rows.shape, None, dtype=object)
+        found = rows >= 0
+        halt_ids[found] = self.halt_ids[rows[found]]
+        return halt_ids, dists
+
+    def query_radius_many(
+        self, lats: np.ndarray, lngs: np.ndarray, radius_m: float
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(offsets, halt_ids, distances) of the halts within radius_m of
+        each point: those of point q are halt_ids[offsets[q]:offsets[q + 1]],
+        nearest first.
+        """
+        offsets, rows, dists = self.batch_index.query_radius(
+            lats, lngs, radius_m
+        )
+        return offsets, self.halt_ids[rows], dists
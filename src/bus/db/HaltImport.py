@@ -0,0 +1,318 @@
+from __future__ import annotations
+
+import csv
+import json
+import math
+import os
+from collections import defaultdict
+from typing import TYPE_CHECKING
+
+from bus.core import Halt, Road
+from bus.db.ImportRow import ImportRow
+from bus.db.Validator import Validator
+from utils_future import LatLng
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+class HaltImport:
+    """Roads and their ordered halts, read from a CSV or GeoJSON file and
+    added to a DB all at once.
+
+    Each row is a halt: road_name, direction, halt_name, lat and lng (in
+    GeoJSON, a Point feature with the rest as properties). Halts are
+    appended to their road in file order, after any halts it already has,
+    and roads not in the DB are created.
+
+    validate() checks every row against the rules the console enforces
+    one halt at a time, against both the DB and the rest of the batch,
+    with the spacing rules in one vectorised pass. commit() writes the
+    whole batch as one transaction, and only if every row is valid.
+    """
+
+    COLUMNS = ["road_name", "direction", "halt_name", "lat", "lng"]
+    DIRECTIONS = ["N", "S", "E", "W"]
+
+    def __init__(self, db):
+        self.db = db
+
+    # -----------------------------------------------------------------------
+    # Reading
+    # -----------------------------------------------------------------------
+
+    @staticmethod
+    def _float(value) -> float | None:
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return None
+        return value if math.isfinite(value) else None
+
+    @staticmethod
+    def _row(row: int, d: dict) -> ImportRow:
+        return ImportRow(
+            row=row,
+            road_name=str(d.get("road_name") or "").strip(),
+            direction=str(d.get("direction") or "").strip().upper(),
+            halt_name=str(d.get("halt_name") or "").strip(),
+            lat=HaltImport._float(d.get("lat")),
+            lng=HaltImport._float(d.get("lng")),
+        )
+
+    @staticmethod
+    def read_csv(path: str) -> list[ImportRow]:
+        with open(path, newline="") as f:
+            reader = csv.DictReader(f)
+            missing = set(HaltImport.COLUMNS) - set(reader.fieldnames or [])
+            if missing:
+                raise ValueError(
+                    f"{path}: missing column(s) {sorted(missing)}"
+                )
+            return [HaltImport._row(reader.line_num, d) for d in reader]
+
+    @staticmethod
+    def read_geojson(path: str) -> list[ImportRow]:
+        with open(path) as f:
+            features = json.load(f).get("features", [])
+        rows = []
+        for i, feature in enumerate(features, 1):
+            d = dict(feature.get("properties") or {})
+            geometry = feature.get("geometry") or {}
+            coordinates = geometry.get("coordinates") or []
+            if geometry.get("type") == "Point" and len(coordinates) >= 2:
+                d["lng"], d["lat"] = coordinates[:2]
+            rows.append(HaltImport._row(i, d))
+        return rows
+
+    @staticmethod
+    def read(path: str) -> list[ImportRow]:
+        """Rows from a .csv file, or else a GeoJSON file."""
+        if os.path.splitext(path)[1].lower() == ".csv":
+            return HaltImport.read_csv(path)
+        return HaltImport.read_geojson(path)
+
+    # -----------------------------------------------------------------------
+    # Validation
+    # -----------------------------------------------------------------------
+
+    @staticmethod
+    def _field_errors(row: ImportRow) -> list[str]:
+        errors = []
+        if not row.road_name:
+            errors.append("road_name is empty")
+        elif len(row.road_name.split()[-1]) != 2:
+            errors.append(
+                "road_name must end with a two-character word (e.g. 'Rd', "
+                f"'St', 'Dr'), got '{row.road_name.split()[-1]}'"
+            )
+        if row.direction not in HaltImport.DIRECTIONS:
+            errors.append(
+                f"direction must be one of {', '.join(HaltImport.DIRECTIONS)}"
+            )
+        if not row.halt_name:
+            errors.append("halt_name is empty")
+        for name, value, limit in (
+            ("lat", row.lat, 90),
+            ("lng", row.lng, 180),
+        ):
+            if value is None:
+                errors.append(f"{name} is missing or not a number")
+            elif not -limit <= value <= limit:
+                errors.append(f"{name} must be in [-{limit}, {limit}]")
+        return errors
+
+    @staticmethod
+    def _placed(row: ImportRow) -> bool:
+        """Whether the row has a usable position."""
+        return (
+            row.lat is not None
+            and row.lng is not None
+            and -90 <= row.lat <= 90
+            and -180 <= row.lng <= 180
+        )
+
+    def _assign_road_indices(self, rows: list[ImportRow]) -> None:
+        next_index: dict[str, int] = {}
+        for row in rows:
+            row.road_index = None
+            if not row.road_name or row.direction not in HaltImport.DIRECTIONS:
+                continue
+            road_id = row.road_id
+            if road_id not in next_index:
+                max_index = self.db.road_halt_index.max_index(road_id)
+                next_index[road_id] = 0 if max_index is None else max_index + 1
+            row.road_index = next_index[road_id]
+            next_index[road_id] += 1
+
+    def _check_duplicates(self, rows: list[ImportRow]) -> None:
+        rows_by_id = defaultdict(list)
+        for row in rows:
+            if row.road_index is not None and row.halt_name:
+                rows_by_id[row.halt_id].append(row)
+        for halt_id, same in rows_by_id.items():
+            for row in same:
+                if halt_id in self.db.halts:
+                    row.errors.append(f"halt {halt_id} already exists")
+                others = [r.row for r in same if r is not row]
+                if others:
+                    row.errors.append(f"halt {halt_id} is also on {others}")
+
+    def _existing_near(
+        self, placed: list[ImportRow], radius_m: float
+    ) -> tuple[list[str], np.ndarray, np.ndarray]:
+        """(halt_ids, lats, lngs) of DB halts within radius_m of any row,
+        found through the DB's spatial index.
+        """
+        import numpy as np
+
+        halt_ids = sorted(
+            {
+                halt_id
+                for row in placed
+                for halt_id, _ in self.db.halt_index.query_radius(
+                    LatLng(lat=row.lat, lng=row.lng), radius_m
+                )
+            }
+        )
+        latlngs = [self.db.halts[halt_id].latlng for halt_id in halt_ids]
+        return (
+            halt_ids,
+            np.array([latlng.lat for latlng in latlngs], dtype=np.float64),
+            np.array([latlng.lng for latlng in latlngs], dtype=np.float64),
+        )
+
+    def _check_min_spacing(self, placed: list[ImportRow]) -> None:
+        """Every halt at least MIN_HALT_SPACING_M from every other halt,
+        in the DB or the batch.
+        """
+        import numpy as np
+
+        from utils_future.Haversine import Haversine
+
+        min_m = Validator.MIN_HALT_SPACING_M
+        lats = np.array([row.lat for row in placed])
+        lngs = np.array([row.lng for row in placed])
+        ex_ids, ex_lats, ex_lngs = self._existing_near(placed, min_m)
+        n = len(placed)
+        labels = [f"row {row.row}" for row in placed] + ex_ids
+        i, j, dists = Haversine.pairs_within(
+            np.concatenate([lats, ex_lats]),
+            np.concatenate([lngs, ex_lngs]),
+            min_m,
+        )
+        # i < j, so a pair with a row has the row as i. Pairs of DB halts
+        # are the DB's own problem (see Validator), not the batch's.
+        keep = i < n
+        for i, j, dist in zip(
+            i[keep].tolist(), j[keep].tolist(), dists[keep].tolist()
+        ):
+            placed[i].errors.append(
+                f"{dist:.2f} m from {labels[j]} (must be ≥ {min_m:g} m)"
+            )
+            if j < n:
+                placed[j].errors.append(
+                    f"{dist:.2f} m from {labels[i]} (must be ≥ {min_m:g} m)"
+                )
+
+    def _check_max_spacing(self, placed: list[ImportRow]) -> None:
+        """Every halt at most MAX_HALT_SPACING_M from the previous halt on
+        its road, in the batch or, for a road's first, in the DB.
+        """
+        import numpy as np
+
+        from utils_future.Haversine import Haversine
+
+        max_m = Validator.MAX_HALT_SPACING_M
+        previous: dict[str, tuple[str, float, float]] = {}
+        checked, prev_labels, prev_lats, prev_lngs = [], [], [], []
+        for row in placed:
+            if row.road_index is None:
+                continue
+            road_id = row.road_id
+            if road_id not in previous:
+                halt = self.db.previous_halt(road_id, row.road_index)
+                if halt is not None:
+                    previous[road_id] = (
+                        halt.id,
+                        halt.latlng.lat,
+                        halt.latlng.lng,
+                    )
+            if road_id in previous:
+                label, lat, lng = previous[road_id]
+                checked.append(row)
+                prev_labels.append(label)
+                prev_lats.append(lat)
+                prev_lngs.append(lng)
+            previous[road_id] = (f"row {row.row}", row.lat, row.lng)
+        if not checked:
+            return
+        gaps = Haversine.elementwise(
+            np.array([row.lat for row in checked]),
+            np.array([row.lng for row in checked]),
+            np.array(prev_lats),
+            np.array(prev_lngs),
+        )
+        for i in np.flatnonzero(gaps > max_m):
+            checked[i].errors.append(
+                f"{gaps[i]:.0f} m from previous halt {prev_labels[i]} "
+                f"(must be ≤ {max_m:g} m)"
+            )
+
+    def validate(self, rows: list[ImportRow]) -> bool:
+        """Assign each row its road_index and set its errors. Returns True
+        if every row is valid.
+        """
+        for row in rows:
+            row.errors = HaltImport._field_errors(row)
+        self._assign_road_indices(rows)
+        self._check_duplicates(rows)
+        placed = [row for row in rows if HaltImport._placed(row)]
+        if placed:
+            self._check_min_spacing(placed)
+            self._check_max_spacing(placed)
+        return all(row.ok for row in rows)
+
+    # -----------------------------------------------------------------------
+    # Writing
+    # -----------------------------------------------------------------------
+
+    def commit(self, rows: list[ImportRow]) -> tuple[int, int]:
+        """Write validated rows, and their new roads, as one transaction.
+        Returns (roads created, halts added).
+        """
+        if not all(row.ok and row.road_index is not None for row in rows):
+            raise ValueError("Batch is not valid: nothing written")
+        new_roads = {}
+        for row in rows:
+            if row.road_id not in self.db.roads:
+                new_roads.setdefault(
+                    row.road_id,
+                    Road(name=row.road_name, direction=row.direction),
+                )
+        with self.db.transaction():
+            for road in new_roads.values():
+                self.db.save_road(road)
+            for row in rows:
+                self.db.save_halt(
+                    Halt(
+                        road_id=row.road_id,
+                        road_index=row.road_index,
+                        name=row.halt_name,
+                        latlng=LatLng(lat=row.lat, lng=row.lng),
+                    )
+                )
+        return len(new_roads), len(rows)
+
+    def run(
+        self, path: str, dry_run: bool = False
+    ) -> tuple[list[ImportRow], int, int]:
+        """Read, validate and (unless dry_run) commit a file.
+
+        Returns (rows, roads created, halts added); nothing is written
+        unless every row is valid.
+        """
+        rows = HaltImport.read(path)
+        if not self.validate(rows) or dry_run:
+            return rows, 0, 0
+        return rows, *self.commit(rows)
@@ -0,0 +1,43 @@
+from dataclasses import dataclass, field
+
+from bus.core import Road
+from utils_future import IDMixin, String
+
+
+@dataclass
+class ImportRow:
+    row: int  # CSV line number, or GeoJSON feature number (from 1)
+    road_name: str  # E.g. "Galle Rd"
+    direction: str  # E.g. "S"
+    halt_name: str  # E.g. "Colombo Museum"
+    lat: float | None  # None if missing or not a number
+    lng: float | None
+    road_index: int | None = None  # Assigned on validation
+    errors: list[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    @property
+    def road_id(self) -> str:
+        return Road(name=self.road_name, direction=self.direction).id
+
+    @property
+    def halt_id(self) -> str:
+        # As Halt.id makes it.
+        return IDMixin.from_items(
+            self.road_id, String.to_kebab_case(self.halt_name)
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "row": self.row,
+            "road_name": self.road_name,
+            "direction": self.direction,
+            "halt_name": self.halt_name,
+            "lat": self.lat,
+            "lng": self.lng,
+            "road_index": self.road_index,
+            "errors": self.errors,
+        }
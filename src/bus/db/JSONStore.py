@@ -0,0 +1,113 @@
+import json
+import os
+
+from bus.db.Snapshot import Snapshot
+from bus.db.Transaction import Transaction
+
+
+class JSONStore:
+    """The per-entity JSON tree: <dir_path>/<kind>/<entity_id>.json.
+
+    commit() writes every file of a transaction to a temp file, records
+    the planned renames in a journal, and then applies them with
+    os.replace. If the process dies part way, recover() rolls the journal
+    forward the next time the store is opened. Either way, the snapshot
+    is deleted first, so it never outlives the files it was built from.
+    """
+
+    KINDS = Snapshot.KINDS
+    JOURNAL_FILE_NAME = ".journal.json"
+    TMP_SUFFIX = ".tmp"
+
+    def __init__(self, dir_path: str, use_snapshot: bool = True):
+        self.dir_path = dir_path
+        self.use_snapshot = use_snapshot
+        for kind in JSONStore.KINDS:
+            os.makedirs(os.path.join(dir_path, kind), exist_ok=True)
+        self.recover()
+
+    def path(self, kind: str, entity_id: str) -> str:
+        return os.path.join(self.dir_path, kind, f"{entity_id}.json")
+
+    def load(self) -> dict[str, dict[str, dict]]:
+        """kind -> entity id -> data, from the snapshot if it is fresh."""
+        if self.use_snapshot:
+            data = Snapshot.load_if_fresh(self.dir_path)
+            if data is not None:
+                return data
+        data = {}
+        for kind in JSONStore.KINDS:
+            kind_dir = os.path.join(self.dir_path, kind)
+            data[kind] = {}
+            for file_name in os.listdir(kind_dir):
+                if not file_name.endswith(".json"):
+                    continue
+                with open(os.path.join(kind_dir, file_name)) as f:
+                    data[kind][file_name.removesuffix(".json")] = json.load(f)
+        return data
+
+    @property
+    def journal_path(self) -> str:
+        return os.path.join(self.dir_path, JSONStore.JOURNAL_FILE_NAME)
+
+    @staticmethod
+    def _write_durable(path: str, content: str) -> None:
+        with open(path, "w") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def commit(self, tx: Transaction) -> list[str]:
+        """Apply every staged change. Returns the paths written."""
+        if not tx.staged:
+            return []
+        ops = []
+        for (kind, entity_id), data in tx.staged.items():
+            path = self.path(kind, entity_id)
+            if data is None:
+                ops.append({"path": path, "tmp": None})
+                continue
+            tmp_path = path + JSONStore.TMP_SUFFIX
+            JSONStore._write_durable(tmp_path, json.dumps(data, indent=2))
+            ops.append({"path": path, "tmp": tmp_path})
+
+        Snapshot.delete(self.dir_path)
+        # The commit point: once the journal is in place, recover() will
+        # finish the transaction even if we do not.
+        JSONStore._write_durable(
+            self.journal_path + JSONStore.TMP_SUFFIX, json.dumps(ops)
+        )
+        os.replace(self.journal_path + JSONStore.TMP_SUFFIX, self.journal_path)
+
+        JSONStore._apply(ops)
+        os.remove(self.journal_path)
+        return [op["path"] for op in ops if op["tmp"] is not None]
+
+    @staticmethod
+    def _apply(ops: list[dict]) -> None:
+        for op in ops:
+            if op["tmp"] is None:
+                if os.path.exists(op["path"]):
+                    os.remove(op["path"])
+            elif os.path.exists(op["tmp"]):
+                os.replace(op["tmp"], op["path"])
+
+    def recover(self) -> bool:
+        """Finish a commit interrupted after its journal was written.
+
+        Temp files from a commit that never reached its journal are
+        discarded. Returns True if a journal was rolled forward.
+        """
+        recovered = False
+        if os.path.exists(self.journal_path):
+            Snapshot.delete(self.dir_path)
+            with open(self.journal_path) as f:
+                JSONStore._apply(json.load(f))
+            os.remove(self.journal_path)
+            recovered = True
+
+        for root, _, file_names in os.walk(self.dir_path):
+            for file_name in file_names:
+                if file_name.endswith(JSONStore.TMP_SUFFIX):
+                    os.remove(os.path.join(root, file_name))
+        return recovered
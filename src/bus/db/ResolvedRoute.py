@@ -0,0 +1,20 @@
+from dataclasses import dataclass, field
+
+from bus.core import Halt
+
+
+@dataclass
+class ResolvedRoute:
+    route_id: str
+    segment_halts: list[list[Halt]]  # Halts of each segment, in route order
+    missing_segment_ids: list[str] = field(default_factory=list)
+
+    def __post_init__(self):
+        import numpy as np
+
+        self.halts = [halt for halts in self.segment_halts for halt in halts]
+        # (n, 2) array of [lat, lng] rows, one per halt in route order.
+        self.latlngs = np.array(
+            [[halt.latlng.lat, halt.latlng.lng] for halt in self.halts],
+            dtype=np.float64,
+        ).reshape(-1, 2)
@@ -0,0 +1,51 @@
+import bisect
+
+
+class RoadHaltIndex:
+    """Halt ids on each road, kept sorted by road_index.
+
+    Lookups bisect the per-road list, so they never scan other roads.
+    """
+
+    def __init__(self):
+        self.road_to_entries: dict[str, list[tuple[int, str]]] = {}
+        self.halt_to_entry: dict[str, tuple[str, int]] = {}
+
+    def add(self, halt_id: str, road_id: str, road_index: int) -> None:
+        """Add a halt, or re-position it if it is already indexed."""
+        if halt_id in self.halt_to_entry:
+            self.remove(halt_id)
+        bisect.insort(
+            self.road_to_entries.setdefault(road_id, []),
+            (road_index, halt_id),
+        )
+        self.halt_to_entry[halt_id] = (road_id, road_index)
+
+    def remove(self, halt_id: str) -> None:
+        road_id, road_index = self.halt_to_entry.pop(halt_id)
+        entries = self.road_to_entries[road_id]
+        del entries[bisect.bisect_left(entries, (road_index, halt_id))]
+        if not entries:
+            del self.road_to_entries[road_id]
+
+    def halt_ids(self, road_id: str) -> list[str]:
+        return [hid for _, hid in self.road_to_entries.get(road_id, [])]
+
+    def in_range(
+        self, road_id: str, start_road_index: int, end_road_index: int
+    ) -> list[str]:
+        """Halt ids with start_road_index <= road_index <= end_road_index."""
+        entries = self.road_to_entries.get(road_id, [])
+        i_start = bisect.bisect_left(entries, (start_road_index,))
+        i_end = bisect.bisect_left(entries, (end_road_index + 1,))
+        return [hid for _, hid in entries[i_start:i_end]]
+
+    def previous(self, road_id: str, road_index: int) -> str | None:
+        """Id of the halt with the highest road_index below road_index."""
+        entries = self.road_to_entries.get(road_id, [])
+        i = bisect.bisect_left(entries, (road_index,))
+        return entries[i - 1][1] if i > 0 else None
+
+    def max_index(self, road_id: str) -> int | None:
+        entries = self.road_to_entries.get(road_id)
+        return entries[-1][0] if entries else None
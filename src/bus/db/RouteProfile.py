@@ -0,0 +1,67 @@
+from dataclasses import dataclass
+
+from bus.db.ResolvedRoute import ResolvedRoute
+from utils_future import LatLng
+
+
+@dataclass
+class RouteProfile:
+    """Cumulative distance along a route's halts, for O(1) distance queries.
+
+    A halt that appears more than once (e.g. where one segment ends and
+    the next starts) is located at its first occurrence.
+    """
+
+    resolved: ResolvedRoute
+
+    def __post_init__(self):
+        import numpy as np
+
+        from utils_future.Haversine import Haversine
+
+        latlngs = self.resolved.latlngs
+        # cum_dist_m[i]: distance along the route from the first halt to
+        # halt i.
+        self.cum_dist_m = np.concatenate(
+            (
+                np.zeros(min(len(latlngs), 1)),
+                np.cumsum(Haversine.pairwise(latlngs[:, 0], latlngs[:, 1])),
+            )
+        )
+        self.halt_id_to_position: dict[str, int] = {}
+        for position, halt in enumerate(self.resolved.halts):
+            self.halt_id_to_position.setdefault(halt.id, position)
+
+    @property
+    def length_m(self) -> float:
+        return float(self.cum_dist_m[-1]) if len(self.cum_dist_m) else 0.0
+
+    def distance_m(self, from_halt_id: str, to_halt_id: str) -> float:
+        """Distance along the route between two halts on it (negative if
+        to_halt_id comes first).
+        """
+        return float(
+            self.cum_dist_m[self.halt_id_to_position[to_halt_id]]
+            - self.cum_dist_m[self.halt_id_to_position[from_halt_id]]
+        )
+
+    def position_at(self, distance_m: float) -> tuple[int, LatLng]:
+        """The position of the last halt at or before distance_m along the
+        route, and the point at distance_m, interpolated between halts.
+
+        distance_m is clamped to [0, length_m].
+        """
+        import numpy as np
+
+        if not len(self.cum_dist_m):
+            raise ValueError(f"Route {self.resolved.route_id} has no halts")
+        distance_m = min(max(distance_m, 0.0), self.length_m)
+        i = int(np.searchsorted(self.cum_dist_m, distance_m, side="right")) - 1
+        latlngs = self.resolved.latlngs
+        lat, lng = latlngs[i]
+        if i + 1 < len(latlngs):
+            gap = self.cum_dist_m[i + 1] - self.cum_dist_m[i]
+            if gap > 0:
+                t = (distance_m - self.cum_dist_m[i]) / gap
+                lat, lng = (1 - t) * latlngs[i] + t * latlngs[i + 1]
+        return i, LatLng(lat=float(lat), lng=float(lng))
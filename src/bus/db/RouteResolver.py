@@ -0,0 +1,65 @@
+from bus.core import Halt
+from bus.db.ResolvedRoute import ResolvedRoute
+from bus.db.RouteProfile import RouteProfile
+
+
+class RouteResolver:
+    """Expands routes into their ordered halts, caching the result.
+
+    Expansions are cached per segment and per route, and distance profiles
+    per route. The invalidate_* methods drop only the entries on the path
+    of a change, found through the DB's SegmentIndex.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.segment_cache: dict[str, list[Halt]] = {}
+        self.route_cache: dict[str, ResolvedRoute] = {}
+        self.profile_cache: dict[str, RouteProfile] = {}
+
+    def segment_halts(self, road_segment_id: str) -> list[Halt]:
+        if road_segment_id not in self.segment_cache:
+            seg = self.db.road_segments[road_segment_id]
+            self.segment_cache[road_segment_id] = self.db.halts_on_road(
+                seg.road_id, seg.start_road_index, seg.end_road_index
+            )
+        return self.segment_cache[road_segment_id]
+
+    def resolve(self, route_id: str) -> ResolvedRoute:
+        if route_id not in self.route_cache:
+            route = self.db.routes[route_id]
+            segment_halts, missing_segment_ids = [], []
+            for seg_id in route.road_segment_id_list:
+                if seg_id not in self.db.road_segments:
+                    missing_segment_ids.append(seg_id)
+                    continue
+                segment_halts.append(self.segment_halts(seg_id))
+            self.route_cache[route_id] = ResolvedRoute(
+                route_id=route_id,
+                segment_halts=segment_halts,
+                missing_segment_ids=missing_segment_ids,
+            )
+        return self.route_cache[route_id]
+
+    def profile(self, route_id: str) -> RouteProfile:
+        if route_id not in self.profile_cache:
+            self.profile_cache[route_id] = RouteProfile(self.resolve(route_id))
+        return self.profile_cache[route_id]
+
+    def invalidate_route(self, route_id: str) -> None:
+        self.route_cache.pop(route_id, None)
+        self.profile_cache.pop(route_id, None)
+
+    def invalidate_segment(self, road_segment_id: str) -> None:
+        self.segment_cache.pop(road_segment_id, None)
+        for route_id in self.db.segment_index.route_ids_for_segment(
+            road_segment_id
+        ):
+            self.invalidate_route(route_id)
+
+    def invalidate_halt(self, road_id: str, road_index: int) -> None:
+        """Drop cached segments on road_id whose range covers road_index."""
+        for seg_id in self.db.segment_index.segment_ids_on_road(road_id):
+            seg = self.db.road_segments[seg_id]
+            if seg.start_road_index <= road_index <= seg.end_road_index:
+                self.invalidate_segment(seg_id)
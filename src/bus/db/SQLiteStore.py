@@ -0,0 +1,265 @@
+import os
+import sqlite3
+
+from bus.db.Transaction import Transaction
+
+
+class SQLiteStore:
+    """The DB as a single SQLite file, with indexed tables per entity.
+
+    Offers the same load()/commit() interface as JSONStore, plus indexed
+    queries that do not need the whole DB in memory.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS halts (
+            id TEXT PRIMARY KEY,
+            road_id TEXT NOT NULL,
+            road_index INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            lat REAL NOT NULL,
+            lng REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS halts_road
+            ON halts (road_id, road_index);
+        CREATE INDEX IF NOT EXISTS halts_latlng ON halts (lat, lng);
+
+        CREATE TABLE IF NOT EXISTS roads (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            direction TEXT NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS road_segments (
+            id TEXT PRIMARY KEY,
+            road_id TEXT NOT NULL,
+            start_road_index INTEGER NOT NULL,
+            end_road_index INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS road_segments_road
+            ON road_segments (road_id, start_road_index);
+
+        CREATE TABLE IF NOT EXISTS routes (
+            id TEXT PRIMARY KEY,
+            code TEXT NOT NULL,
+            direction TEXT NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS route_segments (
+            route_id TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            road_segment_id TEXT NOT NULL,
+            PRIMARY KEY (route_id, position)
+        );
+        CREATE INDEX IF NOT EXISTS route_segments_segment
+            ON route_segments (road_segment_id);
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SQLiteStore.SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def label(self, kind: str, entity_id: str) -> str:
+        return f"{self.path}:{kind}/{entity_id}"
+
+    # -----------------------------------------------------------------------
+    # load / commit
+    # -----------------------------------------------------------------------
+
+    def load(self) -> dict[str, dict[str, dict]]:
+        """kind -> entity id -> data, in the same shape as JSONStore."""
+        q = self.conn.execute
+        halts = {
+            hid: {
+                "road_id": road_id,
+                "road_index": road_index,
+                "name": name,
+                "latlng": {"lat": lat, "lng": lng},
+            }
+            for hid, road_id, road_index, name, lat, lng in q(
+                "SELECT id, road_id, road_index, name, lat, lng FROM halts"
+            )
+        }
+        roads = {
+            rid: {"name": name, "direction": direction}
+            for rid, name, direction in q(
+                "SELECT id, name, direction FROM roads"
+            )
+        }
+        road_segments = {
+            sid: {
+                "road_id": road_id,
+                "start_road_index": start,
+                "end_road_index": end,
+            }
+            for sid, road_id, start, end in q(
+                "SELECT id, road_id, start_road_index, end_road_index"
+                " FROM road_segments"
+            )
+        }
+        routes = {
+            rid: {
+                "code": code,
+                "direction": direction,
+                "road_segment_id_list": [],
+            }
+            for rid, code, direction in q(
+                "SELECT id, code, direction FROM routes"
+            )
+        }
+        for route_id, seg_id in q(
+            "SELECT route_id, road_segment_id FROM route_segments"
+            " ORDER BY route_id, position"
+        ):
+            routes[route_id]["road_segment_id_list"].append(seg_id)
+        return {
+            "halts": halts,
+            "roads": roads,
+            "road_segments": road_segments,
+            "routes": routes,
+        }
+
+    def _delete(self, kind: str, entity_id: str) -> None:
+        self.conn.execute(f"DELETE FROM {kind} WHERE id = ?", (entity_id,))
+        if kind == "routes":
+            self.conn.execute(
+                "DELETE FROM route_segments WHERE route_id = ?", (entity_id,)
+            )
+
+    def _write(self, kind: str, entity_id: str, data: dict) -> None:
+        self._delete(kind, entity_id)
+        if kind == "halts":
+            self.conn.execute(
+                "INSERT INTO halts VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    entity_id,
+                    data["road_id"],
+                    data["road_index"],
+                    data["name"],
+                    data["latlng"]["lat"],
+                    data["latlng"]["lng"],
+                ),
+            )
+        elif kind == "roads":
+            self.conn.execute(
+                "INSERT INTO roads VALUES (?, ?, ?)",
+                (entity_id, data["name"], data["direction"]),
+            )
+        elif kind == "road_segments":
+            self.conn.execute(
+                "INSERT INTO road_segments VALUES (?, ?, ?, ?)",
+                (
+                    entity_id,
+                    data["road_id"],
+                    data["start_road_index"],
+                    data["end_road_index"],
+                ),
+            )
+        elif kind == "routes":
+            self.conn.execute(
+                "INSERT INTO routes VALUES (?, ?, ?)",
+                (entity_id, data["code"], data["direction"]),
+            )
+            self.conn.executemany(
+                "INSERT INTO route_segments VALUES (?, ?, ?)",
+                [
+                    (entity_id, position, seg_id)
+                    for position, seg_id in enumerate(
+                        data["road_segment_id_list"]
+                    )
+                ],
+            )
+        else:
+            raise ValueError(f"Unknown kind: {kind}")
+
+    def commit(self, tx: Transaction) -> list[str]:
+        """Apply every staged change in one SQLite transaction.
+
+        Returns labels for the entities written.
+        """
+        written = []
+        with self.conn:
+            for (kind, entity_id), data in tx.staged.items():
+                if data is None:
+                    self._delete(kind, entity_id)
+                    continue
+                self._write(kind, entity_id, data)
+                written.append(self.label(kind, entity_id))
+        return written
+
+    # -----------------------------------------------------------------------
+    # Indexed queries
+    # -----------------------------------------------------------------------
+
+    def halt_ids_on_road(
+        self,
+        road_id: str,
+        start_road_index: int = 0,
+        end_road_index: int | None = None,
+    ) -> list[str]:
+        """Halt ids on the road in [start, end], sorted by road_index."""
+        if end_road_index is None:
+            end_road_index = 2**31
+        return [
+            hid
+            for (hid,) in self.conn.execute(
+                "SELECT id FROM halts WHERE road_id = ?"
+                " AND road_index BETWEEN ? AND ? ORDER BY road_index",
+                (road_id, start_road_index, end_road_index),
+            )
+        ]
+
+    def halt_ids_in_bbox(
+        self, min_lat: float, min_lng: float, max_lat: float, max_lng: float
+    ) -> list[str]:
+        return [
+            hid
+            for (hid,) in self.conn.execute(
+                "SELECT id FROM halts WHERE lat BETWEEN ? AND ?"
+                " AND lng BETWEEN ? AND ? ORDER BY id",
+                (min_lat, max_lat, min_lng, max_lng),
+            )
+        ]
+
+    def route_ids_for_segment(self, road_segment_id: str) -> list[str]:
+        return [
+            rid
+            for (rid,) in self.conn.execute(
+                "SELECT DISTINCT route_id FROM route_segments"
+                " WHERE road_segment_id = ? ORDER BY route_id",
+                (road_segment_id,),
+            )
+        ]
+
+    # -----------------------------------------------------------------------
+    # Import / export
+    # -----------------------------------------------------------------------
+
+    @staticmethod
+    def copy(src, dst) -> int:
+        """Make dst hold exactly the entities in src, in one commit.
+
+        Either store may be a JSONStore or an SQLiteStore. Returns the
+        number of entities copied.
+        """
+        tx = Transaction()
+        src_data = src.load()
+        for kind, entities in dst.load().items():
+            for entity_id in entities:
+                if entity_id not in src_data.get(kind, {}):
+                    tx.delete(kind, entity_id)
+        n_copied = 0
+        for kind, entities in src_data.items():
+            for entity_id, data in entities.items():
+                tx.write(kind, entity_id, data)
+                n_copied += 1
+        dst.commit(tx)
+        return n_copied
+
+    @staticmethod
+    def is_sqlite_path(path: str) -> bool:
+        return os.path.splitext(path)[1] in {".sqlite", ".sqlite3", ".db"}
@@ -0,0 +1,48 @@
+class SegmentIndex:
+    """Reverse indexes from road to segments, and segment to routes."""
+
+    def __init__(self):
+        self.road_to_segment_ids: dict[str, set[str]] = {}
+        self.segment_to_road_id: dict[str, str] = {}
+        self.segment_to_route_ids: dict[str, set[str]] = {}
+        self.route_to_segment_ids: dict[str, list[str]] = {}
+
+    def add_segment(self, road_segment_id: str, road_id: str) -> None:
+        self.road_to_segment_ids.setdefault(road_id, set()).add(
+            road_segment_id
+        )
+        self.segment_to_road_id[road_segment_id] = road_id
+
+    def remove_segment(self, road_segment_id: str) -> None:
+        road_id = self.segment_to_road_id.pop(road_segment_id)
+        self.road_to_segment_ids[road_id].discard(road_segment_id)
+        if not self.road_to_segment_ids[road_id]:
+            del self.road_to_segment_ids[road_id]
+
+    def add_route(self, route_id: str, road_segment_ids: list[str]) -> None:
+        """Add a route, or replace its segments if it is already indexed."""
+        if route_id in self.route_to_segment_ids:
+            self.remove_route(route_id)
+        self.route_to_segment_ids[route_id] = list(road_segment_ids)
+        for seg_id in road_segment_ids:
+            self.segment_to_route_ids.setdefault(seg_id, set()).add(route_id)
+
+    def remove_route(self, route_id: str) -> None:
+        for seg_id in self.route_to_segment_ids.pop(route_id):
+            route_ids = self.segment_to_route_ids[seg_id]
+            route_ids.discard(route_id)
+            if not route_ids:
+                del self.segment_to_route_ids[seg_id]
+
+    def segment_ids_on_road(self, road_id: str) -> set[str]:
+        return self.road_to_segment_ids.get(road_id, set())
+
+    def route_ids_for_segment(self, road_segment_id: str) -> set[str]:
+        return self.segment_to_route_ids.get(road_segment_id, set())
+
+    def route_ids_for_road(self, road_id: str) -> set[str]:
+        return {
+            route_id
+            for seg_id in self.segment_ids_on_road(road_id)
+            for route_id in self.route_ids_for_segment(seg_id)
+        }
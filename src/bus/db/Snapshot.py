@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+
+
+class Snapshot:
+    """The per-entity JSON tree compiled into one JSON document.
+
+    The file has two lines: a header with a manifest of (mtime_ns, size,
+    sha1) for every source file, then the entities. build() uses the
+    manifest to re-parse only files that changed; load_if_fresh() uses it
+    to detect a stale snapshot without opening any source file, and
+    before parsing the entities. JSONStore.commit() deletes the snapshot.
+    """
+
+    FILE_NAME = "snapshot.json"
+    VERSION = 2
+    KINDS = ["halts", "roads", "road_segments", "routes"]
+
+    @staticmethod
+    def path(dir_path: str) -> str:
+        return os.path.join(dir_path, Snapshot.FILE_NAME)
+
+    @staticmethod
+    def _scan(dir_path: str) -> dict[str, tuple[int, int]]:
+        """Relative path -> (mtime_ns, size) for every source file."""
+        stats = {}
+        for kind in Snapshot.KINDS:
+            kind_dir = os.path.join(dir_path, kind)
+            if not os.path.exists(kind_dir):
+                continue
+            with os.scandir(kind_dir) as entries:
+                for entry in entries:
+                    if not entry.name.endswith(".json"):
+                        continue
+                    stat = entry.stat()
+                    stats[f"{kind}/{entry.name}"] = (
+                        stat.st_mtime_ns,
+                        stat.st_size,
+                    )
+        return stats
+
+    @staticmethod
+    def fingerprint(dir_path: str) -> str:
+        """Hash of the (mtime_ns, size) of every source file, for files
+        derived from the tree to tell whether it has changed since.
+        """
+        stats = sorted(Snapshot._scan(dir_path).items())
+        return hashlib.sha1(json.dumps(stats).encode()).hexdigest()
+
+    @staticmethod
+    def _read(dir_path: str, fresh_only: bool = False) -> dict | None:
+        """The snapshot, or None if there is none (or, if fresh_only, if it
+        is stale). The entities are parsed only once the header passes.
+        """
+        path = Snapshot.path(dir_path)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            snapshot = json.loads(f.readline())
+            if snapshot.get("version") != Snapshot.VERSION:
+                return None
+            if fresh_only and not Snapshot._is_fresh(
+                dir_path, snapshot["files"]
+            ):
+                return None
+            snapshot["entities"] = json.loads(f.readline())
+        return snapshot
+
+    @staticmethod
+    def _is_fresh(dir_path: str, files: dict[str, list]) -> bool:
+        stats = Snapshot._scan(dir_path)
+        if len(stats) != len(files):
+            return False
+        for rel_path, (mtime_ns, size, _) in files.items():
+            if stats.get(rel_path) != (mtime_ns, size):
+                return False
+        return True
+
+    @staticmethod
+    def load_if_fresh(dir_path: str) -> dict[str, dict[str, dict]] | None:
+        """kind -> entity id -> data, or None if the snapshot is stale."""
+        snapshot = Snapshot._read(dir_path, fresh_only=True)
+        if snapshot is None:
+            return None
+        return snapshot["entities"]
+
+    @staticmethod
+    def delete(dir_path: str) -> None:
+        """Remove the snapshot, e.g. before its source files change."""
+        try:
+            os.remove(Snapshot.path(dir_path))
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def build(dir_path: str) -> tuple[int, int]:
+        """Write an up-to-date snapshot, re-parsing only changed files.
+
+        Returns (n_files, n_parsed).
+        """
+        old = Snapshot._read(dir_path) or {"files": {}, "entities": {}}
+        files, n_parsed = {}, 0
+        entities = {kind: {} for kind in Snapshot.KINDS}
+        for rel_path, (mtime_ns, size) in sorted(
+            Snapshot._scan(dir_path).items()
+        ):
+            kind, file_name = rel_path.split("/")
+            entity_id = file_name.removesuffix(".json")
+            old_entry = old["files"].get(rel_path)
+            old_data = old["entities"].get(kind, {}).get(entity_id)
+
+            if old_entry is not None and old_entry[:2] == [mtime_ns, size]:
+                files[rel_path] = old_entry
+                entities[kind][entity_id] = old_data
+                continue
+
+            with open(os.path.join(dir_path, rel_path), "rb") as f:
+                content = f.read()
+            sha1 = hashlib.sha1(content).hexdigest()
+            if old_entry is not None and old_entry[2] == sha1:
+                data = old_data
+            else:
+                data = json.loads(content)
+                n_parsed += 1
+            files[rel_path] = [mtime_ns, size, sha1]
+            entities[kind][entity_id] = data
+
+        header = {"version": Snapshot.VERSION, "files": files}
+        tmp_path = Snapshot.path(dir_path) + ".tmp"
+        with open(tmp_path, "w") as f:
+            # Compact JSON has no newlines, so each part is one line.
+            for part in (header, entities):
+                f.write(json.dumps(part, separators=(",", ":")))
+                f.write("\n")
+        os.replace(tmp_path, Snapshot.path(dir_path))
+        return len(files), n_parsed
@@ -0,0 +1,19 @@
+class Transaction:
+    """Entity writes and deletes staged for one commit to a store.
+
+    Each entity is written at most once per transaction: later stages for
+    the same (kind, entity_id) replace earlier ones.
+    """
+
+    def __init__(self):
+        # (kind, entity_id) -> data, or None to delete
+        self.staged: dict[tuple[str, str], dict | None] = {}
+
+    def __len__(self) -> int:
+        return len(self.staged)
+
+    def write(self, kind: str, entity_id: str, data: dict) -> None:
+        self.staged[(kind, entity_id)] = data
+
+    def delete(self, kind: str, entity_id: str) -> None:
+        self.staged[(kind, entity_id)] = None
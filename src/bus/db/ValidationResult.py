@@ -0,0 +1,21 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class ValidationResult:
+    kind: str  # "roads", "road_segments" or "routes"
+    unit_id: str
+    errors: list[str]
+    cached: bool = False  # Verdict reused from the validation cache
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def to_dict(self) -> dict:
+        return {
+            "kind": self.kind,
+            "unit_id": self.unit_id,
+            "errors": self.errors,
+            "cached": self.cached,
+        }
@@ -0,0 +1,540 @@
+import hashlib
+import json
+import math
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from bus.db.JSONStore import JSONStore
+from bus.db.ValidationResult import ValidationResult
+from utils_future import LatLng
+
+
+class Validator:
+    """Whole-DB validation that only re-checks what changed.
+
+    The DB is split into units: one per road (the road and its halts), one
+    per road segment, and one per route. Each unit's verdict is cached,
+    together with a fingerprint of every entity: the stat (mtime and size)
+    of its JSON file, or for other stores a hash of the entity. On the
+    next run, only the units that depend on a changed entity are rebuilt
+    and checked; the rest reuse their cached verdicts.
+
+    Units that need re-checking are spread across a process pool when
+    there are enough of them to outweigh the cost of starting it.
+    """
+
+    FILE_NAME = ".validation.json"
+    VERSION = 3
+    UNIT_KINDS = ["roads", "road_segments", "routes"]
+    ENTITY_KINDS = ["halts", "roads", "road_segments", "routes"]
+
+    # The spacing rules, also enforced as each halt is entered (see
+    # check_halt_latlng).
+    MIN_HALT_SPACING_M = 1.0
+    MAX_HALT_SPACING_M = 1_000.0
+    # Fewer changed units than this are checked in-process.
+    PARALLEL_MIN_UNITS = 500
+
+    def __init__(self, db, cache_path: str | None = None):
+        self.db = db
+        self.cache_path = cache_path
+
+    @staticmethod
+    def cache_path_for(db_path: str) -> str:
+        """<db dir>/.validation.json, or <sqlite file>.validation.json."""
+        if os.path.isdir(db_path):
+            return os.path.join(db_path, Validator.FILE_NAME)
+        return db_path + Validator.FILE_NAME
+
+    @staticmethod
+    def _hash(inputs: dict) -> str:
+        return hashlib.sha1(
+            json.dumps(inputs, sort_keys=True, separators=(",", ":")).encode()
+        ).hexdigest()
+
+    # -----------------------------------------------------------------------
+    # Units
+    # -----------------------------------------------------------------------
+
+    def _too_close_by_road(
+        self, road_ids: set[str] | None = None
+    ) -> dict[str, list[list]]:
+        """road_id -> [halt_id, other_halt_id, dist] for every halt on the
+        road closer than MIN_HALT_SPACING_M to another halt on any road.
+
+        For all roads (road_ids None), one vectorised pass over all halts;
+        for some, a lookup in the DB's spatial index per halt on them.
+        """
+        import numpy as np
+
+        from utils_future.Haversine import Haversine
+
+        min_m = Validator.MIN_HALT_SPACING_M
+        too_close: dict[str, list[list]] = {}
+        if road_ids is not None:
+            for road_id in road_ids:
+                for halt_id in self.db.road_halt_index.halt_ids(road_id):
+                    for other_halt_id, dist in self.db.halt_index.query_radius(
+                        self.db.halts[halt_id].latlng, min_m
+                    ):
+                        if other_halt_id != halt_id and dist < min_m:
+                            too_close.setdefault(road_id, []).append(
+                                [halt_id, other_halt_id, round(dist, 3)]
+                            )
+            return too_close
+
+        halt_ids = list(self.db.halts)
+        lats = np.array([self.db.halts[h].latlng.lat for h in halt_ids])
+        lngs = np.array([self.db.halts[h].latlng.lng for h in halt_ids])
+        for i, j, dist in zip(*Haversine.pairs_within(lats, lngs, min_m)):
+            for a, b in ((i, j), (j, i)):
+                too_close.setdefault(
+                    self.db.halts[halt_ids[a]].road_id, []
+                ).append([halt_ids[a], halt_ids[b], round(float(dist), 3)])
+        return too_close
+
+    def _road_inputs(self, road_id: str, too_close: list[list]) -> dict:
+        road = self.db.roads.get(road_id)
+        return {
+            "road": road.to_dict() if road is not None else None,
+            "halts": [
+                [halt_id, self.db.halts[halt_id].to_dict()]
+                for halt_id in self.db.road_halt_index.halt_ids(road_id)
+            ],
+            "too_close": sorted(too_close),
+        }
+
+    def _segment_inputs(self, seg_id: str) -> dict:
+        seg = self.db.road_segments[seg_id]
+        entries = self.db.road_halt_index.road_to_entries.get(seg.road_id)
+        return {
+            "segment": seg.to_dict(),
+            "road_exists": seg.road_id in self.db.roads,
+            "road_index_range": (
+                [entries[0][0], entries[-1][0]] if entries else None
+            ),
+        }
+
+    def _segment_ends(self, seg_id: str) -> list | None:
+        """[[first halt id, lat, lng], [last ...]] of a segment, if any."""
+        halts = self.db.route_resolver.segment_halts(seg_id)
+        if not halts:
+            return None
+        return [
+            [halt.id, halt.latlng.lat, halt.latlng.lng]
+            for halt in (halts[0], halts[-1])
+        ]
+
+    def _route_inputs(self, route_id: str) -> dict:
+        route = self.db.routes[route_id]
+        return {
+            "route": route.to_dict(),
+            "segments": {
+                seg_id: (
+                    {
+                        "segment": self.db.road_segments[seg_id].to_dict(),
+                        "ends": self._segment_ends(seg_id),
+                    }
+                    if seg_id in self.db.road_segments
+                    else None
+                )
+                for seg_id in route.road_segment_id_list
+            },
+        }
+
+    def _unit_ids(self) -> dict[str, list[str]]:
+        """kind -> id of every unit in the DB."""
+        road_ids = set(self.db.roads) | set(
+            self.db.road_halt_index.road_to_entries
+        )
+        return {
+            "roads": sorted(road_ids),
+            "road_segments": list(self.db.road_segments),
+            "routes": list(self.db.routes),
+        }
+
+    def _inputs(
+        self, kind: str, unit_id: str, too_close: dict[str, list[list]]
+    ) -> dict:
+        if kind == "roads":
+            return self._road_inputs(unit_id, too_close.get(unit_id, []))
+        if kind == "road_segments":
+            return self._segment_inputs(unit_id)
+        return self._route_inputs(unit_id)
+
+    # -----------------------------------------------------------------------
+    # Changes
+    # -----------------------------------------------------------------------
+
+    def _fingerprints(self) -> dict[str, dict[str, str]]:
+        """kind -> entity id -> fingerprint, for every entity.
+
+        For the JSON tree, the mtime and size of each file, read without
+        opening it; for other stores, a hash of the entity.
+        """
+        if isinstance(self.db.store, JSONStore):
+            fingerprints = {}
+            for kind in Validator.ENTITY_KINDS:
+                fingerprints[kind] = {}
+                with os.scandir(
+                    os.path.join(self.db.store.dir_path, kind)
+                ) as entries:
+                    for entry in entries:
+                        if entry.name.endswith(".json"):
+                            stat = entry.stat()
+                            fingerprints[kind][
+                                entry.name.removesuffix(".json")
+                            ] = f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+            return fingerprints
+        return {
+            kind: {
+                entity_id: Validator._hash(entity.to_dict())
+                for entity_id, entity in getattr(self.db, kind).items()
+            }
+            for kind in Validator.ENTITY_KINDS
+        }
+
+    def _halt_places(self) -> dict[str, list]:
+        """halt_id -> [road_id, lat, lng], kept so that a later run knows
+        where a changed halt used to be.
+        """
+        return {
+            halt_id: [halt.road_id, halt.latlng.lat, halt.latlng.lng]
+            for halt_id, halt in self.db.halts.items()
+        }
+
+    def _stale_units(
+        self,
+        old_fingerprints: dict[str, dict[str, str]],
+        fingerprints: dict[str, dict[str, str]],
+        old_halt_places: dict[str, list],
+    ) -> dict[str, set[str]]:
+        """kind -> ids of the units that depend on a changed entity.
+
+        A halt affects its road, old and new, and the roads of halts within
+        MIN_HALT_SPACING_M of it, old and new; a road's halts affect the
+        segments on it; a segment affects the routes through it.
+        """
+        changed = {}
+        for kind in Validator.ENTITY_KINDS:
+            old, new = old_fingerprints.get(kind, {}), fingerprints[kind]
+            if old == new:
+                changed[kind] = set()
+                continue
+            changed[kind] = {
+                entity_id
+                for entity_id in old.keys() | new.keys()
+                if old.get(entity_id) != new.get(entity_id)
+            }
+
+        road_ids = set(changed["roads"])
+        for halt_id in changed["halts"]:
+            places = []
+            halt = self.db.halts.get(halt_id)
+            if halt is not None:
+                places.append((halt.road_id, halt.latlng))
+            if halt_id in old_halt_places:
+                road_id, lat, lng = old_halt_places[halt_id]
+                places.append((road_id, LatLng(lat=lat, lng=lng)))
+            for road_id, latlng in places:
+                road_ids.add(road_id)
+                for other_halt_id, _ in self.db.halt_index.query_radius(
+                    latlng, Validator.MIN_HALT_SPACING_M
+                ):
+                    road_ids.add(self.db.halts[other_halt_id].road_id)
+
+        seg_ids = set(changed["road_segments"])
+        for road_id in road_ids:
+            seg_ids |= self.db.segment_index.segment_ids_on_road(road_id)
+        route_ids = set(changed["routes"])
+        for seg_id in seg_ids:
+            route_ids |= self.db.segment_index.route_ids_for_segment(seg_id)
+        return {
+            "roads": road_ids,
+            "road_segments": seg_ids,
+            "routes": route_ids,
+        }
+
+    # -----------------------------------------------------------------------
+    # Checks
+    # -----------------------------------------------------------------------
+
+    @staticmethod
+    def check_road(road_id: str, inputs: dict) -> list[str]:
+        import numpy as np
+
+        from utils_future.Haversine import Haversine
+
+        errors = []
+        if inputs["road"] is None:
+            errors.append("halts reference a road that does not exist")
+
+        # A road with N halts must have indices 0..N-1
+        indices = sorted(halt["road_index"] for _, halt in inputs["halts"])
+        expected = list(range(len(indices)))
+        if indices != expected:
+            missing = sorted(set(expected) - set(indices))
+            extra = sorted(set(indices) - set(expected))
+            duplicated = sorted(
+                i for i, n in Counter(indices).items() if n > 1
+            )
+            if missing:
+                errors.append(f"missing indices {missing}")
+            if extra:
+                errors.append(f"unexpected indices {extra}")
+            if duplicated:
+                errors.append(f"duplicated indices {duplicated}")
+
+        # Every halt at least MIN_HALT_SPACING_M from every other halt
+        for halt_id, other_halt_id, dist in inputs["too_close"]:
+            errors.append(
+                f"{halt_id} is {dist:.2f} m from {other_halt_id} "
+                f"(must be ≥ {Validator.MIN_HALT_SPACING_M:g} m)"
+            )
+
+        # ...and at most MAX_HALT_SPACING_M from the previous halt on the road
+        halts = sorted(inputs["halts"], key=lambda e: e[1]["road_index"])
+        if len(halts) > 1:
+            gaps = Haversine.pairwise(
+                [halt["latlng"]["lat"] for _, halt in halts],
+                [halt["latlng"]["lng"] for _, halt in halts],
+            )
+            for i in np.flatnonzero(gaps > Validator.MAX_HALT_SPACING_M):
+                errors.append(
+                    f"{halts[i + 1][0]} is {gaps[i]:.0f} m from previous "
+                    f"halt {halts[i][0]} "
+                    f"(must be ≤ {Validator.MAX_HALT_SPACING_M:g} m)"
+                )
+        return errors
+
+    @staticmethod
+    def check_segment(seg_id: str, inputs: dict) -> list[str]:
+        errors = []
+        seg = inputs["segment"]
+        if not inputs["road_exists"]:
+            errors.append(f"road {seg['road_id']} does not exist")
+        if seg["start_road_index"] > seg["end_road_index"]:
+            errors.append(
+                f"start_road_index {seg['start_road_index']} is after "
+                f"end_road_index {seg['end_road_index']}"
+            )
+        road_index_range = inputs["road_index_range"]
+        if inputs["road_exists"] and road_index_range is None:
+            errors.append(f"road {seg['road_id']} has no halts")
+        elif road_index_range is not None and (
+            seg["start_road_index"] < road_index_range[0]
+            or seg["end_road_index"] > road_index_range[1]
+        ):
+            errors.append(
+                f"range [{seg['start_road_index']}, "
+                f"{seg['end_road_index']}] is outside the road's halt "
+                f"range {road_index_range}"
+            )
+        return errors
+
+    @staticmethod
+    def check_route(route_id: str, inputs: dict) -> list[str]:
+        import numpy as np
+
+        from utils_future.Haversine import Haversine
+
+        errors = []
+        seg_ids = inputs["route"]["road_segment_id_list"]
+        if not seg_ids:
+            errors.append("no road segments")
+        for seg_id, seg in inputs["segments"].items():
+            if seg is None:
+                errors.append(f"segment {seg_id} does not exist")
+        duplicated = sorted(s for s, n in Counter(seg_ids).items() if n > 1)
+        if duplicated:
+            errors.append(f"duplicated segments {duplicated}")
+
+        # Consecutive segments must join up: the last halt of one at most
+        # MAX_HALT_SPACING_M from the first halt of the next.
+        ends = [
+            (seg_id, inputs["segments"][seg_id]["ends"])
+            for seg_id in seg_ids
+            if inputs["segments"].get(seg_id) is not None
+            and inputs["segments"][seg_id]["ends"] is not None
+        ]
+        if len(ends) > 1:
+            lasts = np.array([e[1][1:] for _, e in ends[:-1]])
+            firsts = np.array([e[0][1:] for _, e in ends[1:]])
+            gaps = Haversine.elementwise(
+                lasts[:, 0], lasts[:, 1], firsts[:, 0], firsts[:, 1]
+            )
+            for i in np.flatnonzero(gaps > Validator.MAX_HALT_SPACING_M):
+                (seg_id, seg_ends), (next_seg_id, next_ends) = (
+                    ends[i],
+                    ends[i + 1],
+                )
+                errors.append(
+                    f"{seg_id} does not join {next_seg_id}: "
+                    f"{seg_ends[1][0]} is {gaps[i]:.0f} m from "
+                    f"{next_ends[0][0]}"
+                )
+        return errors
+
+    def check_halt_latlng(
+        self, latlng: LatLng, road_id: str, road_index: int
+    ) -> list[str]:
+        """Errors (none if valid) for a halt about to be entered at
+        road_index on a road: the spacing rules, against the DB as is.
+        """
+        errors = []
+        for halt_id, dist in self.db.halt_index.query_radius(
+            latlng, Validator.MIN_HALT_SPACING_M
+        ):
+            if dist < Validator.MIN_HALT_SPACING_M:
+                errors.append(
+                    f"Too close to {halt_id} ({dist:.2f} m — must be "
+                    f"≥ {Validator.MIN_HALT_SPACING_M:g} m)"
+                )
+
+        previous = self.db.previous_halt(road_id, road_index)
+        if previous is not None:
+            dist = latlng.distance_m(previous.latlng)
+            if dist > Validator.MAX_HALT_SPACING_M:
+                errors.append(
+                    f"Too far from previous halt {previous.id} "
+                    f"({dist:.0f} m — must be "
+                    f"≤ {Validator.MAX_HALT_SPACING_M:g} m)"
+                )
+        return errors
+
+    CHECKS = {
+        "roads": check_road,
+        "road_segments": check_segment,
+        "routes": check_route,
+    }
+
+    @staticmethod
+    def _check_unit(unit: tuple[str, str, dict]) -> list[str]:
+        kind, unit_id, inputs = unit
+        return Validator.CHECKS[kind](unit_id, inputs)
+
+    @staticmethod
+    def _check_units(
+        units: list[tuple[str, str, dict]], workers: int | None
+    ) -> list[list[str]]:
+        """Errors for each unit, checked across a process pool if worth it."""
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(units) < Validator.PARALLEL_MIN_UNITS:
+            return [Validator._check_unit(unit) for unit in units]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(
+                executor.map(
+                    Validator._check_unit,
+                    units,
+                    chunksize=math.ceil(len(units) / (workers * 4)),
+                )
+            )
+
+    # -----------------------------------------------------------------------
+    # Cache
+    # -----------------------------------------------------------------------
+
+    def _load_cache(self) -> dict:
+        if self.cache_path is None or not os.path.exists(self.cache_path):
+            return {}
+        with open(self.cache_path) as f:
+            cache = json.load(f)
+        if cache.get("version") != Validator.VERSION:
+            return {}
+        return cache
+
+    def _save_cache(
+        self,
+        fingerprints: dict[str, dict[str, str]],
+        units: dict[str, dict[str, list[str]]],
+    ) -> None:
+        if self.cache_path is None:
+            return
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            # dumps, not dump: the C encoder only runs on a whole string.
+            f.write(
+                json.dumps(
+                    {
+                        "version": Validator.VERSION,
+                        "fingerprints": fingerprints,
+                        "halt_places": self._halt_places(),
+                        "units": units,
+                    },
+                    separators=(",", ":"),
+                )
+            )
+        os.replace(tmp_path, self.cache_path)
+
+    # -----------------------------------------------------------------------
+    # Run
+    # -----------------------------------------------------------------------
+
+    def run(
+        self, full: bool = False, workers: int | None = None
+    ) -> list[ValidationResult]:
+        """Validate every unit, re-checking only those that depend on an
+        entity changed since the cached run (all of them if full).
+
+        workers is the process pool size (default: one per CPU).
+        """
+        cache = {} if full else self._load_cache()
+        cached_units = cache.get("units", {})
+        fingerprints = self._fingerprints()
+        unit_ids = self._unit_ids()
+        if cache:
+            stale = self._stale_units(
+                cache["fingerprints"], fingerprints, cache["halt_places"]
+            )
+        else:
+            stale = {kind: set(ids) for kind, ids in unit_ids.items()}
+
+        results, todo_ids = [], []
+        for kind in Validator.UNIT_KINDS:
+            for unit_id in unit_ids[kind]:
+                errors = cached_units.get(kind, {}).get(unit_id)
+                is_cached = errors is not None and unit_id not in stale[kind]
+                if not is_cached:
+                    todo_ids.append((kind, unit_id))
+                results.append(
+                    ValidationResult(
+                        kind=kind,
+                        unit_id=unit_id,
+                        errors=errors,
+                        cached=is_cached,
+                    )
+                )
+
+        todo_road_ids = {
+            unit_id for kind, unit_id in todo_ids if kind == "roads"
+        }
+        too_close = self._too_close_by_road(
+            None
+            if len(todo_road_ids) == len(unit_ids["roads"])
+            else todo_road_ids
+        )
+        todo = [
+            (kind, unit_id, self._inputs(kind, unit_id, too_close))
+            for kind, unit_id in todo_ids
+        ]
+        checked = dict(zip(todo_ids, Validator._check_units(todo, workers)))
+        units = {kind: {} for kind in Validator.UNIT_KINDS}
+        for result in results:
+            if not result.cached:
+                result.errors = checked[(result.kind, result.unit_id)]
+            units[result.kind][result.unit_id] = result.errors
+        if todo or fingerprints != cache.get("fingerprints"):
+            self._save_cache(fingerprints, units)
+        return results
+
+    @staticmethod
+    def report(results: list[ValidationResult]) -> dict:
+        """A machine-readable summary of a run, e.g. for CI."""
+        return {
+            "ok": all(r.ok for r in results),
+            "n_units": len(results),
+            "n_failed": sum(not r.ok for r in results),
+            "n_cached": sum(r.cached for r in results),
+            "results": [r.to_dict() for r in results],
+        }
@@ -0,0 +1,18 @@
+# bus.db (auto generate by build_inits.py)
+# flake8: noqa: F408
+
+from bus.db.BusDB import BusDB
+from bus.db.HaltColumns import HaltColumns
+from bus.db.HaltImport import HaltImport
+from bus.db.ImportRow import ImportRow
+from bus.db.JSONStore import JSONStore
+from bus.db.ResolvedRoute import ResolvedRoute
+from bus.db.RoadHaltIndex import RoadHaltIndex
+from bus.db.RouteProfile import RouteProfile
+from bus.db.RouteResolver import RouteResolver
+from bus.db.SegmentIndex import SegmentIndex
+from bus.db.Snapshot import Snapshot
+from bus.db.SQLiteStore import SQLiteStore
+from bus.db.Transaction import Transaction
+from bus.db.ValidationResult import ValidationResult
+from bus.db.Validator import Validator
@@ -0,0 +1,312 @@
+import csv
+import json
+import os
+from bisect import bisect_left
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Iterator
+
+import numpy as np
+
+from bus.db.JSONStore import JSONStore
+from utils_future.Haversine import Haversine
+
+
+class GTFSExport:
+    """GTFS feed files, streamed straight from a db/ JSON tree.
+
+    stops.txt has one stop per halt. routes.txt has one route per route
+    code; trips.txt has one trip per DB route (a code in one direction),
+    with shapes.txt tracing its resolved halts (a route with none has no
+    shape, and its trip an empty shape_id). The DB has no timetable,
+    so there is no stop_times.txt; agency.txt and calendar.txt are single
+    placeholder rows, so that every reference resolves.
+
+    Every file is a generator of rows, reading entity files as it goes.
+    Shapes look up a road's halts among the sorted halt file names, and
+    keep the last road_cache_size roads, so memory grows only with the
+    list of file names, not with the parsed DB.
+    """
+
+    AGENCY_ID = "bus"
+    SERVICE_ID = "daily"
+    ROUTE_TYPE_BUS = 3
+    # GTFS direction_id is 0 or 1: one way and back.
+    DIRECTION_IDS = {"N": 0, "E": 0, "S": 1, "W": 1}
+    DATE_FORMAT = "%Y%m%d"
+    SERVICE_DAYS = 365
+
+    COLUMNS = {
+        "agency.txt": [
+            "agency_id",
+            "agency_name",
+            "agency_url",
+            "agency_timezone",
+        ],
+        "calendar.txt": [
+            "service_id",
+            "monday",
+            "tuesday",
+            "wednesday",
+            "thursday",
+            "friday",
+            "saturday",
+            "sunday",
+            "start_date",
+            "end_date",
+        ],
+        "stops.txt": ["stop_id", "stop_name", "stop_lat", "stop_lon"],
+        "routes.txt": [
+            "route_id",
+            "agency_id",
+            "route_short_name",
+            "route_type",
+        ],
+        "trips.txt": [
+            "route_id",
+            "service_id",
+            "trip_id",
+            "direction_id",
+            "shape_id",
+        ],
+        "shapes.txt": [
+            "shape_id",
+            "shape_pt_lat",
+            "shape_pt_lon",
+            "shape_pt_sequence",
+            "shape_dist_traveled",
+        ],
+    }
+
+    def __init__(
+        self,
+        dir_path: str,
+        agency_name: str = "Bus",
+        agency_url: str = "https://github.com/nuuuwan/bus_py",
+        agency_timezone: str = "Asia/Colombo",
+        start_date: str | None = None,
+        end_date: str | None = None,
+        road_cache_size: int = 64,
+    ):
+        # Opening the store finishes any interrupted commit first.
+        self.store = JSONStore(dir_path, use_snapshot=False)
+        self.agency_name = agency_name
+        self.agency_url = agency_url
+        self.agency_timezone = agency_timezone
+        # Service runs start_date to end_date (YYYYMMDD): by default, from
+        # today for SERVICE_DAYS.
+        start = (
+            datetime.strptime(start_date, GTFSExport.DATE_FORMAT).date()
+            if start_date
+            else date.today()
+        )
+        self.start_date = start.strftime(GTFSExport.DATE_FORMAT)
+        self.end_date = end_date or (
+            start + timedelta(days=GTFSExport.SERVICE_DAYS)
+        ).strftime(GTFSExport.DATE_FORMAT)
+        self._sorted_halt_ids: list[str] | None = None
+        self._road_halts = lru_cache(maxsize=road_cache_size)(
+            self._read_road_halts
+        )
+        self._road_name = lru_cache(maxsize=road_cache_size)(
+            self._read_road_name
+        )
+
+    # -----------------------------------------------------------------------
+    # Reading
+    # -----------------------------------------------------------------------
+
+    def _read(self, kind: str, entity_id: str) -> dict | None:
+        path = self.store.path(kind, entity_id)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def _entity_ids(self, kind: str) -> list[str]:
+        """Sorted, for a deterministic feed."""
+        return sorted(
+            file_name.removesuffix(".json")
+            for file_name in os.listdir(
+                os.path.join(self.store.dir_path, kind)
+            )
+            if file_name.endswith(".json")
+        )
+
+    def _entities(self, kind: str) -> Iterator[tuple[str, dict]]:
+        for entity_id in self._entity_ids(kind):
+            data = self._read(kind, entity_id)
+            if data is not None:
+                yield entity_id, data
+
+    def _read_road_name(self, road_id: str) -> str | None:
+        road = self._read("roads", road_id)
+        return road["name"] if road is not None else None
+
+    def _read_road_halts(self, road_id: str) -> list[tuple]:
+        """(road_index, halt_id, lat, lng) of each halt on the road, sorted
+        by road_index. A halt's id starts with its road's, so only those
+        files are read.
+        """
+        halt_ids = self._halt_ids()
+        prefix = road_id + "-"
+        halts = []
+        for halt_id in halt_ids[bisect_left(halt_ids, prefix) :]:
+            if not halt_id.startswith(prefix):
+                break
+            halt = self._read("halts", halt_id)
+            # Another road's id may start with this one's.
+            if halt is not None and halt["road_id"] == road_id:
+                halts.append(
+                    (
+                        halt["road_index"],
+                        halt_id,
+                        halt["latlng"]["lat"],
+                        halt["latlng"]["lng"],
+                    )
+                )
+        return sorted(halts)
+
+    def _halt_ids(self) -> list[str]:
+        if self._sorted_halt_ids is None:
+            self._sorted_halt_ids = self._entity_ids("halts")
+        return self._sorted_halt_ids
+
+    def route_halts(self, route: dict) -> list[tuple[str, float, float]]:
+        """(halt_id, lat, lng) of a route's halts in order: the expansion
+        RouteResolver makes, from the files rather than a loaded DB, with a
+        halt repeated where segments meet kept once. Missing segments are
+        skipped. tests/test_gtfs_export.py checks the two agree.
+        """
+        halts = []
+        for seg_id in route["road_segment_id_list"]:
+            seg = self._read("road_segments", seg_id)
+            if seg is None:
+                continue
+            start, end = seg["start_road_index"], seg["end_road_index"]
+            for road_index, halt_id, lat, lng in self._road_halts(
+                seg["road_id"]
+            ):
+                if not start <= road_index <= end:
+                    continue
+                if halts and halts[-1][0] == halt_id:
+                    continue
+                halts.append((halt_id, lat, lng))
+        return halts
+
+    def _has_halts(self, route: dict) -> bool:
+        """Whether route_halts(route) is not empty, reading only as far as
+        the first segment with a halt.
+        """
+        for seg_id in route["road_segment_id_list"]:
+            seg = self._read("road_segments", seg_id)
+            if seg is None:
+                continue
+            for road_index, _, _, _ in self._road_halts(seg["road_id"]):
+                if (
+                    seg["start_road_index"]
+                    <= road_index
+                    <= seg["end_road_index"]
+                ):
+                    return True
+        return False
+
+    # -----------------------------------------------------------------------
+    # Rows
+    # -----------------------------------------------------------------------
+
+    def agency(self) -> Iterator[list]:
+        yield [
+            GTFSExport.AGENCY_ID,
+            self.agency_name,
+            self.agency_url,
+            self.agency_timezone,
+        ]
+
+    def calendar(self) -> Iterator[list]:
+        yield [GTFSExport.SERVICE_ID] + [1] * 7 + [
+            self.start_date,
+            self.end_date,
+        ]
+
+    def stops(self) -> Iterator[list]:
+        for halt_id, halt in self._entities("halts"):
+            name = halt["name"]
+            # "& Cross Rd" names a crossing; the console shows it as
+            # "<road> & Cross Rd".
+            if name.startswith("&"):
+                road_name = self._road_name(halt["road_id"])
+                if road_name is not None:
+                    name = f"{road_name} & {name[1:].strip()}"
+            yield [
+                halt_id,
+                name,
+                halt["latlng"]["lat"],
+                halt["latlng"]["lng"],
+            ]
+
+    def routes(self) -> Iterator[list]:
+        codes = set()
+        for _, route in self._entities("routes"):
+            if route["code"] not in codes:
+                codes.add(route["code"])
+                yield [
+                    route["code"],
+                    GTFSExport.AGENCY_ID,
+                    route["code"],
+                    GTFSExport.ROUTE_TYPE_BUS,
+                ]
+
+    def trips(self) -> Iterator[list]:
+        for route_id, route in self._entities("routes"):
+            # shapes() skips a route with no halts, so it has no shape.
+            shape_id = route_id if self._has_halts(route) else ""
+            yield [
+                route["code"],
+                GTFSExport.SERVICE_ID,
+                route_id,
+                GTFSExport.DIRECTION_IDS[route["direction"]],
+                shape_id,
+            ]
+
+    def shapes(self) -> Iterator[list]:
+        for route_id, route in self._entities("routes"):
+            halts = self.route_halts(route)
+            if not halts:
+                continue
+            lats = np.array([lat for _, lat, _ in halts])
+            lngs = np.array([lng for _, _, lng in halts])
+            cum_m = np.concatenate(
+                ([0.0], np.cumsum(Haversine.pairwise(lats, lngs)))
+            )
+            for sequence, (lat, lng, dist_m) in enumerate(
+                zip(lats.tolist(), lngs.tolist(), cum_m.tolist())
+            ):
+                yield [route_id, lat, lng, sequence, round(dist_m, 1)]
+
+    # -----------------------------------------------------------------------
+    # Writing
+    # -----------------------------------------------------------------------
+
+    def write(self, out_dir: str) -> dict[str, int]:
+        """Write every file under out_dir. Returns rows written per file."""
+        os.makedirs(out_dir, exist_ok=True)
+        files = {
+            "agency.txt": self.agency,
+            "calendar.txt": self.calendar,
+            "stops.txt": self.stops,
+            "routes.txt": self.routes,
+            "trips.txt": self.trips,
+            "shapes.txt": self.shapes,
+        }
+        n_rows = {}
+        for file_name, rows in files.items():
+            with open(os.path.join(out_dir, file_name), "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(GTFSExport.COLUMNS[file_name])
+                n = 0
+                for row in rows():
+                    writer.writerow(row)
+                    n += 1
+            n_rows[file_name] = n
+        return n_rows
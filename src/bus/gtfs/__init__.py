@@ -0,0 +1,4 @@
+# bus.gtfs (auto generate by build_inits.py)
+# flake8: noqa: F408
+
+from bus.gtfs.GTFSExport import GTFSExport
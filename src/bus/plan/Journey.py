@@ -0,0 +1,20 @@
+from dataclasses import dataclass
+
+from bus.plan.Leg import Leg
+
+
+@dataclass
+class Journey:
+    legs: list[Leg]
+
+    @property
+    def duration_s(self) -> float:
+        return sum(leg.duration_s for leg in self.legs)
+
+    @property
+    def distance_m(self) -> float:
+        return sum(leg.distance_m for leg in self.legs)
+
+    @property
+    def n_transfers(self) -> int:
+        return max(0, sum(leg.mode == "bus" for leg in self.legs) - 1)
@@ -0,0 +1,175 @@
+import os
+
+import numpy as np
+
+
+class JourneyGraph:
+    """The halt network, precomputed for journey planning.
+
+    Stops are halts. Each route is its ordered stops with the cumulative
+    distance along it. Walking transfers link every pair of halts within
+    walk_radius_m of each other, found through the DB's spatial index.
+
+    save() writes the graph as flat (CSR) numpy arrays to one .npz file,
+    so load() needs no DB and no geometry. The file records the DB's
+    fingerprint (see Snapshot.fingerprint) and walk_radius_m, and load()
+    returns None if either has changed.
+    """
+
+    FILE_NAME = "journey_graph.npz"
+    VERSION = 2
+
+    def __init__(
+        self,
+        stop_ids: list[str],
+        route_ids: list[str],
+        route_stops: list[list[int]],
+        route_cum_m: list[list[float]],
+        transfers: list[list[tuple[int, float]]],
+        walk_radius_m: float,
+        fingerprint: str = "",
+    ):
+        self.stop_ids = stop_ids
+        self.route_ids = route_ids
+        self.route_stops = route_stops  # route -> stops, in order
+        self.route_cum_m = route_cum_m  # route -> distance to each stop
+        self.transfers = transfers  # stop -> [(stop, walk distance)]
+        self.walk_radius_m = walk_radius_m
+        self.fingerprint = fingerprint  # Of the DB the graph was built from
+
+        self.stop_id_to_stop = {s: i for i, s in enumerate(stop_ids)}
+        # stop -> [(route, position of the stop on the route)]
+        self.stop_routes: list[list[tuple[int, int]]] = [[] for _ in stop_ids]
+        for route, stops in enumerate(route_stops):
+            for position, stop in enumerate(stops):
+                self.stop_routes[stop].append((route, position))
+
+    @staticmethod
+    def build(
+        db, walk_radius_m: float = 400.0, fingerprint: str = ""
+    ) -> "JourneyGraph":
+        """The graph of a loaded DB. fingerprint identifies the DB's files,
+        taken before it was loaded.
+        """
+        stop_ids = list(db.halts)
+        stop_id_to_stop = {s: i for i, s in enumerate(stop_ids)}
+
+        route_ids, route_stops, route_cum_m = [], [], []
+        for route_id in db.routes:
+            profile = db.route_profile(route_id)
+            stops, cum_m = [], []
+            for halt, dist in zip(profile.resolved.halts, profile.cum_dist_m):
+                stop = stop_id_to_stop[halt.id]
+                # Segments that meet share their boundary halt.
+                if stops and stops[-1] == stop:
+                    continue
+                stops.append(stop)
+                cum_m.append(float(dist))
+            if len(stops) < 2:
+                continue
+            route_ids.append(route_id)
+            route_stops.append(stops)
+            route_cum_m.append(cum_m)
+
+        transfers = [
+            [
+                (stop_id_to_stop[other_id], dist)
+                for other_id, dist in db.halt_index.query_radius(
+                    db.halts[stop_id].latlng, walk_radius_m
+                )
+                if other_id != stop_id
+            ]
+            for stop_id in stop_ids
+        ]
+        return JourneyGraph(
+            stop_ids=stop_ids,
+            route_ids=route_ids,
+            route_stops=route_stops,
+            route_cum_m=route_cum_m,
+            transfers=transfers,
+            walk_radius_m=walk_radius_m,
+            fingerprint=fingerprint,
+        )
+
+    # -----------------------------------------------------------------------
+    # Files
+    # -----------------------------------------------------------------------
+
+    @staticmethod
+    def path(db_dir: str) -> str:
+        return os.path.join(db_dir, JourneyGraph.FILE_NAME)
+
+    @staticmethod
+    def _offsets(lists: list[list]) -> np.ndarray:
+        return np.cumsum([0] + [len(items) for items in lists])
+
+    def save(self, path: str) -> None:
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            version=JourneyGraph.VERSION,
+            walk_radius_m=self.walk_radius_m,
+            fingerprint=self.fingerprint,
+            stop_ids=np.array(self.stop_ids, dtype=str),
+            route_ids=np.array(self.route_ids, dtype=str),
+            route_offsets=JourneyGraph._offsets(self.route_stops),
+            route_stops=np.array(
+                [s for stops in self.route_stops for s in stops],
+                dtype=np.int32,
+            ),
+            route_cum_m=np.array(
+                [d for cum_m in self.route_cum_m for d in cum_m],
+                dtype=np.float64,
+            ),
+            transfer_offsets=JourneyGraph._offsets(self.transfers),
+            transfer_stops=np.array(
+                [s for ts in self.transfers for s, _ in ts], dtype=np.int32
+            ),
+            transfer_m=np.array(
+                [d for ts in self.transfers for _, d in ts], dtype=np.float64
+            ),
+        )
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(
+        path: str, fingerprint: str, walk_radius_m: float
+    ) -> "JourneyGraph | None":
+        """The saved graph, or None if missing, from another version, or
+        built from another DB fingerprint or walk_radius_m.
+        """
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as npz:
+            if (
+                int(npz["version"]) != JourneyGraph.VERSION
+                or str(npz["fingerprint"]) != fingerprint
+                or float(npz["walk_radius_m"]) != walk_radius_m
+            ):
+                return None
+
+            def _split(offsets: np.ndarray, *columns: np.ndarray) -> list:
+                columns = [column.tolist() for column in columns]
+                offsets = offsets.tolist()
+                return [
+                    (
+                        columns[0][i:j]
+                        if len(columns) == 1
+                        else list(zip(*(c[i:j] for c in columns)))
+                    )
+                    for i, j in zip(offsets, offsets[1:])
+                ]
+
+            return JourneyGraph(
+                stop_ids=npz["stop_ids"].tolist(),
+                route_ids=npz["route_ids"].tolist(),
+                route_stops=_split(npz["route_offsets"], npz["route_stops"]),
+                route_cum_m=_split(npz["route_offsets"], npz["route_cum_m"]),
+                transfers=_split(
+                    npz["transfer_offsets"],
+                    npz["transfer_stops"],
+                    npz["transfer_m"],
+                ),
+                walk_radius_m=float(npz["walk_radius_m"]),
+                fingerprint=fingerprint,
+            )
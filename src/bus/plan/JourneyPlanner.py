@@ -0,0 +1,208 @@
+import math
+
+from bus.plan.Journey import Journey
+from bus.plan.JourneyGraph import JourneyGraph
+from bus.plan.Leg import Leg
+
+
+class JourneyPlanner:
+    """Fastest journeys between halts, with at most k transfers.
+
+    A round-based (RAPTOR-style) search over a JourneyGraph: round k finds
+    the best arrival at every stop using exactly k bus rides, each ride
+    followed by at most one walking transfer. There are no timetables, so
+    time is estimated from distance: rides at bus_speed_mps plus a fixed
+    board_s wait per boarding, and walks at walk_speed_mps.
+    """
+
+    def __init__(
+        self,
+        graph: JourneyGraph,
+        bus_speed_mps: float = 20 / 3.6,
+        walk_speed_mps: float = 1.3,
+        board_s: float = 300.0,
+    ):
+        self.graph = graph
+        self.bus_speed_mps = bus_speed_mps
+        self.walk_speed_mps = walk_speed_mps
+        self.board_s = board_s
+
+    def _scan_route(
+        self,
+        route: int,
+        start_position: int,
+        rnd: "_Round",
+        target: int,
+    ) -> set[int]:
+        """Ride route from its best boarding stop at or after
+        start_position. Returns the stops whose ride arrival improved.
+        """
+        stops = self.graph.route_stops[route]
+        cum_m = self.graph.route_cum_m[route]
+        speed, board_s = self.bus_speed_mps, self.board_s
+        best, best_ride, prev_cost = rnd.best, rnd.best_ride, rnd.prev_cost
+        # Cost of being on the route, less the distance ridden to reach
+        # the boarding stop, so arrival = base + cum_m[position] / speed.
+        base, board_position = math.inf, None
+        improved = set()
+        for position in range(start_position, len(stops)):
+            stop = stops[position]
+            if board_position is not None:
+                arrival = base + cum_m[position] / speed
+                if arrival < best_ride[stop] and arrival < best[target]:
+                    rnd.set_ride(
+                        stop, arrival, ("bus", route, board_position, position)
+                    )
+                    improved.add(stop)
+            board_base = prev_cost[stop] + board_s - cum_m[position] / speed
+            if board_base < base:
+                base, board_position = board_base, position
+        return improved
+
+    def _walk(self, stops: set[int], rnd: "_Round", target: int) -> set[int]:
+        """Relax one walking transfer out of each stop arrived at by bus.
+
+        Returns the stops whose arrival improved.
+        """
+        speed, best = self.walk_speed_mps, rnd.best
+        improved = set()
+        for stop in sorted(stops):
+            ride_cost = rnd.ride_cost[stop]
+            for other, dist in self.graph.transfers[stop]:
+                arrival = ride_cost + dist / speed
+                if arrival < best[other] and arrival < best[target]:
+                    rnd.set_cost(other, arrival, ("walk", stop, dist))
+                    improved.add(other)
+        return improved
+
+    def plan(
+        self, from_halt_id: str, to_halt_id: str, max_transfers: int = 2
+    ) -> Journey | None:
+        """The fastest journey, or None if the halts are not connected
+        within max_transfers.
+        """
+        graph = self.graph
+        origin = graph.stop_id_to_stop[from_halt_id]
+        target = graph.stop_id_to_stop[to_halt_id]
+        if origin == target:
+            return Journey(legs=[])
+
+        rnd = _Round.first(len(graph.stop_ids), origin)
+        rounds = [rnd]
+        marked = {origin} | self._walk({origin}, rnd, target)
+        for _ in range(max_transfers + 1):
+            rnd = rnd.next()
+            rounds.append(rnd)
+            # Each route, from the earliest stop on it reached last round.
+            routes: dict[int, int] = {}
+            for stop in marked:
+                for route, position in graph.stop_routes[stop]:
+                    if position < routes.get(route, math.inf):
+                        routes[route] = position
+
+            ridden = set()
+            for route, position in routes.items():
+                ridden |= self._scan_route(route, position, rnd, target)
+            walked = self._walk(ridden, rnd, target)
+            marked = {s for s in ridden if s in rnd.labels} | walked
+            if not marked:
+                break
+
+        if math.isinf(rnd.best[target]):
+            return None
+        k = min(range(len(rounds)), key=lambda k: (rounds[k].cost[target], k))
+        return self._journey(rounds, target, k)
+
+    def _journey(self, rounds: list["_Round"], stop: int, k: int) -> Journey:
+        graph = self.graph
+        legs = []
+        label = _Round.find(rounds, k, stop)
+        while True:
+            k, label = label
+            if label[0] == "origin":
+                break
+            if label[0] == "walk":
+                _, from_stop, dist = label
+                legs.append(
+                    Leg(
+                        mode="walk",
+                        from_halt_id=graph.stop_ids[from_stop],
+                        to_halt_id=graph.stop_ids[stop],
+                        distance_m=dist,
+                        duration_s=dist / self.walk_speed_mps,
+                    )
+                )
+                stop = from_stop
+                # Walks only start from a bus arrival in the same round.
+                label = (k, rounds[k].ride_labels[stop])
+                continue
+            _, route, board_position, alight_position = label
+            stops = graph.route_stops[route]
+            cum_m = graph.route_cum_m[route]
+            dist = cum_m[alight_position] - cum_m[board_position]
+            legs.append(
+                Leg(
+                    mode="bus",
+                    from_halt_id=graph.stop_ids[stops[board_position]],
+                    to_halt_id=graph.stop_ids[stop],
+                    distance_m=dist,
+                    duration_s=self.board_s + dist / self.bus_speed_mps,
+                    route_id=graph.route_ids[route],
+                )
+            )
+            stop = stops[board_position]
+            label = _Round.find(rounds, k - 1, stop)
+        return Journey(legs=legs[::-1])
+
+
+class _Round:
+    """Arrival costs and labels after one round of the search.
+
+    ride_cost is the best arrival by bus (or at the origin), from which a
+    walk may follow; cost is the best arrival by any means, from which a
+    bus may be boarded. best and best_ride are shared across rounds.
+    Labels record how a stop was improved in this round only.
+    """
+
+    def __init__(self, prev: "_Round | None", best, best_ride, cost, ride):
+        self.prev_cost = prev.cost if prev is not None else None
+        self.best = best
+        self.best_ride = best_ride
+        self.cost = cost
+        self.ride_cost = ride
+        self.labels: dict[int, tuple] = {}
+        self.ride_labels: dict[int, tuple] = {}
+
+    @staticmethod
+    def first(n_stops: int, origin: int) -> "_Round":
+        cost = [math.inf] * n_stops
+        cost[origin] = 0.0
+        rnd = _Round(None, list(cost), list(cost), list(cost), cost)
+        rnd.labels[origin] = rnd.ride_labels[origin] = ("origin",)
+        return rnd
+
+    def next(self) -> "_Round":
+        return _Round(
+            self,
+            self.best,
+            self.best_ride,
+            list(self.cost),
+            list(self.ride_cost),
+        )
+
+    def set_cost(self, stop: int, arrival: float, label: tuple) -> None:
+        self.cost[stop] = self.best[stop] = arrival
+        self.labels[stop] = label
+
+    def set_ride(self, stop: int, arrival: float, label: tuple) -> None:
+        self.ride_cost[stop] = self.best_ride[stop] = arrival
+        self.ride_labels[stop] = label
+        if arrival < self.best[stop]:
+            self.set_cost(stop, arrival, label)
+
+    @staticmethod
+    def find(rounds: list["_Round"], k: int, stop: int) -> tuple[int, tuple]:
+        """(round, label) of the latest label for stop at or before k."""
+        while stop not in rounds[k].labels:
+            k -= 1
+        return k, rounds[k].labels[stop]
@@ -0,0 +1,11 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class Leg:
+    mode: str  # "bus" or "walk"
+    from_halt_id: str
+    to_halt_id: str
+    distance_m: float
+    duration_s: float
+    route_id: str | None = None  # For bus legs
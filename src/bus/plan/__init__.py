@@ -0,0 +1,7 @@
+# bus.plan (auto generate by build_inits.py)
+# flake8: noqa: F408
+
+from bus.plan.Journey import Journey
+from bus.plan.JourneyGraph import JourneyGraph
+from bus.plan.JourneyPlanner import JourneyPlanner
+from bus.plan.Leg import Leg
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+
+from bus.core import Route
+from bus.db.ResolvedRoute import ResolvedRoute
+from utils_future.TileCache import TileCache
+
+
+class RouteMap:
+    """Matplotlib map of a route's halts over a tile basemap.
+
+    matplotlib and pyproj are imported on first render, so the caller
+    chooses the backend (e.g. "TkAgg" or "Agg") beforehand.
+    """
+
+    # Bump when the drawing changes, so cached renders are redone.
+    VERSION = 1
+
+    def __init__(self, route: Route, resolved: ResolvedRoute):
+        self.route = route
+        self.resolved = resolved
+
+    def content_hash(
+        self, basemap_source: str | None = None, has_tiles: bool = False
+    ) -> str:
+        """Hash of everything the rendered image depends on: the route,
+        its halts, the basemap's tile source, and whether any tiles were
+        drawn.
+        """
+        content = {
+            "version": RouteMap.VERSION,
+            "route": self.route.to_dict(),
+            "halts": [halt.to_dict() for halt in self.resolved.halts],
+            "basemap_source": basemap_source,
+            "has_tiles": has_tiles,
+        }
+        return hashlib.sha256(
+            json.dumps(content, sort_keys=True).encode()
+        ).hexdigest()
+
+    def save(self, img_path: str, tile_cache: TileCache | None) -> int:
+        """Render to img_path. Returns the number of basemap tiles drawn."""
+        import matplotlib.pyplot as plt
+
+        halts = self.resolved.halts
+        lats = self.resolved.latlngs[:, 0]
+        lngs = self.resolved.latlngs[:, 1]
+
+        fig, ax = plt.subplots(figsize=(8, 10))
+
+        try:
+            import pyproj
+
+            transformer = pyproj.Transformer.from_crs(
+                "EPSG:4326", "EPSG:3857", always_xy=True
+            )
+            xs, ys = transformer.transform(lngs, lats)
+        except Exception:
+            xs, ys = lngs, lats
+            transformer = None
+
+        # Draw lines segment by segment (last of one links to first of next)
+        offset = 0
+        for seg_halts in self.resolved.segment_halts:
+            n = len(seg_halts)
+            if n == 0:
+                continue
+            seg_xs = xs[offset : offset + n]
+            seg_ys = ys[offset : offset + n]
+            ax.plot(seg_xs, seg_ys, color="steelblue", linewidth=1.5, zorder=4)
+            # Link last halt of this segment to first halt of next segment
+            if offset + n < len(halts):
+                ax.plot(
+                    [xs[offset + n - 1], xs[offset + n]],
+                    [ys[offset + n - 1], ys[offset + n]],
+                    color="steelblue",
+                    linewidth=1.5,
+                    linestyle="dashed",
+                    zorder=4,
+                )
+            offset += n
+
+        ax.scatter(xs, ys, zorder=5, color="crimson", s=60)
+        for x, y, halt in zip(xs, ys, halts):
+            ax.annotate(
+                f"{halt.road_id} [{halt.road_index}]\n{halt.name}",
+                (x, y),
+                textcoords="offset points",
+                xytext=(6, 4),
+                fontsize=6,
+                zorder=6,
+            )
+
+        n_tiles = 0
+        if transformer is not None and tile_cache is not None:
+            x_lim, y_lim = ax.get_xlim(), ax.get_ylim()
+            n_images = len(ax.images)
+            try:
+                n_tiles = tile_cache.add_basemap(ax)
+            except Exception:
+                # A broken tile or cache still leaves a map, without a
+                # basemap.
+                for image in ax.images[n_images:]:
+                    image.remove()
+                ax.set_xlim(*x_lim)
+                ax.set_ylim(*y_lim)
+                n_tiles = 0
+
+        ax.set_title(f"Route {self.route.code} — {self.route.id}")
+        ax.set_axis_off()
+        fig.tight_layout()
+
+        os.makedirs(os.path.dirname(img_path), exist_ok=True)
+        fig.savefig(img_path, dpi=150, bbox_inches="tight")
+        plt.close(fig)
+        return n_tiles
@@ -0,0 +1,4 @@
+# bus.render (auto generate by build_inits.py)
+# flake8: noqa: F408
+
+from bus.render.RouteMap import RouteMap
@@ -0,0 +1,270 @@
+from typing import Iterator
+
+import numpy as np
+
+from bus.core import Bus
+from bus.db.ResolvedRoute import ResolvedRoute
+from bus.db.RouteProfile import RouteProfile
+from bus.sim.HaltEvent import HaltEvent
+from bus.track.GPSPing import GPSPing
+from utils_future import SpatialIndex
+
+
+class FleetSim:
+    """Buses moving along their routes, advanced together in fixed ticks.
+
+    A bus runs its route's halts (or its own road_segment_ids, if set)
+    from first to last: it waits start_s, arrives at the first halt,
+    dwells dwell_s at every halt but the last, and travels between halts
+    at speed_mps, scaled each tick by a random factor within
+    1 +/- speed_jitter. Its position is a distance along its path.
+
+    All state is in arrays, one entry per bus, and step() advances every
+    bus with array operations. Halts passed within a tick are handled by
+    repeating the pass for the buses that still have time left, so events
+    are exact regardless of dt_s. Runs with the same seed are identical.
+    """
+
+    ARRIVAL = 0
+    DEPARTURE = 1
+    EVENT_KINDS = ("arrival", "departure")
+
+    def __init__(
+        self,
+        db,
+        buses: list[Bus],
+        dwell_s: float = 20.0,
+        speed_mps: float = 20 / 3.6,
+        speed_jitter: float = 0.2,
+        start_s: np.ndarray | None = None,
+        seed: int = 0,
+    ):
+        if not 0 <= speed_jitter < 1:
+            raise ValueError("speed_jitter must be in [0, 1)")
+        self.buses = buses
+        self.dwell_s = dwell_s
+        self.speed_mps = speed_mps
+        self.speed_jitter = speed_jitter
+        self.rng = np.random.default_rng(seed)
+        self._build_paths(db)
+
+        n = len(buses)
+        self.t_s = 0.0
+        self.n_bus_ticks = 0
+        # Flat stop of the next halt to arrive at (or the current one).
+        self.stop = self.path_start[self.bus_path].copy()
+        self.stop_end = self.path_start[self.bus_path + 1]
+        self.pos_m = np.zeros(n)
+        # Time left waiting to start, or dwelling at the current halt.
+        self.hold_s = (
+            np.zeros(n)
+            if start_s is None
+            else np.array(start_s, dtype=np.float64)
+        )
+        self.at_halt = np.zeros(n, dtype=bool)
+        self.done = self.stop >= self.stop_end
+        self._event_chunks: list[tuple[np.ndarray, ...]] = []
+
+    def _build_paths(self, db) -> None:
+        """Flatten every distinct path into stop arrays.
+
+        Path p's stops are stop_halt[path_start[p]:path_start[p + 1]],
+        at stop_cum_m along the path. Consecutive repeats of a halt
+        (where segments meet) are one stop.
+        """
+        self.halt_ids: list[str] = []
+        halt_id_to_code: dict[str, int] = {}
+        path_keys: dict[tuple, int] = {}
+        stop_halt, stop_cum_m, stop_latlngs, path_start = [], [], [], [0]
+        self.bus_path = np.empty(len(self.buses), dtype=np.intp)
+        for i, bus in enumerate(self.buses):
+            key = (bus.route_id, tuple(bus.road_segment_ids))
+            if key not in path_keys:
+                path_keys[key] = len(path_keys)
+                previous = None
+                for halt, dist in self._halts_and_distances(db, bus):
+                    if halt.id == previous:
+                        continue
+                    previous = halt.id
+                    if halt.id not in halt_id_to_code:
+                        halt_id_to_code[halt.id] = len(self.halt_ids)
+                        self.halt_ids.append(halt.id)
+                    stop_halt.append(halt_id_to_code[halt.id])
+                    stop_cum_m.append(dist)
+                    stop_latlngs.append((halt.latlng.lat, halt.latlng.lng))
+                path_start.append(len(stop_halt))
+            self.bus_path[i] = path_keys[key]
+        self.stop_halt = np.array(stop_halt, dtype=np.intp)
+        self.stop_cum_m = np.array(stop_cum_m, dtype=np.float64)
+        self.stop_latlngs = np.array(stop_latlngs, dtype=np.float64).reshape(
+            -1, 2
+        )
+        self.path_start = np.array(path_start, dtype=np.intp)
+
+    @staticmethod
+    def _halts_and_distances(db, bus: Bus):
+        if not bus.road_segment_ids:
+            profile = db.route_profile(bus.route_id)
+        else:
+            profile = RouteProfile(
+                ResolvedRoute(
+                    route_id=bus.route_id,
+                    segment_halts=[
+                        db.route_resolver.segment_halts(seg_id)
+                        for seg_id in bus.road_segment_ids
+                    ],
+                )
+            )
+        return zip(profile.resolved.halts, profile.cum_dist_m.tolist())
+
+    def _record(self, t_s: np.ndarray, buses: np.ndarray, kind: int) -> None:
+        if len(buses):
+            self._event_chunks.append(
+                (
+                    t_s,
+                    buses,
+                    self.stop_halt[self.stop[buses]],
+                    np.full(len(buses), kind, dtype=np.int8),
+                )
+            )
+
+    def step(self, dt_s: float) -> None:
+        """Advance every bus by dt_s seconds."""
+        n = len(self.buses)
+        speed = self.speed_mps * (
+            1 + self.speed_jitter * (2 * self.rng.random(n) - 1)
+        )
+        t_end = self.t_s + dt_s
+        budget = np.where(self.done, 0.0, dt_s)
+        active = np.flatnonzero(budget > 0)
+        while len(active):
+            # Waiting or dwelling: spend time, then depart if at a halt.
+            holding = active[(self.hold_s[active] > 0) | self.at_halt[active]]
+            used = np.minimum(self.hold_s[holding], budget[holding])
+            self.hold_s[holding] -= used
+            budget[holding] -= used
+            released = holding[self.hold_s[holding] <= 0]
+            departing = released[self.at_halt[released]]
+            self._record(t_end - budget[departing], departing, self.DEPARTURE)
+            self.at_halt[departing] = False
+            self.stop[departing] += 1
+
+            # Travelling: arrive at the next halt, or run out of time.
+            moving = active[
+                ~self.at_halt[active]
+                & (self.hold_s[active] <= 0)
+                & (budget[active] > 0)
+            ]
+            gap_m = self.stop_cum_m[self.stop[moving]] - self.pos_m[moving]
+            need_s = gap_m / speed[moving]
+            reach = need_s <= budget[moving]
+            arriving, cruising = moving[reach], moving[~reach]
+            self.pos_m[arriving] += gap_m[reach]
+            budget[arriving] -= need_s[reach]
+            self._record(t_end - budget[arriving], arriving, self.ARRIVAL)
+            last = self.stop[arriving] + 1 >= self.stop_end[arriving]
+            self.done[arriving[last]] = True
+            budget[arriving[last]] = 0.0
+            self.at_halt[arriving[~last]] = True
+            self.hold_s[arriving[~last]] = self.dwell_s
+            self.pos_m[cruising] += speed[cruising] * budget[cruising]
+            budget[cruising] = 0.0
+
+            active = active[budget[active] > 0]
+        self.t_s = t_end
+        self.n_bus_ticks += n
+
+    def run(self, duration_s: float, dt_s: float = 1.0) -> None:
+        """Step until duration_s has passed or every bus is done."""
+        t_stop = self.t_s + duration_s
+        while self.t_s < t_stop and not self.done.all():
+            self.step(min(dt_s, t_stop - self.t_s))
+
+    def pings(
+        self, duration_s: float, interval_s: float = 10.0, noise_m: float = 0.0
+    ) -> Iterator[GPSPing]:
+        """Run on for duration_s, yielding a GPS ping from every bus in
+        service (started, not done) every interval_s, with Gaussian noise
+        of noise_m. Bus i reports as "bus-<i>".
+        """
+        t_stop = self.t_s + duration_s
+        while self.t_s < t_stop and not self.done.all():
+            self.step(min(interval_s, t_stop - self.t_s))
+            latlngs = self.latlngs()
+            noise_deg = (
+                self.rng.normal(0.0, noise_m, latlngs.shape)
+                / SpatialIndex.M_PER_DEG
+            )
+            noise_deg[:, 1] /= np.cos(np.radians(latlngs[:, 0]))
+            latlngs += noise_deg
+            waiting = ~self.at_halt & (self.hold_s > 0)
+            for i in np.flatnonzero(~self.done & ~waiting).tolist():
+                yield GPSPing(
+                    bus_id=f"bus-{i}",
+                    t_s=self.t_s,
+                    lat=float(latlngs[i, 0]),
+                    lng=float(latlngs[i, 1]),
+                )
+
+    # -----------------------------------------------------------------------
+    # Results
+    # -----------------------------------------------------------------------
+
+    def event_arrays(self) -> dict[str, np.ndarray]:
+        """Every event so far as columns (t_s, bus_index, halt_code, kind),
+        ordered by time, then bus. halt_code indexes halt_ids.
+        """
+        if not self._event_chunks:
+            return {
+                "t_s": np.empty(0),
+                "bus_index": np.empty(0, dtype=np.intp),
+                "halt_code": np.empty(0, dtype=np.intp),
+                "kind": np.empty(0, dtype=np.int8),
+            }
+        t_s, buses, halt_codes, kinds = (
+            np.concatenate(column) for column in zip(*self._event_chunks)
+        )
+        # Stable, so a bus's arrival and departure at one instant keep
+        # their order.
+        order = np.lexsort((buses, t_s))
+        return {
+            "t_s": t_s[order],
+            "bus_index": buses[order],
+            "halt_code": halt_codes[order],
+            "kind": kinds[order],
+        }
+
+    def events(self) -> list[HaltEvent]:
+        arrays = self.event_arrays()
+        return [
+            HaltEvent(
+                t_s=t_s,
+                bus_index=bus_index,
+                halt_id=self.halt_ids[halt_code],
+                kind=FleetSim.EVENT_KINDS[kind],
+            )
+            for t_s, bus_index, halt_code, kind in zip(
+                arrays["t_s"].tolist(),
+                arrays["bus_index"].tolist(),
+                arrays["halt_code"].tolist(),
+                arrays["kind"].tolist(),
+            )
+        ]
+
+    def latlngs(self) -> np.ndarray:
+        """(n_buses, 2) array of each bus's [lat, lng], interpolated
+        between the halts either side of it. NaN for a bus with no halts.
+        """
+        start = self.path_start[self.bus_path]
+        prev = np.maximum(self.stop - 1, start)
+        next_ = np.maximum(np.minimum(self.stop, self.stop_end - 1), start)
+        gap_m = self.stop_cum_m[next_] - self.stop_cum_m[prev]
+        t = np.ones(len(self.buses))
+        np.divide(
+            self.pos_m - self.stop_cum_m[prev], gap_m, out=t, where=gap_m > 0
+        )
+        latlngs = (1 - t)[:, np.newaxis] * self.stop_latlngs[prev] + t[
+            :, np.newaxis
+        ] * self.stop_latlngs[next_]
+        latlngs[start == self.stop_end] = np.nan
+        return latlngs
@@ -0,0 +1,9 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class HaltEvent:
+    t_s: float
+    bus_index: int  # Index into the simulated buses
+    halt_id: str
+    kind: str  # "arrival" or "departure"
@@ -0,0 +1,259 @@
+import math
+
+import numpy as np
+
+from bus.core import Halt, Road, RoadSegment, Route
+from bus.db.BusDB import BusDB
+from bus.db.Transaction import Transaction
+from bus.db.Validator import Validator
+from utils_future import LatLng, SpatialIndex
+
+
+class SyntheticDB:
+    """A generated city of roads, halts, road segments and routes, of any
+    size, that passes Validator.
+
+    Roads are laid out in districts. Each district is a square grid in
+    which every road crosses every road perpendicular to it: horizontal
+    roads run E or W, vertical ones N or S, alternately. Halts are
+    halt_spacing_m apart (each moved along its road by up to
+    spacing_jitter of that), on the side of the road, so the two halts
+    at a crossing are distinct. Every halts_per_segment - 1 halts there
+    is a crossing, and a halt named after the crossing road.
+
+    Each road is cut into road segments from crossing to crossing.
+    Routes are random walks over them, going straight or turning at
+    crossings, always in the direction of the road. halts_per_road is
+    rounded up so that roads split evenly into segments.
+    """
+
+    ORIGIN = LatLng(lat=6.8, lng=79.8)
+    # Halts sit this far from the centre line of their road.
+    SIDE_OFFSET_M = 10.0
+    # Chance of turning at a crossing, when going straight is possible.
+    TURN_PROBABILITY = 0.3
+
+    def __init__(
+        self,
+        n_roads: int = 20,
+        halts_per_road: int = 41,
+        halts_per_segment: int = 5,
+        n_routes: int = 10,
+        segments_per_route: int = 8,
+        halt_spacing_m: float = 400.0,
+        spacing_jitter: float = 0.2,
+        seed: int = 0,
+    ):
+        if halts_per_road < 2 or halts_per_segment < 2:
+            raise ValueError("roads and segments need at least 2 halts")
+        if not 0 <= spacing_jitter < 0.5:
+            raise ValueError("spacing_jitter must be in [0, 0.5)")
+        if (
+            halt_spacing_m * (1 + 2 * spacing_jitter)
+            > Validator.MAX_HALT_SPACING_M
+        ):
+            raise ValueError(
+                "halt_spacing_m with jitter exceeds "
+                f"{Validator.MAX_HALT_SPACING_M:g} m"
+            )
+        self.n_roads = n_roads
+        self.halts_per_segment = halts_per_segment
+        self.n_routes = n_routes
+        self.segments_per_route = segments_per_route
+        self.halt_spacing_m = halt_spacing_m
+        self.spacing_jitter = spacing_jitter
+        self.seed = seed
+
+        k = halts_per_segment - 1
+        self.n_segments_per_road = math.ceil((halts_per_road - 1) / k)
+        self.n_steps = self.n_segments_per_road * k
+        self.halts_per_road = self.n_steps + 1
+        # Roads each way per district: one per crossing along a road.
+        self.n_lines = self.n_segments_per_road + 1
+        self.n_districts = math.ceil(n_roads / (2 * self.n_lines))
+        self.n_district_cols = math.ceil(math.sqrt(self.n_districts))
+
+    @property
+    def n_halts(self) -> int:
+        return self.n_roads * self.halts_per_road
+
+    @property
+    def n_road_segments(self) -> int:
+        return self.n_roads * self.n_segments_per_road
+
+    # -----------------------------------------------------------------------
+    # Layout
+    # -----------------------------------------------------------------------
+
+    def _road_place(self, r: int) -> tuple[int, bool, int]:
+        """(district, is horizontal, line) of road r."""
+        district, local = divmod(r, 2 * self.n_lines)
+        return district, local % 2 == 0, local // 2
+
+    def _road_number(self, district: int, horizontal: bool, line: int):
+        """The road at a place, or None if there are not that many."""
+        r = district * 2 * self.n_lines + 2 * line + (not horizontal)
+        return r if r < self.n_roads else None
+
+    def road(self, r: int) -> Road:
+        district, horizontal, line = self._road_place(r)
+        if horizontal:
+            return Road(
+                name=f"Main {district}-{line} Rd",
+                direction="EW"[line % 2],
+            )
+        return Road(
+            name=f"Cross {district}-{line} St", direction="NS"[line % 2]
+        )
+
+    def _forward(self, road: Road) -> bool:
+        return road.direction in ("E", "N")
+
+    def _grid_step(self, road: Road, road_index: int) -> int:
+        """Steps from the district's west or south edge, along the road."""
+        return road_index if self._forward(road) else self.n_steps - road_index
+
+    def _latlngs(self, r: int, rng: np.random.Generator) -> np.ndarray:
+        """(lat, lng) of each halt on road r, by road_index."""
+        district, horizontal, line = self._road_place(r)
+        road = self.road(r)
+        k = self.halts_per_segment - 1
+        district_m = (self.n_steps + 2 * k) * self.halt_spacing_m
+        row, col = divmod(district, self.n_district_cols)
+
+        steps = np.array(
+            [self._grid_step(road, i) for i in range(self.halts_per_road)]
+        )
+        jitter = rng.uniform(
+            -self.spacing_jitter, self.spacing_jitter, len(steps)
+        )
+        # Crossings stay put, so that their halts line up.
+        jitter[steps % k == 0] = 0.0
+        along_m = (steps + jitter) * self.halt_spacing_m
+        across_m = line * k * self.halt_spacing_m + SyntheticDB.SIDE_OFFSET_M
+        x_m, y_m = (along_m, across_m) if horizontal else (across_m, along_m)
+        x_m = x_m + col * district_m
+        y_m = y_m + row * district_m
+
+        m_per_deg = SpatialIndex.M_PER_DEG
+        lat0, lng0 = SyntheticDB.ORIGIN.lat, SyntheticDB.ORIGIN.lng
+        lats = lat0 + np.broadcast_to(y_m, steps.shape) / m_per_deg
+        lngs = lng0 + np.broadcast_to(x_m, steps.shape) / (
+            m_per_deg * math.cos(math.radians(lat0))
+        )
+        return np.column_stack([lats, lngs])
+
+    def _crossing(self, r: int, road_index: int) -> tuple[int, int] | None:
+        """(crossing road, its road_index there) at a halt of road r, if
+        the halt is at a crossing.
+        """
+        k = self.halts_per_segment - 1
+        step = self._grid_step(self.road(r), road_index)
+        if step % k != 0:
+            return None
+        district, horizontal, line = self._road_place(r)
+        other = self._road_number(district, not horizontal, step // k)
+        if other is None:
+            return None
+        return other, self._grid_step(self.road(other), line * k)
+
+    # -----------------------------------------------------------------------
+    # Entities
+    # -----------------------------------------------------------------------
+
+    def halts(self, r: int, rng: np.random.Generator) -> list[Halt]:
+        road = self.road(r)
+        halts = []
+        for road_index, (lat, lng) in enumerate(
+            self._latlngs(r, rng).tolist()
+        ):
+            crossing = self._crossing(r, road_index)
+            name = (
+                f"& {self.road(crossing[0]).name}"
+                if crossing is not None
+                else f"Halt {road_index}"
+            )
+            halts.append(
+                Halt(
+                    road_id=road.id,
+                    road_index=road_index,
+                    name=name,
+                    latlng=LatLng(lat=lat, lng=lng),
+                )
+            )
+        return halts
+
+    def road_segment(self, r: int, i_segment: int) -> RoadSegment:
+        k = self.halts_per_segment - 1
+        return RoadSegment(
+            road_id=self.road(r).id,
+            start_road_index=i_segment * k,
+            end_road_index=(i_segment + 1) * k,
+        )
+
+    def route(self, i_route: int, rng: np.random.Generator) -> Route:
+        """A random walk over road segments, straight on or turning at the
+        crossing at the end of each, never reusing one.
+        """
+        k = self.halts_per_segment - 1
+        r = int(rng.integers(self.n_roads))
+        i_segment = int(rng.integers(self.n_segments_per_road))
+        walk = [(r, i_segment)]
+        while len(walk) < self.segments_per_route:
+            options = []
+            if i_segment + 1 < self.n_segments_per_road:
+                options.append((r, i_segment + 1))
+            crossing = self._crossing(r, (i_segment + 1) * k)
+            if (
+                crossing is not None
+                and crossing[1] // k < self.n_segments_per_road
+            ):
+                turn = (crossing[0], crossing[1] // k)
+                if rng.random() < SyntheticDB.TURN_PROBABILITY:
+                    options.insert(0, turn)
+                else:
+                    options.append(turn)
+            options = [option for option in options if option not in walk]
+            if not options:
+                break
+            r, i_segment = options[0]
+            walk.append((r, i_segment))
+
+        return Route(
+            code=str(i_route + 1),
+            direction=self.road(walk[0][0]).direction,
+            road_segment_id_list=[
+                self.road_segment(r, i_segment).id for r, i_segment in walk
+            ],
+        )
+
+    # -----------------------------------------------------------------------
+    # Writing
+    # -----------------------------------------------------------------------
+
+    def transaction(self) -> Transaction:
+        """Every entity, staged for one commit. The same seed always gives
+        the same DB.
+        """
+        rng = np.random.default_rng(self.seed)
+        tx = Transaction()
+        for r in range(self.n_roads):
+            road = self.road(r)
+            tx.write(BusDB.ROADS, road.id, road.to_dict())
+            for halt in self.halts(r, rng):
+                tx.write(BusDB.HALTS, halt.id, halt.to_dict())
+            for i_segment in range(self.n_segments_per_road):
+                seg = self.road_segment(r, i_segment)
+                tx.write(BusDB.ROAD_SEGMENTS, seg.id, seg.to_dict())
+        for i_route in range(self.n_routes):
+            route = self.route(i_route, rng)
+            tx.write(BusDB.ROUTES, route.id, route.to_dict())
+        return tx
+
+    def write(self, path: str) -> int:
+        """Write the DB to a db/ directory or an SQLite file (which should
+        not hold another DB). Returns the number of entities written.
+        """
+        tx = self.transaction()
+        BusDB.open_store(path).commit(tx)
+        return len(tx)
@@ -0,0 +1,6 @@
+# bus.sim (auto generate by build_inits.py)
+# flake8: noqa: F408
+
+from bus.sim.FleetSim import FleetSim
+from bus.sim.HaltEvent import HaltEvent
+from bus.sim.SyntheticDB import SyntheticDB
@@ -0,0 +1,358 @@
+from bisect import bisect_right
+
+import numpy as np
+
+from bus.track.MapMatcher import MapMatcher
+from bus.track.MatchedPing import MatchedPing
+from utils_future.RollingWindow import RollingWindow
+
+
+class ETAPredictor:
+    """Arrival time estimates for every halt ahead of every tracked bus.
+
+    Fed matched pings (from a MapMatcher over the same DB), it keeps a
+    rolling window of observed travel times for each halt pair, from a
+    bus's arrival at one halt to its arrival at the next (so dwell is
+    included), and of observed speeds for each road segment. A pair's
+    expected time is the quantile q of its window once it has
+    min_samples; until then, its distance at its segment's speed (or at
+    default_speed_mps) plus dwell_s.
+
+    Expected times are cached per route edge, and each route also caches
+    them as cumulative seconds from its first halt, so an ETA is one
+    subtraction. A new sample only marks the edges it affects stale; they
+    are recomputed, and the route's cumulative times rebuilt, on the
+    route's next query. Each route keeps its buses as rows of arrays; a
+    ping only marks its bus's row stale.
+    """
+
+    def __init__(
+        self,
+        matcher: MapMatcher,
+        window_size: int = 64,
+        min_samples: int = 3,
+        q: float = 0.5,
+        default_speed_mps: float = 20 / 3.6,
+        dwell_s: float = 20.0,
+    ):
+        self.matcher = matcher
+        self.window_size = window_size
+        self.min_samples = min_samples
+        self.q = q
+        self.default_speed_mps = default_speed_mps
+        self.dwell_s = dwell_s
+
+        self.route_id_to_track = {
+            track.route_id: i for i, track in enumerate(matcher.tracks)
+        }
+        # (from_halt_id, to_halt_id) -> travel times, and road_segment_id
+        # -> speeds; each with the (track, edge)s they cover.
+        self.pair_stats: dict[tuple[str, str], RollingWindow] = {}
+        self.segment_stats: dict[str, RollingWindow] = {}
+        self.pair_edges: dict[tuple[str, str], list[tuple[int, int]]] = {}
+        self.segment_edges: dict[str, list[tuple[int, int]]] = {}
+        for i, track in enumerate(matcher.tracks):
+            for edge, seg_id in enumerate(track.edge_segment_ids):
+                pair = self._pair(i, edge)
+                self.pair_edges.setdefault(pair, []).append((i, edge))
+                self.segment_edges.setdefault(seg_id, []).append((i, edge))
+
+        # track -> expected seconds along each edge, and cumulative to
+        # each stop
+        self.edge_s = [
+            np.array([self.pair_s(i, e) for e in range(len(track.edges))])
+            for i, track in enumerate(matcher.tracks)
+        ]
+        self.cum_s: dict[int, np.ndarray] = {}
+        # track -> edges to recompute before its next query
+        self.stale_edges: dict[int, set[int]] = {
+            i: set() for i in range(len(matcher.tracks))
+        }
+        # bus_id -> (track, distance_m, t_s) at its last matched ping, and
+        # (track, stop, t_s) of its last arrival.
+        self.positions: dict[str, tuple[int, float, float]] = {}
+        self.last_arrivals: dict[str, tuple[int, int, float]] = {}
+        # track -> halt_id -> its stops on the track, in order (a route
+        # may pass a halt more than once).
+        self.track_stops: list[dict[str, list[int]]] = [
+            {} for _ in matcher.tracks
+        ]
+        for i, track in enumerate(matcher.tracks):
+            for stop, halt_id in enumerate(track.halt_ids):
+                self.track_stops[i].setdefault(halt_id, []).append(stop)
+        # track -> buses last seen on it, for next_buses().
+        self.fleets = [_Fleet() for _ in matcher.tracks]
+
+    # -----------------------------------------------------------------------
+    # Observing
+    # -----------------------------------------------------------------------
+
+    def _pair(self, i: int, edge: int) -> tuple[str, str]:
+        halt_ids = self.matcher.tracks[i].halt_ids
+        return halt_ids[edge], halt_ids[edge + 1]
+
+    def _has_samples(self, window: RollingWindow | None) -> bool:
+        return window is not None and len(window) >= self.min_samples
+
+    def _add_sample(self, i: int, edge: int, travel_s: float) -> None:
+        track = self.matcher.tracks[i]
+        pair = self._pair(i, edge)
+        seg_id = track.edge_segment_ids[edge]
+        if pair not in self.pair_stats:
+            self.pair_stats[pair] = RollingWindow(self.window_size)
+        self.pair_stats[pair].add(travel_s)
+        changed = list(self.pair_edges[pair])
+
+        edge_m = track.cum_m[edge + 1] - track.cum_m[edge]
+        if edge_m > 0 and travel_s > self.dwell_s:
+            if seg_id not in self.segment_stats:
+                self.segment_stats[seg_id] = RollingWindow(self.window_size)
+            self.segment_stats[seg_id].add(edge_m / (travel_s - self.dwell_s))
+            # Only edges without enough samples of their own use it.
+            changed += [
+                (j, e)
+                for j, e in self.segment_edges[seg_id]
+                if not self._has_samples(self.pair_stats.get(self._pair(j, e)))
+            ]
+        for j, e in changed:
+            self.stale_edges.setdefault(j, set()).add(e)
+
+    def _arrival_stop(
+        self, i: int, halt_id: str, dist_m: float, last_stop: int | None
+    ) -> int:
+        """The stop on track i of an arrival at halt_id: its first after
+        last_stop, if any, or else its last one the bus has reached.
+        """
+        stops = self.track_stops[i][halt_id]
+        if last_stop is not None:
+            k = bisect_right(stops, last_stop)
+            if k < len(stops):
+                return stops[k]
+        cum_m = self.matcher.tracks[i].cum_m
+        reached = [
+            stop
+            for stop in stops
+            if cum_m[stop] - self.matcher.arrival_radius_m <= dist_m
+        ]
+        return reached[-1] if reached else stops[0]
+
+    def observe(self, matched: MatchedPing) -> None:
+        bus_id = matched.ping.bus_id
+        previous = self.positions.pop(bus_id, None)
+        i = (
+            None
+            if matched.route_id is None
+            else self.route_id_to_track[matched.route_id]
+        )
+        if previous is not None and previous[0] != i:
+            self.fleets[previous[0]].remove(bus_id)
+        if i is None:
+            self.last_arrivals.pop(bus_id, None)
+            return
+        self.positions[bus_id] = (i, matched.distance_m, matched.ping.t_s)
+        self.fleets[i].put(bus_id, matched.distance_m, matched.ping.t_s)
+
+        halt_ids = self.matcher.tracks[i].halt_ids
+        for arrival in matched.arrivals:
+            last = self.last_arrivals.get(bus_id)
+            if last is not None and last[0] != i:
+                last = None
+            if (
+                last is not None
+                and last[1] + 1 < len(halt_ids)
+                and halt_ids[last[1] + 1] == arrival.halt_id
+            ):
+                stop = last[1] + 1
+                self._add_sample(i, last[1], arrival.t_s - last[2])
+            else:
+                stop = self._arrival_stop(
+                    i,
+                    arrival.halt_id,
+                    matched.distance_m,
+                    None if last is None else last[1],
+                )
+            self.last_arrivals[bus_id] = (i, stop, arrival.t_s)
+
+    # -----------------------------------------------------------------------
+    # Cache
+    # -----------------------------------------------------------------------
+
+    def pair_s(self, i: int, edge: int) -> float:
+        """Expected seconds from arriving at stop edge to arriving at the
+        next stop, on track i.
+        """
+        track = self.matcher.tracks[i]
+        window = self.pair_stats.get(self._pair(i, edge))
+        if self._has_samples(window):
+            return window.quantile(self.q)
+        speed_mps = self.default_speed_mps
+        window = self.segment_stats.get(track.edge_segment_ids[edge])
+        if self._has_samples(window):
+            speed_mps = window.quantile(self.q)
+        edge_m = track.cum_m[edge + 1] - track.cum_m[edge]
+        return edge_m / speed_mps + self.dwell_s
+
+    def _cum_s(self, i: int) -> np.ndarray:
+        stale_edges = self.stale_edges.pop(i, None)
+        if stale_edges is not None:
+            for edge in stale_edges:
+                self.edge_s[i][edge] = self.pair_s(i, edge)
+            self.cum_s[i] = np.concatenate(([0.0], np.cumsum(self.edge_s[i])))
+            self.fleets[i].all_stale = True
+        return self.cum_s[i]
+
+    def _fleet(self, i: int) -> tuple[list[str], np.ndarray, np.ndarray]:
+        """(bus_ids, first stop ahead, t_s less expected seconds from the
+        first stop) of the buses on track i, with stale rows updated.
+        """
+        cum_s = self._cum_s(i)
+        fleet = self.fleets[i]
+        n = len(fleet.bus_ids)
+        if fleet.all_stale:
+            rows = np.arange(n)
+        else:
+            rows = np.fromiter(fleet.stale_rows, dtype=np.intp)
+        fleet.all_stale = False
+        fleet.stale_rows.clear()
+        if len(rows):
+            track = self.matcher.tracks[i]
+            cum_m = np.asarray(track.cum_m)
+            dist_m = fleet.dist_m[rows]
+            edge = np.clip(
+                np.searchsorted(cum_m, dist_m, side="right") - 1,
+                0,
+                len(track.edges) - 1,
+            )
+            edge_m = cum_m[edge + 1] - cum_m[edge]
+            share = np.zeros(len(rows))
+            np.divide(
+                dist_m - cum_m[edge], edge_m, out=share, where=edge_m > 0
+            )
+            share = np.minimum(share, 1.0)
+            progress_s = cum_s[edge] + share * (cum_s[edge + 1] - cum_s[edge])
+            fleet.ahead[rows] = np.searchsorted(cum_m, dist_m, side="right")
+            fleet.base_s[rows] = fleet.t_s[rows] - progress_s
+        return fleet.bus_ids, fleet.ahead[:n], fleet.base_s[:n]
+
+    # -----------------------------------------------------------------------
+    # Queries
+    # -----------------------------------------------------------------------
+
+    def _progress_s(self, i: int, dist_m: float) -> tuple[int, float]:
+        """(first stop ahead, expected seconds from the first stop to a
+        bus at dist_m).
+        """
+        track = self.matcher.tracks[i]
+        cum_s = self._cum_s(i)
+        edge = min(
+            max(0, bisect_right(track.cum_m, dist_m) - 1),
+            len(track.edges) - 1,
+        )
+        edge_m = track.cum_m[edge + 1] - track.cum_m[edge]
+        share = 0.0
+        if edge_m > 0:
+            share = min(1.0, (dist_m - track.cum_m[edge]) / edge_m)
+        progress_s = cum_s[edge] + share * (cum_s[edge + 1] - cum_s[edge])
+        return bisect_right(track.cum_m, dist_m), progress_s
+
+    def etas(self, bus_id: str) -> tuple[list[str], np.ndarray]:
+        """(halt_ids, arrival times) of every halt ahead of a bus, as
+        estimated at its last ping.
+        """
+        if bus_id not in self.positions:
+            return [], np.empty(0)
+        i, dist_m, t_s = self.positions[bus_id]
+        stop, progress_s = self._progress_s(i, dist_m)
+        return (
+            self.matcher.tracks[i].halt_ids[stop:],
+            t_s + self._cum_s(i)[stop:] - progress_s,
+        )
+
+    def next_buses(
+        self, halt_id: str, now_s: float, limit: int = 5
+    ) -> list[tuple[float, str, str]]:
+        """(minutes until arrival, bus_id, route_id) of the next buses at a
+        halt, soonest first. Estimates already past count as now.
+        """
+        results = []
+        for i, stop in self.matcher.halt_stops.get(halt_id, ()):
+            bus_ids, ahead, base_s = self._fleet(i)
+            rows = np.flatnonzero(ahead <= stop)
+            eta_s = np.maximum(now_s, base_s[rows] + self._cum_s(i)[stop])
+            # Only the soonest `limit` can make the cut.
+            if len(rows) > limit:
+                keep = np.argpartition(eta_s, limit - 1)[:limit]
+                rows, eta_s = rows[keep], eta_s[keep]
+            route_id = self.matcher.tracks[i].route_id
+            results += [
+                ((t_s - now_s) / 60, bus_ids[row], route_id)
+                for row, t_s in zip(rows.tolist(), eta_s.tolist())
+            ]
+        return sorted(results)[:limit]
+
+
+class _Fleet:
+    """The buses last seen on one track, one row each, with the arrays
+    next_buses() reads: first stop ahead, and t_s less expected seconds
+    from the first stop. Rows whose bus moved are listed in stale_rows;
+    all_stale is set when the track's expected times change.
+    """
+
+    __slots__ = (
+        "bus_ids",
+        "rows",
+        "dist_m",
+        "t_s",
+        "ahead",
+        "base_s",
+        "stale_rows",
+        "all_stale",
+    )
+
+    ARRAYS = ["dist_m", "t_s", "ahead", "base_s"]
+
+    def __init__(self):
+        self.bus_ids: list[str] = []
+        self.rows: dict[str, int] = {}
+        # Sized to capacity; only the first len(bus_ids) rows are used.
+        self.dist_m = np.empty(0)
+        self.t_s = np.empty(0)
+        self.ahead = np.empty(0, dtype=np.intp)
+        self.base_s = np.empty(0)
+        self.stale_rows: set[int] = set()
+        self.all_stale = False
+
+    def put(self, bus_id: str, dist_m: float, t_s: float) -> None:
+        """Add a bus, or update its row."""
+        row = self.rows.get(bus_id)
+        if row is None:
+            row = len(self.bus_ids)
+            if row == len(self.dist_m):
+                for name in _Fleet.ARRAYS:
+                    array = getattr(self, name)
+                    grown = np.empty(max(8, 2 * len(array)), array.dtype)
+                    grown[:row] = array
+                    setattr(self, name, grown)
+            self.rows[bus_id] = row
+            self.bus_ids.append(bus_id)
+        self.dist_m[row] = dist_m
+        self.t_s[row] = t_s
+        self.stale_rows.add(row)
+
+    def remove(self, bus_id: str) -> None:
+        """Drop a bus, moving the last row into its place."""
+        row = self.rows.pop(bus_id)
+        last = len(self.bus_ids) - 1
+        last_stale = last in self.stale_rows
+        self.stale_rows.discard(row)
+        self.stale_rows.discard(last)
+        if row != last:
+            moved = self.bus_ids[last]
+            self.bus_ids[row] = moved
+            self.rows[moved] = row
+            for name in _Fleet.ARRAYS:
+                array = getattr(self, name)
+                array[row] = array[last]
+            if last_stale:
+                self.stale_rows.add(row)
+        self.bus_ids.pop()
@@ -0,0 +1,9 @@
+from dataclasses import dataclass
+
+
+@dataclass(slots=True)
+class GPSPing:
+    bus_id: str
+    t_s: float
+    lat: float
+    lng: float
@@ -0,0 +1,9 @@
+from dataclasses import dataclass
+
+
+@dataclass(slots=True)
+class HaltArrival:
+    bus_id: str
+    route_id: str
+    halt_id: str
+    t_s: float  # Interpolated between the pings either side
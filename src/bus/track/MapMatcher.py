@@ -0,0 +1,325 @@
+import math
+from bisect import bisect_left, bisect_right
+from typing import Iterable, Iterator
+
+from bus.track.GPSPing import GPSPing
+from bus.track.HaltArrival import HaltArrival
+from bus.track.MatchedPing import MatchedPing
+from utils_future import LatLng, SpatialIndex
+
+
+class MapMatcher:
+    """Snaps a stream of GPS pings to route positions, one ping at a time.
+
+    Each route is a polyline through its halts. A bus's first ping is
+    matched globally: points sampled every 2 * max_snap_m along every
+    distinct edge are kept in a spatial index, and each edge with a
+    sample near the ping, and within max_snap_m of it, becomes a
+    hypothesis (route, distance along it). The search radius depends
+    only on max_snap_m, not on the longest edge. Later pings only test,
+    for each surviving hypothesis, the edges a bus could have reached
+    since the last ping. The reported route is the hypothesis with the
+    lowest decayed snap distance. If every hypothesis fails, or the bus
+    was silent for max_gap_s, it is matched globally again.
+
+    A halt arrival is emitted when a bus, on its reported route, first
+    comes within arrival_radius_m of the halt's position along it.
+    """
+
+    M_PER_DEG = SpatialIndex.M_PER_DEG
+    # Weight of past snap distances in a hypothesis' cost.
+    COST_DECAY = 0.5
+
+    def __init__(
+        self,
+        db,
+        max_snap_m: float = 50.0,
+        max_speed_mps: float = 25.0,
+        back_m: float = 30.0,
+        arrival_radius_m: float = 25.0,
+        max_gap_s: float = 300.0,
+    ):
+        self.max_snap_m = max_snap_m
+        self.max_speed_mps = max_speed_mps
+        self.back_m = back_m
+        self.arrival_radius_m = arrival_radius_m
+        self.max_gap_s = max_gap_s
+
+        tracks = (_Track.build(db, route_id) for route_id in db.routes)
+        self.tracks = [track for track in tracks if track.edges]
+        # halt_id -> [(track, stop)]
+        self.halt_stops: dict[str, list[tuple[int, int]]] = {}
+        for i, track in enumerate(self.tracks):
+            for stop, halt_id in enumerate(track.halt_ids):
+                self.halt_stops.setdefault(halt_id, []).append((i, stop))
+
+        # Samples every sample_m along each distinct edge (pair of halts),
+        # keyed by the edge's position in edge_uses: [(track, edge)] of
+        # every route along it.
+        self.sample_m = 2 * max_snap_m
+        self.edge_index = SpatialIndex(cell_size_m=2 * max_snap_m)
+        self.edge_uses: list[list[tuple[int, int]]] = []
+        edge_keys: dict[tuple[str, str], int] = {}
+        for i, track in enumerate(self.tracks):
+            for edge in range(len(track.edges)):
+                halt_pair = (track.halt_ids[edge], track.halt_ids[edge + 1])
+                if halt_pair not in edge_keys:
+                    edge_keys[halt_pair] = len(self.edge_uses)
+                    self.edge_uses.append([])
+                    for n, latlng in enumerate(
+                        track.samples(edge, self.sample_m)
+                    ):
+                        self.edge_index.add(
+                            f"{edge_keys[halt_pair]}-{n}", latlng
+                        )
+                self.edge_uses[edge_keys[halt_pair]].append((i, edge))
+        # A point within max_snap_m of an edge is within this of a sample.
+        self.search_radius_m = max_snap_m + self.sample_m / 2
+        self.buses: dict[str, _BusState] = {}
+
+    # -----------------------------------------------------------------------
+    # Matching
+    # -----------------------------------------------------------------------
+
+    def _match_global(self, ping: GPSPing) -> dict[int, list]:
+        """Hypotheses, by track, from the edges sampled near the ping."""
+        best: dict[int, tuple[float, float, int]] = {}
+        edge_keys = {
+            int(key.partition("-")[0])
+            for key, _ in self.edge_index.query_radius(
+                LatLng(ping.lat, ping.lng), self.search_radius_m
+            )
+        }
+        for edge_key in sorted(edge_keys):
+            uses = self.edge_uses[edge_key]
+            # Every use is the same line, so one projection serves all.
+            i, edge = uses[0]
+            snap_m, _ = self.tracks[i].project(edge, ping)
+            if snap_m > self.max_snap_m:
+                continue
+            for i, edge in uses:
+                snap_m, dist_m = self.tracks[i].project(edge, ping)
+                if snap_m < best.get(i, (math.inf,))[0]:
+                    best[i] = (snap_m, dist_m, edge)
+        return {
+            i: [dist_m, snap_m, self._stop_after(i, dist_m), snap_m, edge]
+            for i, (snap_m, dist_m, edge) in best.items()
+        }
+
+    def _stop_after(self, i: int, dist_m: float) -> int:
+        """First stop not yet arrived at, for a bus at dist_m."""
+        return bisect_left(
+            self.tracks[i].cum_m, dist_m - self.arrival_radius_m
+        )
+
+    def _match_local(
+        self, i: int, hypothesis: list, ping: GPSPing, dt_s: float
+    ) -> bool:
+        """Advance a hypothesis to the ping, or return False if no edge it
+        could have reached is within max_snap_m.
+        """
+        track = self.tracks[i]
+        dist_m = hypothesis[0]
+        first = max(0, bisect_right(track.cum_m, dist_m - self.back_m) - 1)
+        last = min(
+            len(track.edges),
+            bisect_left(
+                track.cum_m,
+                dist_m + self.max_speed_mps * dt_s + self.max_snap_m,
+            ),
+        )
+        best_snap_m, best_dist_m, best_edge = math.inf, None, None
+        for edge in range(first, max(last, first + 1)):
+            snap_m, edge_dist_m = track.project(edge, ping)
+            if snap_m < best_snap_m:
+                best_snap_m, best_dist_m, best_edge = snap_m, edge_dist_m, edge
+        if best_snap_m > self.max_snap_m:
+            return False
+        hypothesis[0] = max(best_dist_m, dist_m - self.back_m)
+        hypothesis[1] = MapMatcher.COST_DECAY * hypothesis[1] + best_snap_m
+        hypothesis[3], hypothesis[4] = best_snap_m, best_edge
+        return True
+
+    def _arrivals(
+        self, bus: "_BusState", i: int, ping: GPSPing
+    ) -> list[HaltArrival]:
+        """Arrivals at the stops the best hypothesis has now reached."""
+        track = self.tracks[i]
+        hypothesis = bus.hypotheses[i]
+        dist_m, stop = hypothesis[0], hypothesis[2]
+        arrivals = []
+        while (
+            stop < len(track.cum_m)
+            and track.cum_m[stop] - self.arrival_radius_m <= dist_m
+        ):
+            # When the bus passed the halt, if it moved since the last
+            # ping; otherwise, or if it is not past it yet, now.
+            t_s = ping.t_s
+            if bus.track == i and dist_m > bus.dist_m:
+                share = (track.cum_m[stop] - bus.dist_m) / (
+                    dist_m - bus.dist_m
+                )
+                t_s = bus.t_s + min(1.0, max(0.0, share)) * (
+                    ping.t_s - bus.t_s
+                )
+            arrivals.append(
+                HaltArrival(
+                    bus_id=ping.bus_id,
+                    route_id=track.route_id,
+                    halt_id=track.halt_ids[stop],
+                    t_s=t_s,
+                )
+            )
+            stop += 1
+        hypothesis[2] = stop
+        return arrivals
+
+    def match_one(self, ping: GPSPing) -> MatchedPing:
+        bus = self.buses.get(ping.bus_id)
+        if bus is None or ping.t_s - bus.t_s > self.max_gap_s:
+            bus = self.buses[ping.bus_id] = _BusState()
+        dt_s = max(0.0, ping.t_s - bus.t_s)
+        bus.hypotheses = {
+            i: hypothesis
+            for i, hypothesis in bus.hypotheses.items()
+            if self._match_local(i, hypothesis, ping, dt_s)
+        }
+        if not bus.hypotheses:
+            bus.hypotheses = self._match_global(ping)
+            bus.track = None
+        if not bus.hypotheses:
+            bus.t_s = ping.t_s
+            return MatchedPing(ping=ping)
+
+        i = min(
+            bus.hypotheses,
+            key=lambda i: (bus.hypotheses[i][1], self.tracks[i].route_id),
+        )
+        arrivals = self._arrivals(bus, i, ping)
+        bus.track, bus.dist_m, bus.t_s = i, bus.hypotheses[i][0], ping.t_s
+
+        track = self.tracks[i]
+        dist_m, _, _, snap_m, edge = bus.hypotheses[i]
+        stop = edge
+        if track.cum_m[edge + 1] - dist_m < dist_m - track.cum_m[edge]:
+            stop = edge + 1
+        return MatchedPing(
+            ping=ping,
+            route_id=track.route_id,
+            distance_m=dist_m,
+            road_segment_id=track.edge_segment_ids[edge],
+            snap_m=snap_m,
+            halt_id=track.halt_ids[stop],
+            halt_distance_m=abs(track.cum_m[stop] - dist_m),
+            arrivals=arrivals,
+        )
+
+    def match(self, pings: Iterable[GPSPing]) -> Iterator[MatchedPing]:
+        """Match pings as they come. Each bus's pings must be in time
+        order; pings of different buses may interleave.
+        """
+        for ping in pings:
+            yield self.match_one(ping)
+
+    def arrivals(self, pings: Iterable[GPSPing]) -> Iterator[HaltArrival]:
+        """Only the halt arrivals from matching pings."""
+        for matched in self.match(pings):
+            yield from matched.arrivals
+
+
+class _BusState:
+    """What the matcher remembers about one bus between its pings."""
+
+    __slots__ = ("t_s", "hypotheses", "track", "dist_m")
+
+    def __init__(self):
+        self.t_s = -math.inf
+        # track -> [distance_m, cost, next_stop, snap_m, edge]
+        self.hypotheses: dict[int, list] = {}
+        # Reported at the last matched ping
+        self.track: int | None = None
+        self.dist_m = 0.0
+
+
+class _Track:
+    """A route as a polyline through its halts, with each edge (stop to
+    stop + 1) precomputed for projecting points onto it.
+
+    A halt repeated where two segments meet is one stop. Each edge
+    belongs to the segment of the stop it ends at.
+    """
+
+    __slots__ = ("route_id", "halt_ids", "cum_m", "edge_segment_ids", "edges")
+
+    def __init__(self, route_id, halt_ids, cum_m, edge_segment_ids, edges):
+        self.route_id = route_id
+        self.halt_ids = halt_ids
+        self.cum_m = cum_m
+        self.edge_segment_ids = edge_segment_ids
+        # (lat, lng, m per deg lng, east m, north m, squared length m)
+        self.edges = edges
+
+    @staticmethod
+    def build(db, route_id: str) -> "_Track":
+        profile = db.route_profile(route_id)
+        resolved = profile.resolved
+        segment_ids = [
+            seg_id
+            for seg_id in db.routes[route_id].road_segment_id_list
+            if seg_id not in resolved.missing_segment_ids
+        ]
+        halts, cum_m, stop_segment_ids = [], [], []
+        position = 0
+        for seg_id, seg_halts in zip(segment_ids, resolved.segment_halts):
+            for halt in seg_halts:
+                dist_m = float(profile.cum_dist_m[position])
+                position += 1
+                if halts and halts[-1].id == halt.id:
+                    continue
+                halts.append(halt)
+                cum_m.append(dist_m)
+                stop_segment_ids.append(seg_id)
+
+        m_per_deg = MapMatcher.M_PER_DEG
+        edges = []
+        for a, b in zip(halts, halts[1:]):
+            kx = m_per_deg * math.cos(math.radians(a.latlng.lat))
+            ex = (b.latlng.lng - a.latlng.lng) * kx
+            ey = (b.latlng.lat - a.latlng.lat) * m_per_deg
+            edges.append(
+                (a.latlng.lat, a.latlng.lng, kx, ex, ey, ex * ex + ey * ey)
+            )
+        return _Track(
+            route_id=route_id,
+            halt_ids=[halt.id for halt in halts],
+            cum_m=cum_m,
+            edge_segment_ids=stop_segment_ids[1:],
+            edges=edges,
+        )
+
+    def samples(self, edge: int, step_m: float) -> list[LatLng]:
+        """Points along an edge, from end to end, at most step_m apart."""
+        lat, lng, kx, ex, ey, len2 = self.edges[edge]
+        n = max(1, math.ceil(math.sqrt(len2) / step_m))
+        return [
+            LatLng(
+                lat + k / n * ey / MapMatcher.M_PER_DEG,
+                lng + (k / n * ex / kx if kx > 0 else 0.0),
+            )
+            for k in range(n + 1)
+        ]
+
+    def project(self, edge: int, ping: GPSPing) -> tuple[float, float]:
+        """(distance from the ping to the edge, distance along the route
+        of the nearest point on it), on a local flat projection.
+        """
+        lat, lng, kx, ex, ey, len2 = self.edges[edge]
+        x = (ping.lng - lng) * kx
+        y = (ping.lat - lat) * MapMatcher.M_PER_DEG
+        t = 0.0
+        if len2 > 0:
+            t = min(1.0, max(0.0, (x * ex + y * ey) / len2))
+        dist_m = self.cum_m[edge] + t * (
+            self.cum_m[edge + 1] - self.cum_m[edge]
+        )
+        return math.hypot(x - t * ex, y - t * ey), dist_m
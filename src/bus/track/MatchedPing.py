@@ -0,0 +1,20 @@
+from dataclasses import dataclass, field
+
+from bus.track.GPSPing import GPSPing
+from bus.track.HaltArrival import HaltArrival
+
+
+@dataclass(slots=True)
+class MatchedPing:
+    """A ping snapped to the most likely route, or unmatched (route_id
+    None) if no route passes within the matcher's max_snap_m.
+    """
+
+    ping: GPSPing
+    route_id: str | None = None
+    distance_m: float | None = None  # Along the route
+    road_segment_id: str | None = None
+    snap_m: float | None = None  # From the ping to the route
+    halt_id: str | None = None  # Nearest halt on the route
+    halt_distance_m: float | None = None  # Along the route
+    arrivals: list[HaltArrival] = field(default_factory=list)
@@ -0,0 +1,8 @@
+# bus.track (auto generate by build_inits.py)
+# flake8: noqa: F408
+
+from bus.track.ETAPredictor import ETAPredictor
+from bus.track.GPSPing import GPSPing
+from bus.track.HaltArrival import HaltArrival
+from bus.track.MapMatcher import MapMatcher
+from bus.track.MatchedPing import MatchedPing
@@ -0,0 +1,238 @@
+import math
+
+import numpy as np
+
+from utils_future.Haversine import Haversine
+
+
+class BatchSpatialIndex:
+    """Static grid over arrays of points, for querying many points at once.
+
+    Points are sorted into square cells of about cell_size_m. Queries are
+    grouped by cell, and each group is measured, in one vectorised pass,
+    against the points in the surrounding block of cells only. Results
+    refer to points by their row in the arrays the index was built from.
+    """
+
+    M_PER_DEG = 2 * math.pi * Haversine.R / 360
+    # Target points per cell, when cell_size_m is not given.
+    POINTS_PER_CELL = 8
+    # Queries measured per vectorised pass, to bound memory.
+    CHUNK_SIZE = 2_048
+
+    def __init__(
+        self,
+        lats: np.ndarray,
+        lngs: np.ndarray,
+        cell_size_m: float | None = None,
+    ):
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lngs = np.asarray(lngs, dtype=np.float64)
+        if cell_size_m is None:
+            cell_size_m = self._default_cell_size_m()
+        self.cell_size_m = cell_size_m
+        self.cell_lat_deg = cell_size_m / BatchSpatialIndex.M_PER_DEG
+        # Cells are at least cell_size_m wide up to this latitude.
+        self.max_abs_lat = min(
+            89.0, float(np.abs(self.lats).max(initial=0.0)) + 1.0
+        )
+        self.cell_lng_deg = self.cell_lat_deg / math.cos(
+            math.radians(self.max_abs_lat)
+        )
+
+        ci, cj = self._cells(self.lats, self.lngs)
+        self.order = np.lexsort((cj, ci))
+        ci, cj = ci[self.order], cj[self.order]
+        starts = np.flatnonzero(
+            np.concatenate(([True], (ci[1:] != ci[:-1]) | (cj[1:] != cj[:-1])))
+        )
+        ends = np.append(starts[1:], len(self.order))
+        # cell -> (start, end) into order
+        self.cell_slices: dict[tuple[int, int], tuple[int, int]] = {
+            (int(ci[s]), int(cj[s])): (int(s), int(e))
+            for s, e in zip(starts, ends)
+        }
+
+    def __len__(self) -> int:
+        return len(self.lats)
+
+    def _default_cell_size_m(self) -> float:
+        if len(self.lats) < 2:
+            return 1_000.0
+        height_m = np.ptp(self.lats) * BatchSpatialIndex.M_PER_DEG
+        width_m = (
+            np.ptp(self.lngs)
+            * BatchSpatialIndex.M_PER_DEG
+            * math.cos(math.radians(float(np.abs(self.lats).mean())))
+        )
+        area_m2 = max(height_m, 1.0) * max(width_m, 1.0)
+        return max(
+            10.0,
+            math.sqrt(
+                area_m2 * BatchSpatialIndex.POINTS_PER_CELL / len(self.lats)
+            ),
+        )
+
+    def _cells(
+        self, lats: np.ndarray, lngs: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        return (
+            np.floor(lats / self.cell_lat_deg).astype(np.int64),
+            np.floor(lngs / self.cell_lng_deg).astype(np.int64),
+        )
+
+    def _groups(self, lats: np.ndarray, lngs: np.ndarray):
+        """((ci, cj), query rows) for each cell holding a query."""
+        ci, cj = self._cells(lats, lngs)
+        order = np.lexsort((cj, ci))
+        ci, cj = ci[order], cj[order]
+        starts = np.flatnonzero(
+            np.concatenate(([True], (ci[1:] != ci[:-1]) | (cj[1:] != cj[:-1])))
+        )
+        ends = np.append(starts[1:], len(order))
+        for s, e in zip(starts, ends):
+            for c in range(s, e, BatchSpatialIndex.CHUNK_SIZE):
+                yield (int(ci[s]), int(cj[s])), order[
+                    c : min(e, c + BatchSpatialIndex.CHUNK_SIZE)
+                ]
+
+    def _block(self, cell: tuple[int, int], r: int) -> np.ndarray:
+        """Rows of the points in the cells within r cells of cell."""
+        ci, cj = cell
+        if (2 * r + 1) ** 2 > len(self.cell_slices):
+            # Fewer occupied cells than cells in the block: filter those.
+            slices = [
+                s_e
+                for (i, j), s_e in self.cell_slices.items()
+                if abs(i - ci) <= r and abs(j - cj) <= r
+            ]
+        else:
+            slices = [
+                self.cell_slices[(i, j)]
+                for i in range(ci - r, ci + r + 1)
+                for j in range(cj - r, cj + r + 1)
+                if (i, j) in self.cell_slices
+            ]
+        if not slices:
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate([self.order[s:e] for s, e in slices])
+
+    def _min_cell_width_m(self, lats: np.ndarray) -> float:
+        """The narrowest a cell can be, east-west, at these latitudes."""
+        max_abs_lat = min(89.0, float(np.abs(lats).max()))
+        return min(
+            self.cell_size_m,
+            self.cell_lng_deg
+            * BatchSpatialIndex.M_PER_DEG
+            * math.cos(math.radians(max_abs_lat)),
+        )
+
+    @staticmethod
+    def _sort_rows(
+        rows: np.ndarray, dists: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Sort each row of (rows, dists) by (dist, row)."""
+        order = np.lexsort((rows, dists), axis=-1)
+        return (
+            np.take_along_axis(rows, order, axis=-1),
+            np.take_along_axis(dists, order, axis=-1),
+        )
+
+    def nearest(
+        self, lats: np.ndarray, lngs: np.ndarray, k: int = 1
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """(rows, distances), each (n_queries, k), of the k points nearest
+        each query, nearest first. Missing neighbours (fewer than k
+        points) are row -1 at distance inf.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lngs = np.asarray(lngs, dtype=np.float64)
+        out_rows = np.full((len(lats), k), -1, dtype=np.intp)
+        out_dists = np.full((len(lats), k), np.inf)
+        if len(self) == 0 or k == 0:
+            return out_rows, out_dists
+
+        for cell, queries in self._groups(lats, lngs):
+            width_m = self._min_cell_width_m(lats[queries])
+            r = 1
+            while len(queries):
+                block = self._block(cell, r)
+                if len(block) < min(k, len(self)):
+                    r *= 2
+                    continue
+                dists = Haversine.elementwise(
+                    lats[queries, np.newaxis],
+                    lngs[queries, np.newaxis],
+                    self.lats[block][np.newaxis, :],
+                    self.lngs[block][np.newaxis, :],
+                )
+                kk = min(k, len(block))
+                if kk < len(block):
+                    part = np.argpartition(dists, kk - 1, axis=1)[:, :kk]
+                else:
+                    part = np.broadcast_to(np.arange(kk), dists.shape)
+                rows, part_dists = self._sort_rows(
+                    block[part], np.take_along_axis(dists, part, axis=1)
+                )
+                # Where others tie with the k-th, fully sort so ties break
+                # by row, not by partition order.
+                tied = np.flatnonzero(
+                    (dists <= part_dists[:, -1:]).sum(axis=1) > kk
+                )
+                if len(tied):
+                    tied_rows, tied_dists = self._sort_rows(
+                        np.broadcast_to(block, (len(tied), len(block))),
+                        dists[tied],
+                    )
+                    rows[tied] = tied_rows[:, :kk]
+                    part_dists[tied] = tied_dists[:, :kk]
+                # Every point outside the block is at least r cells away.
+                done = (len(block) == len(self)) | (
+                    (kk == k) & (part_dists[:, -1] <= r * width_m)
+                )
+                out_rows[queries[done], :kk] = rows[done]
+                out_dists[queries[done], :kk] = part_dists[done]
+                queries = queries[~done]
+                r *= 2
+        return out_rows, out_dists
+
+    def query_radius(
+        self, lats: np.ndarray, lngs: np.ndarray, radius_m: float
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Every point within radius_m of each query, as CSR arrays
+        (offsets, rows, distances): the matches of query q are
+        rows[offsets[q]:offsets[q + 1]], nearest first.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lngs = np.asarray(lngs, dtype=np.float64)
+        q_list, row_list, dist_list = [], [], []
+        for cell, queries in self._groups(lats, lngs):
+            r = math.ceil(radius_m / self._min_cell_width_m(lats[queries]))
+            block = self._block(cell, r)
+            if len(block) == 0:
+                continue
+            dists = Haversine.elementwise(
+                lats[queries, np.newaxis],
+                lngs[queries, np.newaxis],
+                self.lats[block][np.newaxis, :],
+                self.lngs[block][np.newaxis, :],
+            )
+            qi, bi = np.nonzero(dists <= radius_m)
+            q_list.append(queries[qi])
+            row_list.append(block[bi])
+            dist_list.append(dists[qi, bi])
+
+        if not q_list:
+            return (
+                np.zeros(len(lats) + 1, dtype=np.intp),
+                np.empty(0, dtype=np.intp),
+                np.empty(0, dtype=np.float64),
+            )
+        q = np.concatenate(q_list)
+        rows = np.concatenate(row_list)
+        dists = np.concatenate(dist_list)
+        order = np.lexsort((rows, dists, q))
+        offsets = np.concatenate(
+            ([0], np.cumsum(np.bincount(q, minlength=len(lats))))
+        )
+        return offsets, rows[order], dists[order]
@@ -0,0 +1,107 @@
+import numpy as np
+
+
+class Haversine:
+    """Vectorised haversine distances in metres over arrays of lat/lng.
+
+    Gives the same results as LatLng.distance_m, within float tolerance.
+    """
+
+    R = 6_371_000
+
+    @staticmethod
+    def elementwise(
+        lats1: np.ndarray,
+        lngs1: np.ndarray,
+        lats2: np.ndarray,
+        lngs2: np.ndarray,
+    ) -> np.ndarray:
+        """Distance between each (lats1[i], lngs1[i]) and (lats2[i], lngs2[i]).
+
+        Inputs are broadcast against each other.
+        """
+        lat1, lng1 = np.radians(lats1), np.radians(lngs1)
+        lat2, lng2 = np.radians(lats2), np.radians(lngs2)
+        a = (
+            np.sin((lat2 - lat1) / 2) ** 2
+            + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+        )
+        return Haversine.R * 2 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+    @staticmethod
+    def one_to_many(
+        lat: float, lng: float, lats: np.ndarray, lngs: np.ndarray
+    ) -> np.ndarray:
+        """Distance from one point to each of many points."""
+        return Haversine.elementwise(
+            lat, lng, np.asarray(lats), np.asarray(lngs)
+        )
+
+    @staticmethod
+    def pairwise(lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+        """Distance between consecutive points; n points give n - 1 values."""
+        lats, lngs = np.asarray(lats), np.asarray(lngs)
+        return Haversine.elementwise(lats[:-1], lngs[:-1], lats[1:], lngs[1:])
+
+    @staticmethod
+    def matrix(
+        lats1: np.ndarray,
+        lngs1: np.ndarray,
+        lats2: np.ndarray | None = None,
+        lngs2: np.ndarray | None = None,
+    ) -> np.ndarray:
+        """(n, m) matrix of distances from every point in 1 to every point in 2.
+
+        If 2 is omitted, the matrix is square over 1.
+        """
+        lats1, lngs1 = np.asarray(lats1), np.asarray(lngs1)
+        if lats2 is None:
+            lats2, lngs2 = lats1, lngs1
+        lats2, lngs2 = np.asarray(lats2), np.asarray(lngs2)
+        return Haversine.elementwise(
+            lats1[:, np.newaxis],
+            lngs1[:, np.newaxis],
+            lats2[np.newaxis, :],
+            lngs2[np.newaxis, :],
+        )
+
+    @staticmethod
+    def pairs_within(
+        lats: np.ndarray, lngs: np.ndarray, radius_m: float
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Every pair of points closer than radius_m, as (i, j, dist) arrays
+        with i < j.
+
+        Points are sorted by latitude, and only pairs whose latitude gap is
+        under radius_m are measured, so this is O(n log n) for sparse points.
+        """
+        lats, lngs = np.asarray(lats), np.asarray(lngs)
+        order = np.argsort(lats, kind="stable")
+        sorted_lats, sorted_lngs = lats[order], lngs[order]
+        # North-south distance is a lower bound on the haversine distance.
+        radius_deg = np.degrees(radius_m / Haversine.R)
+        i_list, j_list, d_list = [], [], []
+        for k in range(1, len(lats)):
+            near = np.flatnonzero(
+                sorted_lats[k:] - sorted_lats[:-k] < radius_deg
+            )
+            if len(near) == 0:
+                break
+            d = Haversine.elementwise(
+                sorted_lats[near],
+                sorted_lngs[near],
+                sorted_lats[near + k],
+                sorted_lngs[near + k],
+            )
+            within = d < radius_m
+            i_list.append(order[near[within]])
+            j_list.append(order[near[within] + k])
+            d_list.append(d[within])
+        if not d_list:
+            return (
+                np.empty(0, dtype=np.intp),
+                np.empty(0, dtype=np.intp),
+                np.empty(0, dtype=np.float64),
+            )
+        i, j = np.concatenate(i_list), np.concatenate(j_list)
+        return np.minimum(i, j), np.maximum(i, j), np.concatenate(d_list)
@@ -2,6 +2,8 @@ from utils_future.String import String
 
 
 class IDMixin:
+    __slots__ = ()
+
     @property
     def id(self) -> str:
         return String.to_kebab_case(self.name)
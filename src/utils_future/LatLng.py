@@ -2,7 +2,7 @@ import math
 from dataclasses import dataclass
 
 
-@dataclass
+@dataclass(slots=True)
 class LatLng:
     lat: float
     lng: float
@@ -22,3 +22,10 @@ class LatLng:
 
     def to_kebab_case(self) -> str:
         return f"{self.lat:.6f}N-{self.lng:.6f}E"
+
+    def to_dict(self) -> dict:
+        return {"lat": self.lat, "lng": self.lng}
+
+    @staticmethod
+    def from_dict(d: dict) -> "LatLng":
+        return LatLng(lat=d["lat"], lng=d["lng"])
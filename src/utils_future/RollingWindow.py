@@ -0,0 +1,29 @@
+import numpy as np
+
+
+class RollingWindow:
+    """The last `size` values of a stream, in a fixed ring buffer, so
+    memory stays bounded however many values are added.
+    """
+
+    def __init__(self, size: int = 64):
+        self.values = np.empty(size, dtype=np.float64)
+        self.n_added = 0
+
+    def __len__(self) -> int:
+        return min(self.n_added, len(self.values))
+
+    def add(self, value: float) -> None:
+        self.values[self.n_added % len(self.values)] = value
+        self.n_added += 1
+
+    def mean(self) -> float:
+        return float(self.values[: len(self)].mean())
+
+    def quantile(self, q: float) -> float:
+        """As np.quantile (linear), without its overhead on small windows."""
+        values = np.sort(self.values[: len(self)])
+        position = q * (len(values) - 1)
+        lo = int(position)
+        hi = min(lo + 1, len(values) - 1)
+        return float(values[lo] + (position - lo) * (values[hi] - values[lo]))
@@ -0,0 +1,109 @@
+import math
+
+from utils_future.LatLng import LatLng
+
+
+class SpatialIndex:
+    """Grid index over keyed LatLng points.
+
+    Points are bucketed into square cells of cell_size_m metres (measured
+    along a meridian), so radius and nearest-k queries only visit the
+    cells around the query point. add/remove update the grid in place.
+    """
+
+    # Metres per degree of latitude, on the sphere LatLng.distance_m uses.
+    M_PER_DEG = 2 * math.pi * 6_371_000 / 360
+
+    def __init__(self, cell_size_m: float = 100.0):
+        self.cell_size_m = cell_size_m
+        self.cell_deg = cell_size_m / SpatialIndex.M_PER_DEG
+        self.cells: dict[tuple[int, int], dict[str, LatLng]] = {}
+        self.key_to_cell: dict[str, tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.key_to_cell)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.key_to_cell
+
+    def _cell(self, latlng: LatLng) -> tuple[int, int]:
+        return (
+            math.floor(latlng.lat / self.cell_deg),
+            math.floor(latlng.lng / self.cell_deg),
+        )
+
+    def _cell_width_m(self, lat: float, n_cells: int) -> float:
+        # East-west cell width at the pole-most latitude n_cells away.
+        far_lat = min(89.0, abs(lat) + (n_cells + 1) * self.cell_deg)
+        return self.cell_size_m * math.cos(math.radians(far_lat))
+
+    def add(self, key: str, latlng: LatLng) -> None:
+        """Add a point, or move it if the key is already indexed."""
+        if key in self.key_to_cell:
+            self.remove(key)
+        cell = self._cell(latlng)
+        self.cells.setdefault(cell, {})[key] = latlng
+        self.key_to_cell[key] = cell
+
+    def remove(self, key: str) -> None:
+        cell = self.key_to_cell.pop(key)
+        del self.cells[cell][key]
+        if not self.cells[cell]:
+            del self.cells[cell]
+
+    def _ring(self, center: tuple[int, int], r: int):
+        ci, cj = center
+        for i in range(ci - r, ci + r + 1):
+            for j in range(cj - r, cj + r + 1):
+                if abs(i - ci) == r or abs(j - cj) == r:
+                    yield (i, j)
+
+    def query_radius(
+        self, latlng: LatLng, radius_m: float
+    ) -> list[tuple[str, float]]:
+        """(key, distance_m) for points within radius_m, nearest first."""
+        n_lat = math.ceil(radius_m / self.cell_size_m)
+        n_lng = math.ceil(radius_m / self._cell_width_m(latlng.lat, n_lat))
+        ci, cj = self._cell(latlng)
+        results = []
+        for i in range(ci - n_lat, ci + n_lat + 1):
+            for j in range(cj - n_lng, cj + n_lng + 1):
+                for key, other in self.cells.get((i, j), {}).items():
+                    dist = latlng.distance_m(other)
+                    if dist <= radius_m:
+                        results.append((key, dist))
+        return sorted(results, key=lambda r: (r[1], r[0]))
+
+    def nearest(self, latlng: LatLng, k: int = 1) -> list[tuple[str, float]]:
+        """(key, distance_m) for the k nearest points, nearest first.
+
+        Rings of cells are searched outwards from the query point until
+        they have visited as many cells as are occupied; past that, the
+        remaining occupied cells are scanned instead, so a query far from
+        every point costs no more than a full scan.
+        """
+        center = self._cell(latlng)
+        ci, cj = center
+        candidates = []
+        n_seen = 0
+        r = 0
+        while n_seen < len(self):
+            if (2 * r + 1) ** 2 > len(self.cells):
+                for (i, j), points in self.cells.items():
+                    if max(abs(i - ci), abs(j - cj)) >= r:
+                        for key, other in points.items():
+                            candidates.append((key, latlng.distance_m(other)))
+                candidates.sort(key=lambda c: (c[1], c[0]))
+                break
+            for cell in self._ring(center, r):
+                for key, other in self.cells.get(cell, {}).items():
+                    candidates.append((key, latlng.distance_m(other)))
+                    n_seen += 1
+            candidates.sort(key=lambda c: (c[1], c[0]))
+            # Every point not yet seen is at least r cells away.
+            if len(candidates) >= k and candidates[k - 1][1] <= (
+                r * self._cell_width_m(latlng.lat, r)
+            ):
+                break
+            r += 1
+        return candidates[:k]
@@ -0,0 +1,270 @@
+import io
+import math
+import os
+import urllib.request
+from collections import OrderedDict
+
+
+class TileCache:
+    """Local cache of XYZ map tiles, keyed by provider, zoom, x and y.
+
+    Tiles live at <dir_path>/<provider>/<z>/<x>/<y>.png, each written
+    to a temp file and moved into place. When the total size passes
+    max_bytes, the least recently used tiles are evicted; with max_bytes
+    None, nothing is (e.g. in pool workers, leaving eviction to the
+    parent process). The LRU order is kept in memory, seeded once from
+    file mtimes on the first fetch, so reading cached tiles never walks
+    the tree. In offline mode, tiles are served from the cache only.
+    """
+
+    OSM_MAPNIK_URL = "https://tile.openstreetmap.org/{z}/{x}/{y}.png"
+    USER_AGENT = "bus_py"
+    # Half the width of the EPSG:3857 (Web Mercator) world, in metres.
+    MERCATOR_HALF_WIDTH_M = 20_037_508.342789244
+    MAX_ZOOM = 19
+    TILES_ACROSS = 4
+
+    def __init__(
+        self,
+        dir_path: str,
+        provider: str = "osm-mapnik",
+        url_template: str = OSM_MAPNIK_URL,
+        max_bytes: int | None = 500_000_000,
+        offline: bool = False,
+    ):
+        self.dir_path = dir_path
+        self.provider = provider
+        self.url_template = url_template
+        self.max_bytes = max_bytes
+        self.offline = offline
+
+        # path -> size, least recently used first; None until needed.
+        self._entries: OrderedDict[str, int] | None = None
+        self.total_bytes = 0
+
+    # -----------------------------------------------------------------------
+    # Tile maths
+    # -----------------------------------------------------------------------
+
+    @staticmethod
+    def tile_xy(lat: float, lng: float, zoom: int) -> tuple[int, int]:
+        n = 2**zoom
+        lat_rad = math.radians(max(-85.0511, min(85.0511, lat)))
+        x = int((lng + 180) / 360 * n)
+        y = int((1 - math.asinh(math.tan(lat_rad)) / math.pi) / 2 * n)
+        return min(n - 1, max(0, x)), min(n - 1, max(0, y))
+
+    @staticmethod
+    def tiles_for_bbox(
+        min_lat: float,
+        min_lng: float,
+        max_lat: float,
+        max_lng: float,
+        zoom: int,
+    ) -> list[tuple[int, int]]:
+        x0, y0 = TileCache.tile_xy(max_lat, min_lng, zoom)
+        x1, y1 = TileCache.tile_xy(min_lat, max_lng, zoom)
+        return [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+    @staticmethod
+    def tile_extent_m(
+        zoom: int, x: int, y: int
+    ) -> tuple[float, float, float, float]:
+        """(left, right, bottom, top) of a tile in EPSG:3857 metres."""
+        half = TileCache.MERCATOR_HALF_WIDTH_M
+        size = 2 * half / 2**zoom
+        left, top = -half + x * size, half - y * size
+        return left, left + size, top - size, top
+
+    @staticmethod
+    def mercator_to_latlng(x_m: float, y_m: float) -> tuple[float, float]:
+        half = TileCache.MERCATOR_HALF_WIDTH_M
+        lng = x_m / half * 180
+        lat = math.degrees(math.atan(math.sinh(y_m / half * math.pi)))
+        return lat, lng
+
+    # -----------------------------------------------------------------------
+    # Cache
+    # -----------------------------------------------------------------------
+
+    @property
+    def source(self) -> str:
+        """Where tiles come from, e.g. for keying renders on it."""
+        return f"{self.provider} {self.url_template}"
+
+    def path(self, zoom: int, x: int, y: int) -> str:
+        return os.path.join(
+            self.dir_path, self.provider, str(zoom), str(x), f"{y}.png"
+        )
+
+    def has(self, zoom: int, x: int, y: int) -> bool:
+        return os.path.exists(self.path(zoom, x, y))
+
+    def _fetch(self, zoom: int, x: int, y: int) -> bytes:
+        request = urllib.request.Request(
+            self.url_template.format(z=zoom, x=x, y=y),
+            headers={"User-Agent": self.USER_AGENT},
+        )
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.read()
+
+    def _load_entries(self) -> OrderedDict[str, int]:
+        """The LRU order, read from file mtimes on first use."""
+        if self._entries is None:
+            entries = []
+            for root, _, file_names in os.walk(self.dir_path):
+                for file_name in file_names:
+                    if not file_name.endswith(".png"):
+                        continue
+                    path = os.path.join(root, file_name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, path, stat.st_size))
+            self._entries = OrderedDict(
+                (path, size) for _, path, size in sorted(entries)
+            )
+            self.total_bytes = sum(self._entries.values())
+        return self._entries
+
+    def _touch(self, path: str) -> None:
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return
+        if self._entries is not None and path in self._entries:
+            self._entries.move_to_end(path)
+
+    def evict(self) -> int:
+        """Remove least recently used tiles until the cache fits in
+        max_bytes. Returns the number removed.
+        """
+        if self.max_bytes is None:
+            return 0
+        entries = self._load_entries()
+        n_removed = 0
+        while entries and self.total_bytes > self.max_bytes:
+            path, size = entries.popitem(last=False)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.total_bytes -= size
+            n_removed += 1
+        return n_removed
+
+    def _write(self, path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, zoom: int, x: int, y: int) -> bytes | None:
+        """Tile bytes from the cache, else from the provider (if online).
+
+        Returns None if the tile is not cached and cannot be fetched.
+        """
+        path = self.path(zoom, x, y)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            pass
+        else:
+            self._touch(path)
+            return data
+        if self.offline:
+            return None
+
+        try:
+            data = self._fetch(zoom, x, y)
+        except OSError:
+            return None
+        if self.max_bytes is None:
+            self._write(path, data)
+            return data
+        entries = self._load_entries()
+        self._write(path, data)
+        self.total_bytes += len(data) - entries.pop(path, 0)
+        entries[path] = len(data)
+        self.evict()
+        return data
+
+    def seed(
+        self,
+        min_lat: float,
+        min_lng: float,
+        max_lat: float,
+        max_lng: float,
+        zooms: list[int],
+    ) -> tuple[int, int]:
+        """Fetch every missing tile over the bbox at each zoom.
+
+        Returns (n_tiles, n_fetched).
+        """
+        n_tiles, n_fetched = 0, 0
+        for zoom in zooms:
+            for x, y in TileCache.tiles_for_bbox(
+                min_lat, min_lng, max_lat, max_lng, zoom
+            ):
+                n_tiles += 1
+                if self.has(zoom, x, y):
+                    continue
+                if self.get(zoom, x, y) is not None:
+                    n_fetched += 1
+        return n_tiles, n_fetched
+
+    # -----------------------------------------------------------------------
+    # Drawing
+    # -----------------------------------------------------------------------
+
+    def _auto_zoom(self, width_m: float) -> int:
+        size = max(width_m, 1.0) / TileCache.TILES_ACROSS
+        zoom = round(math.log2(2 * TileCache.MERCATOR_HALF_WIDTH_M / size))
+        return max(0, min(TileCache.MAX_ZOOM, zoom))
+
+    def add_basemap(self, ax, zoom: int | None = None) -> int:
+        """Draw tiles under an Axes whose limits are EPSG:3857 metres.
+
+        In offline mode, falls back to the highest zoom at or below the
+        requested one that is fully cached. Returns the number of tiles
+        drawn.
+        """
+        import matplotlib.image as mpimg
+
+        x_min, x_max = ax.get_xlim()
+        y_min, y_max = ax.get_ylim()
+        min_lat, min_lng = TileCache.mercator_to_latlng(x_min, y_min)
+        max_lat, max_lng = TileCache.mercator_to_latlng(x_max, y_max)
+        if zoom is None:
+            zoom = self._auto_zoom(x_max - x_min)
+
+        tiles = TileCache.tiles_for_bbox(
+            min_lat, min_lng, max_lat, max_lng, zoom
+        )
+        if self.offline:
+            for z in range(zoom, -1, -1):
+                z_tiles = TileCache.tiles_for_bbox(
+                    min_lat, min_lng, max_lat, max_lng, z
+                )
+                if all(self.has(z, x, y) for x, y in z_tiles):
+                    zoom, tiles = z, z_tiles
+                    break
+
+        n_drawn = 0
+        for x, y in tiles:
+            data = self.get(zoom, x, y)
+            if data is None:
+                continue
+            ax.imshow(
+                mpimg.imread(io.BytesIO(data), format="png"),
+                extent=TileCache.tile_extent_m(zoom, x, y),
+                interpolation="bilinear",
+                zorder=0,
+            )
+            n_drawn += 1
+        ax.set_xlim(x_min, x_max)
+        ax.set_ylim(y_min, y_max)
+        return n_drawn
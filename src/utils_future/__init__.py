@@ -3,4 +3,5 @@
 
 from utils_future.IDMixin import IDMixin
 from utils_future.LatLng import LatLng
+from utils_future.SpatialIndex import SpatialIndex
 from utils_future.String import String
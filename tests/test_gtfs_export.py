@@ -0,0 +1,78 @@
+import csv
+import os
+from collections import defaultdict
+
+import pytest
+
+from bus.db.BusDB import BusDB
+from bus.gtfs.GTFSExport import GTFSExport
+from bus.sim.SyntheticDB import SyntheticDB
+
+
+def _read(out_dir: str, file_name: str) -> list[dict]:
+    with open(os.path.join(out_dir, file_name), newline="") as f:
+        return list(csv.DictReader(f))
+
+
+@pytest.fixture(scope="module")
+def exported(tmp_path_factory) -> tuple[BusDB, str]:
+    tmp_path = tmp_path_factory.mktemp("gtfs")
+    db_dir = str(tmp_path / "db")
+    SyntheticDB(n_roads=6, halts_per_road=9, n_routes=8).write(db_dir)
+    out_dir = str(tmp_path / "gtfs")
+    GTFSExport(db_dir).write(out_dir)
+    return BusDB(db_dir), out_dir
+
+
+def test_shapes_trace_resolved_halts(exported):
+    db, out_dir = exported
+    shapes = defaultdict(list)
+    for row in _read(out_dir, "shapes.txt"):
+        shapes[row["shape_id"]].append(row)
+
+    n_repeats = 0
+    for route_id in db.routes:
+        # RouteResolver repeats a halt where one segment ends and the
+        # next starts; the shape keeps it once.
+        halts = []
+        for halt in db.resolve_route(route_id).halts:
+            if halts and halts[-1].id == halt.id:
+                n_repeats += 1
+                continue
+            halts.append(halt)
+        rows = shapes.pop(route_id, [])
+        assert [int(row["shape_pt_sequence"]) for row in rows] == list(
+            range(len(rows))
+        )
+        assert [
+            (float(row["shape_pt_lat"]), float(row["shape_pt_lon"]))
+            for row in rows
+        ] == [(halt.latlng.lat, halt.latlng.lng) for halt in halts]
+    assert n_repeats > 0, "no repeated halts to collapse"
+    assert not shapes, f"shapes for unknown routes: {sorted(shapes)}"
+
+
+def test_trips_reference_shapes_and_routes(exported):
+    db, out_dir = exported
+    shape_ids = {row["shape_id"] for row in _read(out_dir, "shapes.txt")}
+    route_codes = {row["route_id"] for row in _read(out_dir, "routes.txt")}
+    trips = _read(out_dir, "trips.txt")
+    assert sorted(trip["trip_id"] for trip in trips) == sorted(db.routes)
+    for trip in trips:
+        assert trip["route_id"] in route_codes
+        assert trip["shape_id"] in shape_ids
+
+
+def test_stops_are_halts(exported):
+    db, out_dir = exported
+    stops = _read(out_dir, "stops.txt")
+    assert [stop["stop_id"] for stop in stops] == sorted(db.halts)
+
+
+def test_service_dates(tmp_path):
+    db_dir = str(tmp_path / "db")
+    SyntheticDB(n_roads=2, halts_per_road=5, n_routes=1).write(db_dir)
+    export = GTFSExport(db_dir, start_date="20280228")
+    assert (export.start_date, export.end_date) == ("20280228", "20290227")
+    export = GTFSExport(db_dir, start_date="20280101", end_date="20280630")
+    assert (export.start_date, export.end_date) == ("20280101", "20280630")
@@ -0,0 +1,24 @@
+import os
+
+import numpy as np
+
+from bus.db.HaltColumns import HaltColumns
+from bus.sim.SyntheticDB import SyntheticDB
+
+
+def test_load_if_fresh_refuses_stale_columns(tmp_path):
+    db_dir = str(tmp_path / "db")
+    SyntheticDB(n_roads=2, halts_per_road=5, n_routes=1).write(db_dir)
+    assert HaltColumns.load_if_fresh(db_dir) is None
+
+    columns = HaltColumns.from_json_tree(db_dir)
+    columns.save(HaltColumns.path(db_dir))
+    loaded = HaltColumns.load_if_fresh(db_dir)
+    assert loaded is not None
+    assert np.array_equal(loaded.lat, columns.lat)
+    assert list(loaded.halt_ids) == list(columns.halt_ids)
+
+    halt_path = os.path.join(db_dir, "halts", f"{columns.halt_id(0)}.json")
+    stat = os.stat(halt_path)
+    os.utime(halt_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert HaltColumns.load_if_fresh(db_dir) is None
@@ -0,0 +1,27 @@
+import os
+
+from bus.db.BusDB import BusDB
+from bus.db.Snapshot import Snapshot
+from bus.plan.JourneyGraph import JourneyGraph
+from bus.sim.SyntheticDB import SyntheticDB
+
+
+def test_load_rejects_a_stale_graph(tmp_path):
+    db_dir = str(tmp_path / "db")
+    SyntheticDB(n_roads=4, halts_per_road=5, n_routes=2).write(db_dir)
+    path = JourneyGraph.path(db_dir)
+    fingerprint = Snapshot.fingerprint(db_dir)
+    graph = JourneyGraph.build(BusDB(db_dir), 400.0, fingerprint)
+    graph.save(path)
+
+    loaded = JourneyGraph.load(path, fingerprint, 400.0)
+    assert loaded.stop_ids == graph.stop_ids
+    assert loaded.route_stops == graph.route_stops
+    assert loaded.transfers == graph.transfers
+    assert JourneyGraph.load(path, fingerprint, 300.0) is None
+
+    halt_path = os.path.join(db_dir, "halts", f"{graph.stop_ids[0]}.json")
+    stat = os.stat(halt_path)
+    os.utime(halt_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert Snapshot.fingerprint(db_dir) != fingerprint
+    assert JourneyGraph.load(path, Snapshot.fingerprint(db_dir), 400.0) is None
@@ -0,0 +1,215 @@
+import io
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import matplotlib
+import pytest
+
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt
+
+from bus.db.BusDB import BusDB
+from bus.render.RouteMap import RouteMap
+from bus.sim.SyntheticDB import SyntheticDB
+from utils_future.TileCache import TileCache
+
+ZOOM = 15
+
+
+def _png() -> bytes:
+    buffer = io.BytesIO()
+    plt.imsave(buffer, [[0.5] * 8] * 8, format="png")
+    return buffer.getvalue()
+
+
+class _StubTileServer:
+    """Serves the same PNG for every tile, or bytes that are not a PNG
+    when broken, and counts requests.
+    """
+
+    def __init__(self):
+        self.png = _png()
+        self.broken = False
+        self.n_requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.n_requests += 1
+                body = b"not a png" if stub.broken else stub.png
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        port = self.server.server_port
+        self.url = f"http://127.0.0.1:{port}/{{z}}/{{x}}/{{y}}.png"
+
+
+@pytest.fixture
+def stub():
+    stub = _StubTileServer()
+    threading.Thread(target=stub.server.serve_forever, daemon=True).start()
+    yield stub
+    stub.server.shutdown()
+    stub.server.server_close()
+
+
+def _cached(cache_dir: str) -> set[tuple[int, int]]:
+    """(x, y) of the cached tiles at ZOOM; fails on a leftover temp file."""
+    tiles = set()
+    for root, _, file_names in os.walk(cache_dir):
+        for file_name in file_names:
+            assert file_name.endswith(".png"), f"left over: {file_name}"
+            tiles.add((int(os.path.basename(root)), int(file_name[:-4])))
+    return tiles
+
+
+# ---------------------------------------------------------------------------
+# Fetching and seeding
+# ---------------------------------------------------------------------------
+
+
+def test_fetches_each_tile_once(stub, tmp_path):
+    cache = TileCache(str(tmp_path), url_template=stub.url)
+    for x in range(3):
+        assert cache.get(ZOOM, x, 0) == stub.png
+    assert stub.n_requests == 3
+    assert cache.get(ZOOM, 0, 0) == stub.png
+    assert stub.n_requests == 3
+
+
+def test_seed_fetches_only_missing_tiles(stub, tmp_path):
+    bbox = (6.90, 79.85, 6.92, 79.87)
+    zooms = [13, 14]
+    cache = TileCache(str(tmp_path), url_template=stub.url)
+    n_tiles, n_fetched = cache.seed(*bbox, zooms)
+    assert n_tiles == n_fetched == stub.n_requests > 0
+    assert all(
+        cache.has(zoom, x, y)
+        for zoom in zooms
+        for x, y in TileCache.tiles_for_bbox(*bbox, zoom)
+    )
+    assert cache.seed(*bbox, zooms) == (n_tiles, 0)
+    assert stub.n_requests == n_tiles
+
+
+# ---------------------------------------------------------------------------
+# Eviction
+# ---------------------------------------------------------------------------
+
+
+def test_evicts_least_recently_used_by_size(stub, tmp_path):
+    max_bytes = 3 * len(stub.png)
+    cache = TileCache(
+        str(tmp_path), url_template=stub.url, max_bytes=max_bytes
+    )
+    for x in range(3):
+        cache.get(ZOOM, x, 0)
+    cache.get(ZOOM, 0, 0)
+
+    # Tile 0 was used last, so tile 1 goes first, then tile 2.
+    cache.get(ZOOM, 3, 0)
+    assert _cached(str(tmp_path)) == {(0, 0), (2, 0), (3, 0)}
+    cache.get(ZOOM, 4, 0)
+    assert _cached(str(tmp_path)) == {(0, 0), (3, 0), (4, 0)}
+    assert cache.total_bytes <= max_bytes
+
+
+def test_new_cache_orders_by_mtime(stub, tmp_path):
+    max_bytes = 3 * len(stub.png)
+    cache = TileCache(
+        str(tmp_path), url_template=stub.url, max_bytes=max_bytes
+    )
+    for x, t in ((0, 1), (1, 3), (2, 2)):
+        cache.get(ZOOM, x, 0)
+        os.utime(cache.path(ZOOM, x, 0), (t, t))
+    cache = TileCache(
+        str(tmp_path), url_template=stub.url, max_bytes=max_bytes
+    )
+    cache.get(ZOOM, 3, 0)
+    assert _cached(str(tmp_path)) == {(1, 0), (2, 0), (3, 0)}
+
+
+def test_evict_after_another_process_evicted(stub, tmp_path):
+    cache = TileCache(
+        str(tmp_path), url_template=stub.url, max_bytes=10 * len(stub.png)
+    )
+    for x in range(3):
+        cache.get(ZOOM, x, 0)
+    os.remove(cache.path(ZOOM, 1, 0))
+    assert cache.get(ZOOM, 1, 0) == stub.png
+    cache.max_bytes = 0
+    assert cache.evict() == 3
+    assert _cached(str(tmp_path)) == set()
+
+
+def test_no_eviction_without_max_bytes(stub, tmp_path):
+    cache = TileCache(str(tmp_path), url_template=stub.url, max_bytes=None)
+    for x in range(3):
+        cache.get(ZOOM, x, 0)
+    assert cache.evict() == 0
+    assert len(_cached(str(tmp_path))) == 3
+
+
+# ---------------------------------------------------------------------------
+# Offline
+# ---------------------------------------------------------------------------
+
+
+def test_offline_serves_cache_only(stub, tmp_path):
+    TileCache(str(tmp_path), url_template=stub.url).get(ZOOM, 0, 0)
+    n_requests = stub.n_requests
+    cache = TileCache(str(tmp_path), url_template=stub.url, offline=True)
+    assert cache.get(ZOOM, 0, 0) == stub.png
+    assert cache.get(ZOOM, 1, 0) is None
+    assert stub.n_requests == n_requests
+
+
+def test_offline_basemap_falls_back_to_cached_zoom(stub, tmp_path):
+    zoom, x, y = 14, 11_826, 7_874
+    # The middle of one zoom-14 tile, so it lies in one tile at each zoom.
+    left, right, bottom, top = TileCache.tile_extent_m(zoom, x, y)
+    margin = (right - left) / 4
+    TileCache(str(tmp_path), url_template=stub.url).get(
+        zoom - 2, x // 4, y // 4
+    )
+    n_requests = stub.n_requests
+
+    fig, ax = plt.subplots()
+    try:
+        ax.set_xlim(left + margin, right - margin)
+        ax.set_ylim(bottom + margin, top - margin)
+        cache = TileCache(str(tmp_path), url_template=stub.url, offline=True)
+        assert cache.add_basemap(ax, zoom=zoom) == 1
+        assert ax.get_xlim() == (left + margin, right - margin)
+    finally:
+        plt.close(fig)
+    assert stub.n_requests == n_requests
+
+
+# ---------------------------------------------------------------------------
+# Route maps
+# ---------------------------------------------------------------------------
+
+
+def test_route_map_renders_without_broken_tiles(stub, tmp_path):
+    db_dir = str(tmp_path / "db")
+    SyntheticDB(n_roads=2, halts_per_road=5, n_routes=1).write(db_dir)
+    db = BusDB(db_dir)
+    route_id = next(iter(db.routes))
+    img_path = str(tmp_path / "images" / f"{route_id}.png")
+    cache = TileCache(str(tmp_path / "tiles"), url_template=stub.url)
+    stub.broken = True
+    n_tiles = RouteMap(db.routes[route_id], db.resolve_route(route_id)).save(
+        img_path, cache
+    )
+    assert n_tiles == 0
+    assert os.path.exists(img_path)
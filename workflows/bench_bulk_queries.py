@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""Benchmark batch nearest-halt and radius queries for many points at once
+against a per-point SpatialIndex loop, on synthetic halts.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from bus.core.Halt import Halt
+from bus.db.HaltColumns import HaltColumns
+from utils_future.Haversine import Haversine
+from utils_future.LatLng import LatLng
+from utils_future.SpatialIndex import SpatialIndex
+
+N_HALTS = 10_000
+N_POINTS = 100_000
+# Points run through the per-point loop, whose time is scaled up.
+N_LOOP_POINTS = 2_000
+# Points checked against brute force.
+N_CHECK_POINTS = 500
+RADIUS_M = 300.0
+KS = [1, 5]
+
+
+def _synthetic_halts(rng, n: int) -> list[Halt]:
+    lats = 6.85 + rng.random(n) * 0.2
+    lngs = 79.82 + rng.random(n) * 0.2
+    return [
+        Halt(
+            road_id=f"road-{i % 500:03d}-n",
+            road_index=i // 500,
+            name=f"Halt {i}",
+            latlng=LatLng(float(lat), float(lng)),
+        )
+        for i, (lat, lng) in enumerate(zip(lats, lngs))
+    ]
+
+
+def _timeit(func) -> tuple[float, object]:
+    t_start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - t_start, result
+
+
+def _report(name: str, t_loop: float, t_batch: float, n: int) -> None:
+    print(
+        f"{name:<16} loop {t_loop:8.2f} s  batch {t_batch:7.3f} s"
+        f"  {n / t_batch:>12,.0f} points/s  x{t_loop / t_batch:6.1f}"
+    )
+
+
+def _expect(condition: bool, message: str) -> None:
+    if not condition:
+        raise RuntimeError(message)
+
+
+def _check(columns: HaltColumns, lats, lngs, k: int) -> None:
+    """Batch results equal brute force, ties broken by halt row."""
+    halt_ids, dists = columns.nearest_many(lats, lngs, k)
+    offsets, r_halt_ids, r_dists = columns.query_radius_many(
+        lats, lngs, RADIUS_M
+    )
+    all_dists = Haversine.matrix(lats, lngs, columns.lat, columns.lng)
+    for q, row_dists in enumerate(all_dists):
+        order = np.lexsort((np.arange(len(columns)), row_dists))
+        _expect(
+            list(halt_ids[q]) == list(columns.halt_ids[order[:k]])
+            and np.allclose(dists[q], row_dists[order[:k]]),
+            f"nearest k={k}: point {q} differs from brute force",
+        )
+        within = order[row_dists[order] <= RADIUS_M]
+        span = slice(offsets[q], offsets[q + 1])
+        _expect(
+            list(r_halt_ids[span]) == list(columns.halt_ids[within])
+            and np.allclose(r_dists[span], row_dists[within]),
+            f"radius {RADIUS_M:g} m: point {q} differs from brute force",
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-points", type=int, default=N_POINTS)
+    parser.add_argument("--n-halts", type=int, default=N_HALTS)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    halts = _synthetic_halts(rng, args.n_halts)
+    columns = HaltColumns.from_halts(halts)
+    index = SpatialIndex()
+    for halt in halts:
+        index.add(halt.id, halt.latlng)
+    # Points spill past the halts, so some have none within RADIUS_M.
+    lats = 6.84 + rng.random(args.n_points) * 0.22
+    lngs = 79.81 + rng.random(args.n_points) * 0.22
+
+    t_build, _ = _timeit(lambda: columns.batch_index)
+    print(
+        f"{args.n_halts:,} halts, {args.n_points:,} points;"
+        f" index built in {t_build * 1_000:.1f} ms"
+    )
+    _check(columns, lats[:N_CHECK_POINTS], lngs[:N_CHECK_POINTS], max(KS))
+
+    n_loop = min(N_LOOP_POINTS, args.n_points)
+    points = [LatLng(float(a), float(b)) for a, b in zip(lats, lngs)]
+    scale = args.n_points / n_loop
+    for k in KS:
+        t_loop, _ = _timeit(
+            lambda: [index.nearest(p, k) for p in points[:n_loop]]
+        )
+        t_batch, _ = _timeit(lambda: columns.nearest_many(lats, lngs, k))
+        _report(f"nearest k={k}", t_loop * scale, t_batch, args.n_points)
+
+    t_loop, _ = _timeit(
+        lambda: [index.query_radius(p, RADIUS_M) for p in points[:n_loop]]
+    )
+    t_batch, (offsets, _, _) = _timeit(
+        lambda: columns.query_radius_many(lats, lngs, RADIUS_M)
+    )
+    _report(f"radius {RADIUS_M:.0f} m", t_loop * scale, t_batch, args.n_points)
+    print(
+        f"{offsets[-1]:,} radius matches;"
+        f" {np.mean(np.diff(offsets) == 0):.1%} of points have none"
+    )
+    print(f"(loop times scaled from {n_loop:,} points)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Benchmark Haversine batch distances against the scalar LatLng loop."""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from utils_future.Haversine import Haversine
+from utils_future.LatLng import LatLng
+
+SIZES = [1_000, 10_000, 100_000]
+MATRIX_COLS = 10
+
+
+def _timeit(func) -> tuple[float, object]:
+    t_start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - t_start, result
+
+
+def _expect(condition: bool, message: str) -> None:
+    if not condition:
+        raise RuntimeError(message)
+
+
+def _report(name: str, n: int, t_scalar: float, t_vector: float) -> None:
+    print(
+        f"{name:<14} n={n:>7,}  scalar {t_scalar * 1_000:9.1f} ms"
+        f"  numpy {t_vector * 1_000:8.2f} ms"
+        f"  x{t_scalar / t_vector:7.1f}"
+    )
+
+
+def main() -> None:
+    rng = np.random.default_rng(0)
+    for n in SIZES:
+        lats = 6.85 + rng.random(n) * 0.1
+        lngs = 79.82 + rng.random(n) * 0.1
+        points = [LatLng(lat, lng) for lat, lng in zip(lats, lngs)]
+        origin = points[0]
+
+        t_scalar, expected = _timeit(
+            lambda: [origin.distance_m(p) for p in points]
+        )
+        t_vector, actual = _timeit(
+            lambda: Haversine.one_to_many(origin.lat, origin.lng, lats, lngs)
+        )
+        _expect(
+            np.allclose(actual, expected, rtol=1e-9, atol=1e-6),
+            f"one_to_many n={n:,}: numpy differs from scalar",
+        )
+        _report("one_to_many", n, t_scalar, t_vector)
+
+        t_scalar, expected = _timeit(
+            lambda: [a.distance_m(b) for a, b in zip(points, points[1:])]
+        )
+        t_vector, actual = _timeit(lambda: Haversine.pairwise(lats, lngs))
+        _expect(
+            np.allclose(actual, expected, rtol=1e-9, atol=1e-6),
+            f"pairwise n={n:,}: numpy differs from scalar",
+        )
+        _report("pairwise", n, t_scalar, t_vector)
+
+        cols = points[:MATRIX_COLS]
+        t_scalar, expected = _timeit(
+            lambda: [[a.distance_m(b) for b in cols] for a in points]
+        )
+        t_vector, actual = _timeit(
+            lambda: Haversine.matrix(
+                lats, lngs, lats[:MATRIX_COLS], lngs[:MATRIX_COLS]
+            )
+        )
+        _expect(
+            np.allclose(actual, expected, rtol=1e-9, atol=1e-6),
+            f"matrix n={n:,}: numpy differs from scalar",
+        )
+        _report(f"matrix (x{MATRIX_COLS})", n, t_scalar, t_vector)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Benchmark halt ETA queries, cached and rebuilt, and score the ETAs.
+
+A simulated fleet (FleetSim) feeds GPS pings through MapMatcher into an
+ETAPredictor. Halfway through, the ETAs of every bus are snapshotted,
+and later scored against the arrivals the simulation actually made.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from bus.core.Bus import Bus
+from bus.db.BusDB import BusDB
+from bus.sim.FleetSim import FleetSim
+from bus.track.ETAPredictor import ETAPredictor
+from bus.track.MapMatcher import MapMatcher
+
+_DB_DIR = os.path.join(os.path.dirname(__file__), "..", "db")
+
+N_BUSES = 1_000
+DURATION_S = 7_200.0
+PING_INTERVAL_S = 10.0
+NOISE_M = 10.0
+MAX_START_S = 5_400.0
+N_QUERY_ROUNDS = 5
+
+
+def _feed(sim: FleetSim, matcher, predictor, duration_s: float, args):
+    n_pings = 0
+    for matched in matcher.match(
+        sim.pings(duration_s, args.interval, args.noise)
+    ):
+        predictor.observe(matched)
+        n_pings += 1
+    return n_pings
+
+
+def _time_queries(predictor: ETAPredictor, func, keys, rebuild: bool):
+    """Queries per second over N_QUERY_ROUNDS passes over keys. With
+    rebuild, every route's cache is dropped before each query, as if
+    recomputing along the route every time.
+    """
+    tracks = predictor.matcher.tracks
+    t_start = time.perf_counter()
+    for _ in range(N_QUERY_ROUNDS):
+        for key in keys:
+            if rebuild:
+                for i, track in enumerate(tracks):
+                    predictor.stale_edges[i] = set(range(len(track.edges)))
+            func(key)
+    return N_QUERY_ROUNDS * len(keys) / (time.perf_counter() - t_start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--db-dir", default=_DB_DIR)
+    parser.add_argument("--n-buses", type=int, default=N_BUSES)
+    parser.add_argument("--duration", type=float, default=DURATION_S)
+    parser.add_argument("--interval", type=float, default=PING_INTERVAL_S)
+    parser.add_argument("--noise", type=float, default=NOISE_M)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    db = BusDB(args.db_dir)
+    rng = np.random.default_rng(args.seed)
+    route_ids = list(db.routes)
+    buses = [
+        Bus(route_id=route_ids[i % len(route_ids)])
+        for i in range(args.n_buses)
+    ]
+    sim = FleetSim(
+        db,
+        buses,
+        start_s=rng.random(len(buses)) * MAX_START_S,
+        seed=args.seed,
+    )
+    matcher = MapMatcher(db)
+    predictor = ETAPredictor(matcher)
+
+    t_start = time.perf_counter()
+    n_pings = _feed(sim, matcher, predictor, args.duration / 2, args)
+    dt = time.perf_counter() - t_start
+    t_snapshot = sim.t_s
+    snapshot = {
+        bus_id: predictor.etas(bus_id) for bus_id in predictor.positions
+    }
+    print(
+        f"{n_pings:,} pings matched and observed in {dt:.2f} s "
+        f"({n_pings / dt:,.0f}/s); {len(predictor.pair_stats)} halt "
+        f"pair(s), {len(predictor.segment_stats)} segment(s) with stats"
+    )
+
+    bus_ids = list(predictor.positions)
+    halt_ids = list(matcher.halt_stops)
+    for name, func, keys in [
+        ("etas(bus)", predictor.etas, bus_ids),
+        (
+            "next_buses(halt)",
+            lambda halt_id: predictor.next_buses(halt_id, t_snapshot),
+            halt_ids,
+        ),
+    ]:
+        cached = _time_queries(predictor, func, keys, rebuild=False)
+        rebuilt = _time_queries(predictor, func, keys, rebuild=True)
+        print(
+            f"{name:<18} cached {cached:>11,.0f}/s"
+            f"  rebuilt {rebuilt:>10,.0f}/s  x{cached / rebuilt:5.1f}"
+        )
+
+    _feed(sim, matcher, predictor, args.duration / 2, args)
+    actual: dict[tuple[str, str], float] = {}
+    for event in sim.events():
+        key = (f"bus-{event.bus_index}", event.halt_id)
+        if (
+            event.kind == "arrival"
+            and event.t_s > t_snapshot
+            and key not in actual
+        ):
+            actual[key] = event.t_s
+    errors = np.array(
+        [
+            eta_s - actual[(bus_id, halt_id)]
+            for bus_id, (etas_halt_ids, etas_s) in snapshot.items()
+            for halt_id, eta_s in zip(etas_halt_ids, etas_s.tolist())
+            if (bus_id, halt_id) in actual
+        ]
+    )
+    print(
+        f"{len(errors):,} ETAs scored: median abs error "
+        f"{np.median(np.abs(errors)):.0f} s, bias {np.median(errors):+.0f} s"
+    )
+
+
+if __name__ == "__main__":
+    main()
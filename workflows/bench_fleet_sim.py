@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""Benchmark the vectorised fleet simulation in bus-ticks per second.
+
+Buses are spread over every route in the DB, starting at staggered
+times. Before timing, a small fleet is checked against a plain
+per-bus Python loop, and two runs with the same seed against each other.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from bus.core.Bus import Bus
+from bus.db.BusDB import BusDB
+from bus.sim.FleetSim import FleetSim
+
+_DB_DIR = os.path.join(os.path.dirname(__file__), "..", "db")
+
+N_BUSES = [100, 1_000, 10_000]
+DURATION_S = 3_600.0
+DT_S = 1.0
+MAX_START_S = 1_800.0
+N_CHECK_BUSES = 50
+
+
+def _fleet(db: BusDB, n: int, seed: int) -> tuple[list[Bus], np.ndarray]:
+    route_ids = list(db.routes)
+    buses = [Bus(route_id=route_ids[i % len(route_ids)]) for i in range(n)]
+    start_s = np.random.default_rng(seed).random(n) * MAX_START_S
+    return buses, start_s
+
+
+def _reference_events(sim: FleetSim, start_s: np.ndarray) -> list[tuple]:
+    """Events of each bus stepped on its own, at constant speed (the sim
+    must have speed_jitter=0).
+    """
+    events = []
+    for i in range(len(sim.buses)):
+        first, end = sim.path_start[sim.bus_path[i]], sim.stop_end[i]
+        t = float(start_s[i])
+        for stop in range(first, end):
+            if stop > first:
+                gap_m = sim.stop_cum_m[stop] - sim.stop_cum_m[stop - 1]
+                t += gap_m / sim.speed_mps
+            events.append((t, i, int(sim.stop_halt[stop]), FleetSim.ARRIVAL))
+            if stop + 1 < end:
+                t += sim.dwell_s
+                events.append(
+                    (t, i, int(sim.stop_halt[stop]), FleetSim.DEPARTURE)
+                )
+    return events
+
+
+def _expect(condition: bool, message: str) -> None:
+    if not condition:
+        raise RuntimeError(message)
+
+
+def _check(db: BusDB, seed: int) -> None:
+    buses, start_s = _fleet(db, N_CHECK_BUSES, seed)
+    sim = FleetSim(db, buses, speed_jitter=0.0, start_s=start_s, seed=seed)
+    sim.run(float("inf"), DT_S)
+    arrays = sim.event_arrays()
+    actual = sorted(
+        zip(
+            arrays["t_s"].tolist(),
+            arrays["bus_index"].tolist(),
+            arrays["halt_code"].tolist(),
+            arrays["kind"].tolist(),
+        ),
+        key=lambda e: (e[1], e[0], e[3]),
+    )
+    expected = sorted(
+        _reference_events(sim, start_s), key=lambda e: (e[1], e[0], e[3])
+    )
+    _expect(
+        len(actual) == len(expected),
+        f"{len(actual)} events, per-bus loop has {len(expected)}",
+    )
+    for a, e in zip(actual, expected):
+        _expect(
+            a[1:] == e[1:] and abs(a[0] - e[0]) < 1e-6,
+            f"event {a} differs from per-bus loop {e}",
+        )
+
+    runs = []
+    for _ in range(2):
+        buses, start_s = _fleet(db, N_CHECK_BUSES, seed)
+        sim = FleetSim(db, buses, start_s=start_s, seed=seed)
+        sim.run(DURATION_S, DT_S)
+        runs.append(sim.event_arrays())
+    for column in runs[0]:
+        _expect(
+            np.array_equal(runs[0][column], runs[1][column]),
+            f"{column} differs between runs with the same seed",
+        )
+    print(f"checked {N_CHECK_BUSES} buses against the per-bus loop")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--db-dir", default=_DB_DIR)
+    parser.add_argument("--duration", type=float, default=DURATION_S)
+    parser.add_argument("--dt", type=float, default=DT_S)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    db = BusDB(args.db_dir)
+    _check(db, args.seed)
+    print(f"{len(db.routes)} route(s), {args.duration:.0f} s at {args.dt} s")
+    for n in N_BUSES:
+        buses, start_s = _fleet(db, n, args.seed)
+        sim = FleetSim(db, buses, start_s=start_s, seed=args.seed)
+        t_start = time.perf_counter()
+        sim.run(args.duration, args.dt)
+        dt = time.perf_counter() - t_start
+        n_events = len(sim.event_arrays()["t_s"])
+        print(
+            f"buses={n:>7,}  {dt:7.2f} s"
+            f"  {sim.n_bus_ticks / dt:>14,.0f} bus-ticks/s"
+            f"  {n_events:>10,} events"
+        )
+
+
+if __name__ == "__main__":
+    main()
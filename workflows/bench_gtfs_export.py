@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""Benchmark GTFS export in rows per second, and its peak memory (next
+to that of loading the DB into a BusDB), on synthetic DBs (see
+SyntheticDB) of increasing size.
+
+Each feed is first read back and checked against the same DB loaded
+through BusDB: every halt is a stop at the same position, every route a
+trip, and every shape traces its route's resolved halts over the
+route's length.
+"""
+
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from bus.core.Route import Route
+from bus.db.BusDB import BusDB
+from bus.gtfs.GTFSExport import GTFSExport
+from bus.sim.SyntheticDB import SyntheticDB
+
+_DB_DIR = os.path.join(os.path.dirname(__file__), "..", "db")
+
+# Halts in each synthetic DB
+SCALES = [10_000, 100_000]
+HALTS_PER_ROAD = 101
+
+
+def _read(out_dir: str, file_name: str) -> list[dict]:
+    with open(os.path.join(out_dir, file_name), newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def _expect(condition: bool, message: str) -> None:
+    if not condition:
+        raise RuntimeError(message)
+
+
+def _check(db_dir: str, out_dir: str) -> None:
+    """Round trip: the feed against the DB, loaded the usual way."""
+    db = BusDB(db_dir)
+    stops = {row["stop_id"]: row for row in _read(out_dir, "stops.txt")}
+    _expect(set(stops) == set(db.halts), "stops are not the halts")
+    for halt_id, halt in db.halts.items():
+        stop = stops[halt_id]
+        _expect(
+            float(stop["stop_lat"]) == halt.latlng.lat
+            and float(stop["stop_lon"]) == halt.latlng.lng,
+            f"stop {halt_id} is not at its halt",
+        )
+        _expect(
+            stop["stop_name"].endswith(halt.name.lstrip("& ")),
+            f"stop {halt_id} is misnamed",
+        )
+
+    trips = {row["trip_id"]: row for row in _read(out_dir, "trips.txt")}
+    _expect(set(trips) == set(db.routes), "trips are not the routes")
+    route_codes = {row["route_id"] for row in _read(out_dir, "routes.txt")}
+    _expect(
+        route_codes == {r.code for r in db.routes.values()},
+        "routes are not the route codes",
+    )
+    for route_id, route in db.routes.items():
+        _expect(
+            trips[route_id]["route_id"] == route.code,
+            f"trip {route_id} has the wrong route",
+        )
+
+    shapes = defaultdict(list)
+    for row in _read(out_dir, "shapes.txt"):
+        shapes[row["shape_id"]].append(row)
+    for route_id in db.routes:
+        expected = []
+        for halt in db.resolve_route(route_id).halts:
+            if not expected or expected[-1].id != halt.id:
+                expected.append(halt)
+        shape_id = trips[route_id]["shape_id"]
+        _expect(
+            shape_id == (route_id if expected else ""),
+            f"trip {route_id} has shape_id {shape_id!r}",
+        )
+        points = sorted(
+            shapes.get(route_id, []), key=lambda r: int(r["shape_pt_sequence"])
+        )
+        actual = [
+            (float(p["shape_pt_lat"]), float(p["shape_pt_lon"]))
+            for p in points
+        ]
+        _expect(
+            actual
+            == [(halt.latlng.lat, halt.latlng.lng) for halt in expected],
+            f"shape {route_id} does not trace its halts",
+        )
+        if points:
+            length_m = db.route_profile(route_id).length_m
+            dist_m = float(points[-1]["shape_dist_traveled"])
+            _expect(
+                abs(dist_m - length_m) < 1.0,
+                f"shape {route_id} is {dist_m} m long, not {length_m} m",
+            )
+
+
+def _check_haltless_route(tmp_dir: str) -> None:
+    """A route none of whose segments exist has a trip, with an empty
+    shape_id, and no shape.
+    """
+    db_dir = os.path.join(tmp_dir, "db-haltless")
+    SyntheticDB(n_roads=2, halts_per_road=5, n_routes=1).write(db_dir)
+    BusDB(db_dir).save_route(
+        Route(code="0", direction="N", road_segment_id_list=["no-such-seg"])
+    )
+    out_dir = os.path.join(tmp_dir, "gtfs-haltless")
+    _export(db_dir, out_dir)
+    _check(db_dir, out_dir)
+
+
+def _export(db_dir: str, out_dir: str) -> tuple[dict[str, int], float]:
+    t_start = time.perf_counter()
+    n_rows = GTFSExport(db_dir).write(out_dir)
+    return n_rows, time.perf_counter() - t_start
+
+
+def _peak_mb(func) -> float:
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--scales",
+        type=lambda s: [int(x) for x in s.split(",")],
+        default=SCALES,
+        help="halts per DB, comma-separated",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        out_dir = os.path.join(tmp_dir, "gtfs")
+        _export(_DB_DIR, out_dir)
+        _check(_DB_DIR, out_dir)
+        print("checked the db/ feed against BusDB")
+        _check_haltless_route(tmp_dir)
+        print("checked a route without halts")
+
+        for n_halts in args.scales:
+            synthetic = SyntheticDB(
+                n_roads=max(2, round(n_halts / HALTS_PER_ROAD)),
+                halts_per_road=HALTS_PER_ROAD,
+                n_routes=max(2, round(n_halts / HALTS_PER_ROAD / 2)),
+                segments_per_route=10,
+                seed=args.seed,
+            )
+            db_dir = os.path.join(tmp_dir, f"db-{n_halts}")
+            synthetic.write(db_dir)
+            out_dir = os.path.join(tmp_dir, f"gtfs-{n_halts}")
+
+            n_rows, dt = _export(db_dir, out_dir)
+            _check(db_dir, out_dir)
+            n_total = sum(n_rows.values())
+            peak_mb = _peak_mb(lambda: GTFSExport(db_dir).write(out_dir))
+            db_peak_mb = _peak_mb(lambda: BusDB(db_dir))
+            print(
+                f"halts={synthetic.n_halts:>8,}  {n_total:>9,} rows"
+                f" in {dt:6.2f} s  {n_total / dt:>9,.0f} rows/s"
+                f"  (stops {n_rows['stops.txt']:,},"
+                f" shapes {n_rows['shapes.txt']:,})"
+                f"  peak {peak_mb:6.1f} MB (BusDB load {db_peak_mb:.1f} MB)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""Benchmark batch halt import against entering the same halts one at a
+time, on a synthetic DB (see SyntheticDB).
+
+The batch is a file of new roads laid beside the synthetic city. One at
+a time, each halt is checked with Validator.check_halt_latlng and saved
+in its own commit, as the console does; in a batch, HaltImport validates
+every row in one pass and commits once.
+"""
+
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from bus.core.Halt import Halt
+from bus.core.Road import Road
+from bus.db.BusDB import BusDB
+from bus.db.HaltImport import HaltImport
+from bus.db.ImportRow import ImportRow
+from bus.db.Validator import Validator
+from bus.sim.SyntheticDB import SyntheticDB
+from utils_future.LatLng import LatLng
+from utils_future.SpatialIndex import SpatialIndex
+
+N_DB_HALTS = 100_000
+HALTS_PER_ROAD = 101
+N_BATCH_HALTS = 1_000
+BATCH_HALTS_PER_ROAD = 100
+BATCH_SPACING_M = 300.0
+
+
+def _write_batch(path: str, n_halts: int) -> None:
+    """Roads running east, south of the synthetic city."""
+    origin = SyntheticDB.ORIGIN
+    step_deg = BATCH_SPACING_M / SpatialIndex.M_PER_DEG
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(HaltImport.COLUMNS)
+        for i in range(n_halts):
+            road, k = divmod(i, BATCH_HALTS_PER_ROAD)
+            writer.writerow(
+                [
+                    f"Batch {road} Rd",
+                    "E",
+                    f"Stop {k}",
+                    origin.lat - (road + 1) * step_deg,
+                    origin.lng + k * step_deg,
+                ]
+            )
+
+
+def _one_at_a_time(db: BusDB, rows) -> float:
+    t_start = time.perf_counter()
+    for row in rows:
+        road = Road(name=row.road_name, direction=row.direction)
+        if road.id not in db.roads:
+            db.save_road(road)
+        max_index = db.road_halt_index.max_index(road.id)
+        road_index = 0 if max_index is None else max_index + 1
+        latlng = LatLng(lat=row.lat, lng=row.lng)
+        errors = Validator(db).check_halt_latlng(latlng, road.id, road_index)
+        if errors:
+            raise RuntimeError(f"row {row.row}: {errors}")
+        db.insert_halt(
+            Halt(
+                road_id=road.id,
+                road_index=road_index,
+                name=row.halt_name,
+                latlng=latlng,
+            )
+        )
+    return time.perf_counter() - t_start
+
+
+def _check_too_close_in_db(db_dir: str) -> None:
+    """A DB that already has two halts too close together (the real db/
+    has such pairs) still validates a batch: a row near them gets an
+    error for each, and a row elsewhere none.
+    """
+    SyntheticDB(n_roads=2, halts_per_road=5).write(db_dir)
+    db = BusDB(db_dir)
+    halt = db.halts[sorted(db.halts)[0]]
+    step_deg = 0.4 / SpatialIndex.M_PER_DEG
+    twin = Road(name="Twin Rd", direction="E")
+    with db.transaction():
+        db.save_road(twin)
+        db.save_halt(
+            Halt(
+                road_id=twin.id,
+                road_index=0,
+                name="Twin",
+                latlng=LatLng(
+                    lat=halt.latlng.lat, lng=halt.latlng.lng + step_deg
+                ),
+            )
+        )
+    rows = [
+        ImportRow(
+            row=1,
+            road_name="Near Rd",
+            direction="E",
+            halt_name="Near",
+            lat=halt.latlng.lat + step_deg,
+            lng=halt.latlng.lng,
+        ),
+        ImportRow(
+            row=2,
+            road_name="Far Rd",
+            direction="E",
+            halt_name="Far",
+            lat=halt.latlng.lat - 100 * step_deg,
+            lng=halt.latlng.lng,
+        ),
+    ]
+    HaltImport(db).validate(rows)
+    if len(rows[0].errors) != 2 or rows[1].errors:
+        raise RuntimeError(
+            f"unexpected errors: {[row.errors for row in rows]}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-db-halts", type=int, default=N_DB_HALTS)
+    parser.add_argument("--n-batch-halts", type=int, default=N_BATCH_HALTS)
+    parser.add_argument("--store", choices=["json", "sqlite"], default="json")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        _check_too_close_in_db(os.path.join(tmp_dir, "db-too-close"))
+        print("checked a batch against a DB with halts too close")
+
+        synthetic = SyntheticDB(
+            n_roads=max(2, round(args.n_db_halts / HALTS_PER_ROAD)),
+            halts_per_road=HALTS_PER_ROAD,
+        )
+        ext = ".sqlite" if args.store == "sqlite" else ""
+        paths = [os.path.join(tmp_dir, f"db-{i}{ext}") for i in range(2)]
+        for path in paths:
+            synthetic.write(path)
+        batch_path = os.path.join(tmp_dir, "batch.csv")
+        _write_batch(batch_path, args.n_batch_halts)
+        rows = HaltImport.read(batch_path)
+        print(
+            f"{len(rows):,} halts into {synthetic.n_halts:,} "
+            f"({args.store} store)"
+        )
+
+        dt_single = _one_at_a_time(BusDB(paths[0]), rows)
+        print(f"one at a time   {dt_single:8.2f} s")
+
+        importer = HaltImport(BusDB(paths[1]))
+        t_start = time.perf_counter()
+        if not importer.validate(rows):
+            raise RuntimeError(
+                f"invalid batch: {[r for r in rows if not r.ok][:5]}"
+            )
+        dt_validate = time.perf_counter() - t_start
+        t_start = time.perf_counter()
+        importer.commit(rows)
+        dt_commit = time.perf_counter() - t_start
+        dt_batch = dt_validate + dt_commit
+        print(
+            f"batch           {dt_batch:8.2f} s"
+            f"  (validate {dt_validate:.2f} s, commit {dt_commit:.2f} s)"
+            f"  x{dt_single / dt_batch:.1f}"
+        )
+
+        for path in paths:
+            results = Validator(BusDB(path)).run(full=True)
+            if not all(r.ok for r in results):
+                raise RuntimeError(f"{path} is not valid after import")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Benchmark streaming map-matching in pings per second, on one core.
+
+The feed is synthetic: buses are simulated along the DB's routes with
+FleetSim, and each reports its position every ping interval, with
+Gaussian GPS noise. Matched routes and halt arrivals are scored against
+the simulation.
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from bus.core.Bus import Bus
+from bus.db.BusDB import BusDB
+from bus.sim.FleetSim import FleetSim
+from bus.track.MapMatcher import MapMatcher
+
+_DB_DIR = os.path.join(os.path.dirname(__file__), "..", "db")
+
+N_BUSES = 1_000
+DURATION_S = 3_600.0
+PING_INTERVAL_S = 10.0
+NOISE_M = 10.0
+MAX_START_S = 1_800.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--db-dir", default=_DB_DIR)
+    parser.add_argument("--n-buses", type=int, default=N_BUSES)
+    parser.add_argument("--duration", type=float, default=DURATION_S)
+    parser.add_argument("--interval", type=float, default=PING_INTERVAL_S)
+    parser.add_argument("--noise", type=float, default=NOISE_M)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    db = BusDB(args.db_dir)
+    rng = np.random.default_rng(args.seed)
+    route_ids = list(db.routes)
+    buses = [
+        Bus(route_id=route_ids[i % len(route_ids)])
+        for i in range(args.n_buses)
+    ]
+    sim = FleetSim(
+        db,
+        buses,
+        start_s=rng.random(len(buses)) * MAX_START_S,
+        seed=args.seed,
+    )
+    # Generated up front, so only matching is timed.
+    pings = list(sim.pings(args.duration, args.interval, args.noise))
+
+    t_start = time.perf_counter()
+    matcher = MapMatcher(db)
+    t_build = time.perf_counter() - t_start
+    t_start = time.perf_counter()
+    matched = list(matcher.match(pings))
+    dt = time.perf_counter() - t_start
+
+    n_matched = sum(m.route_id is not None for m in matched)
+    n_right = sum(
+        m.route_id == buses[int(m.ping.bus_id[4:])].route_id for m in matched
+    )
+    sim_arrivals = [e for e in sim.events() if e.kind == "arrival"]
+    expected = Counter((f"bus-{e.bus_index}", e.halt_id) for e in sim_arrivals)
+    expected_t = {
+        (f"bus-{e.bus_index}", e.halt_id): e.t_s for e in sim_arrivals
+    }
+    arrivals = [a for m in matched for a in m.arrivals]
+    actual = Counter((a.bus_id, a.halt_id) for a in arrivals)
+    n_found = sum((expected & actual).values())
+    t_errors = [
+        abs(a.t_s - expected_t[(a.bus_id, a.halt_id)])
+        for a in arrivals
+        if (a.bus_id, a.halt_id) in expected_t
+    ]
+
+    print(
+        f"{len(pings):,} pings from {args.n_buses:,} buses on "
+        f"{len(route_ids)} route(s), every {args.interval:.0f} s, "
+        f"noise {args.noise:.0f} m"
+    )
+    print(f"matcher built in {t_build * 1_000:.1f} ms")
+    print(
+        f"matched in {dt:.2f} s: {len(pings) / dt:,.0f} pings/s "
+        f"({dt / len(pings) * 1e6:.1f} us/ping)"
+    )
+    print(
+        f"on a route {n_matched / len(pings):.1%}, "
+        f"on the right route {n_right / len(pings):.1%}"
+    )
+    print(
+        f"arrivals: {len(arrivals):,} emitted, "
+        f"{n_found / max(1, sum(expected.values())):.1%} of simulated found, "
+        f"median time error "
+        f"{np.median(t_errors) if t_errors else math.nan:.1f} s"
+    )
+
+
+if __name__ == "__main__":
+    main()
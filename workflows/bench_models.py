@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""Benchmark memory and attribute access of the slotted Halt and LatLng
+against the plain dataclasses they replaced.
+"""
+
+import json
+import os
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from bus.core.Halt import Halt
+from utils_future.IDMixin import IDMixin
+from utils_future.LatLng import LatLng
+from utils_future.String import String
+
+N_HALTS = 100_000
+N_ROADS = 1_000
+N_ACCESS_ROUNDS = 10
+
+
+# The models as they were: plain dataclasses, ids rebuilt on every access.
+@dataclass
+class LegacyLatLng:
+    lat: float
+    lng: float
+
+
+@dataclass
+class LegacyHalt:
+    road_id: str
+    road_index: int
+    name: str
+    latlng: LegacyLatLng
+
+    @property
+    def id(self) -> str:
+        return IDMixin.from_items(
+            self.road_id,
+            String.to_kebab_case(self.name),
+        )
+
+
+def _halt_dicts() -> list[dict]:
+    # Parse from JSON so every road_id is a separate string, as on load.
+    return json.loads(
+        json.dumps(
+            [
+                {
+                    "road_id": f"road-{i % N_ROADS:04d}-n",
+                    "road_index": i // N_ROADS,
+                    "name": f"Halt {i}",
+                    "latlng": {
+                        "lat": 6.85 + i * 1e-6,
+                        "lng": 79.82 + i * 1e-6,
+                    },
+                }
+                for i in range(N_HALTS)
+            ]
+        )
+    )
+
+
+def _build_legacy(dicts: list[dict]) -> list[LegacyHalt]:
+    return [
+        LegacyHalt(
+            road_id=d["road_id"],
+            road_index=d["road_index"],
+            name=d["name"],
+            latlng=LegacyLatLng(d["latlng"]["lat"], d["latlng"]["lng"]),
+        )
+        for d in dicts
+    ]
+
+
+def _build_slotted(dicts: list[dict]) -> list[Halt]:
+    return [
+        Halt(
+            road_id=d["road_id"],
+            road_index=d["road_index"],
+            name=d["name"],
+            latlng=LatLng(d["latlng"]["lat"], d["latlng"]["lng"]),
+        )
+        for d in dicts
+    ]
+
+
+def _measure_build(build, dicts: list[dict]) -> tuple[list, float, int]:
+    """(halts, seconds, bytes allocated and still held)."""
+    t_start = time.perf_counter()
+    build(dicts)
+    dt = time.perf_counter() - t_start
+    # Timed apart from the memory run, which tracing slows down.
+    tracemalloc.start()
+    halts = build(dicts)
+    n_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return halts, dt, n_bytes
+
+
+def _time_access(func, halts: list) -> float:
+    """Mean ns per attribute access over N_ACCESS_ROUNDS passes."""
+    t_start = time.perf_counter()
+    for _ in range(N_ACCESS_ROUNDS):
+        for halt in halts:
+            func(halt)
+    dt = time.perf_counter() - t_start
+    return dt / (N_ACCESS_ROUNDS * len(halts)) * 1e9
+
+
+def _expect(condition: bool, message: str) -> None:
+    if not condition:
+        raise RuntimeError(message)
+
+
+def main() -> None:
+    dicts = _halt_dicts()
+    legacy, t_legacy, mem_legacy = _measure_build(_build_legacy, dicts)
+    slotted, t_slotted, mem_slotted = _measure_build(_build_slotted, dicts)
+    _expect(
+        [h.id for h in legacy] == [h.id for h in slotted],
+        "slotted halts differ from legacy halts",
+    )
+
+    print(f"{N_HALTS:,} halts on {N_ROADS:,} roads")
+    print(f"{'':<16}{'legacy':>12}{'slotted':>12}")
+    print(
+        f"{'memory (MB)':<16}{mem_legacy / 1e6:>12.1f}"
+        f"{mem_slotted / 1e6:>12.1f}"
+    )
+    print(
+        f"{'build (ms)':<16}{t_legacy * 1_000:>12.1f}"
+        f"{t_slotted * 1_000:>12.1f}"
+    )
+    for name, func in [
+        ("id (ns)", lambda h: h.id),
+        ("road_id (ns)", lambda h: h.road_id),
+        ("latlng.lat (ns)", lambda h: h.latlng.lat),
+    ]:
+        print(
+            f"{name:<16}{_time_access(func, legacy):>12.1f}"
+            f"{_time_access(func, slotted):>12.1f}"
+        )
+    n_road_ids = len({id(h.road_id) for h in slotted})
+    print(f"distinct road_id objects: {n_road_ids:,} (slotted)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Check console startup time against a budget, using -X importtime.
+
+Exits non-zero if importing the console takes longer than the budget, or
+if it pulls in any of the numeric, plotting or geo modules that should
+load lazily.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+WORKFLOWS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BUDGET_MS = 500
+N_RUNS = 5
+LAZY_MODULES = ["matplotlib", "numpy", "pyproj"]
+
+
+def _import_times() -> dict[str, int]:
+    """Cumulative import time in microseconds for each top-level module."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import console"],
+        cwd=WORKFLOWS_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    args = parser.parse_args()
+
+    runs = [_import_times() for _ in range(N_RUNS)]
+    # The first run may pay for writing .pyc files; take the best run.
+    times = min(runs, key=lambda t: t["console"])
+    total_ms = times["console"] / 1_000
+
+    print(f"import console: {total_ms:.1f} ms (budget {args.budget_ms} ms)")
+    top_level = sorted(
+        ((t, name) for name, t in times.items() if "." not in name),
+        reverse=True,
+    )
+    for t, name in top_level[:10]:
+        print(f"  {t / 1_000:8.1f} ms  {name}")
+
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f"startup {total_ms:.1f} ms > {args.budget_ms} ms")
+    for name in LAZY_MODULES:
+        if name in times:
+            failures.append(f"{name} is imported at startup")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
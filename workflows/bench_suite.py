@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""Benchmark every console operation, without prompts, on synthetic DBs
+(see SyntheticDB) of increasing size, and write the timings as JSON.
+
+Operations: generate and load the DB, validate a halt, insert a halt,
+create a road segment, render a route (offline, Agg) and validate the DB
+(full, then cached). The console's own functions prompt and print, so
+each operation makes the library call they make instead:
+Validator.check_halt_latlng, BusDB.insert_halt, BusDB.save_road_segment,
+RouteMap.save and Validator.run. With --baseline, a previous --out file,
+exits non-zero if any operation's median time grew by more than
+--threshold.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from bus.core.Halt import Halt
+from bus.core.RoadSegment import RoadSegment
+from bus.db.BusDB import BusDB
+from bus.db.Validator import Validator
+from bus.render.RouteMap import RouteMap
+from bus.sim.SyntheticDB import SyntheticDB
+from utils_future.LatLng import LatLng
+from utils_future.TileCache import TileCache
+
+VERSION = 1
+# Halts in each synthetic DB
+SCALES = [1_000, 10_000, 100_000]
+HALTS_PER_ROAD = 101
+SEGMENTS_PER_ROUTE = 10
+DEFAULT_THRESHOLD = 1.5
+# Timed runs of each operation
+N_RUNS = {
+    "load": 3,
+    "validate_halt": 200,
+    "insert_halt": 20,
+    "create_segment": 50,
+    "render_route": 3,
+    "validate_db_full": 1,
+    "validate_db_cached": 3,
+}
+
+
+def _timed(func, n_runs: int) -> list[float]:
+    times = []
+    for i in range(n_runs):
+        t_start = time.perf_counter()
+        func(i)
+        times.append(time.perf_counter() - t_start)
+    return times
+
+
+def _stats(times: list[float]) -> dict:
+    ms = np.array(times) * 1_000
+    return {
+        "n": len(times),
+        "median_ms": round(float(np.median(ms)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "min_ms": round(float(ms.min()), 3),
+    }
+
+
+def _new_halt(db: BusDB, rng: np.random.Generator, name: str) -> Halt:
+    """A halt midway between two neighbours on a random road, which passes
+    the spacing rules.
+    """
+    road_id = list(db.roads)[int(rng.integers(len(db.roads)))]
+    road_index = int(
+        rng.integers(1, db.road_halt_index.max_index(road_id) + 1)
+    )
+    a, b = db.halts_on_road(road_id, road_index - 1, road_index)
+    return Halt(
+        road_id=road_id,
+        road_index=road_index,
+        name=name,
+        latlng=LatLng(
+            lat=(a.latlng.lat + b.latlng.lat) / 2,
+            lng=(a.latlng.lng + b.latlng.lng) / 2,
+        ),
+    )
+
+
+def _bench_scale(n_halts: int, args, tmp_dir: str) -> dict:
+    synthetic = SyntheticDB(
+        n_roads=max(2, round(n_halts / HALTS_PER_ROAD)),
+        halts_per_road=HALTS_PER_ROAD,
+        n_routes=max(2, round(n_halts / HALTS_PER_ROAD / 2)),
+        segments_per_route=SEGMENTS_PER_ROUTE,
+        seed=args.seed,
+    )
+    db_path = os.path.join(tmp_dir, f"db-{n_halts}")
+    if args.store == "sqlite":
+        db_path += ".sqlite"
+    rng = np.random.default_rng(args.seed)
+    ops = {}
+
+    ops["generate"] = _timed(lambda _: synthetic.write(db_path), 1)
+    ops["load"] = _timed(lambda _: BusDB(db_path), N_RUNS["load"])
+    db = BusDB(db_path)
+
+    def validate_halt(i: int) -> None:
+        halt = _new_halt(db, rng, f"Bench {i}")
+        errors = Validator(db).check_halt_latlng(
+            halt.latlng, halt.road_id, halt.road_index
+        )
+        if errors:
+            raise RuntimeError(f"{halt.id} failed validation: {errors}")
+
+    def insert_halt(i: int) -> None:
+        db.insert_halt(_new_halt(db, rng, f"Bench {i}"))
+
+    def create_segment(_: int) -> None:
+        road_id = list(db.roads)[int(rng.integers(len(db.roads)))]
+        start, end = sorted(
+            rng.choice(
+                db.road_halt_index.max_index(road_id) + 1, 2, replace=False
+            ).tolist()
+        )
+        db.save_road_segment(
+            RoadSegment(
+                road_id=road_id, start_road_index=start, end_road_index=end
+            )
+        )
+
+    tile_cache = TileCache(os.path.join(tmp_dir, "tiles"), offline=True)
+
+    def render_route(_: int) -> None:
+        route_id = list(db.routes)[int(rng.integers(len(db.routes)))]
+        RouteMap(db.routes[route_id], db.resolve_route(route_id)).save(
+            os.path.join(tmp_dir, f"{route_id}.png"), tile_cache
+        )
+
+    for name, func in [
+        ("validate_halt", validate_halt),
+        ("insert_halt", insert_halt),
+        ("create_segment", create_segment),
+        ("render_route", render_route),
+    ]:
+        ops[name] = _timed(func, N_RUNS[name])
+
+    validator = Validator(db, cache_path=Validator.cache_path_for(db_path))
+    ops["validate_db_full"] = _timed(
+        lambda _: validator.run(full=True), N_RUNS["validate_db_full"]
+    )
+    ops["validate_db_cached"] = _timed(
+        lambda _: validator.run(), N_RUNS["validate_db_cached"]
+    )
+    results = validator.run()
+    failed = [r for r in results if not r.ok]
+    if failed:
+        raise RuntimeError(f"synthetic DB failed validation: {failed[:5]}")
+
+    return {
+        "n_halts": synthetic.n_halts,
+        "n_roads": synthetic.n_roads,
+        "n_road_segments": synthetic.n_road_segments,
+        "n_routes": synthetic.n_routes,
+        "ops": {name: _stats(times) for name, times in ops.items()},
+    }
+
+
+def _regressions(report: dict, baseline: dict, threshold: float) -> list:
+    """(scale, op, ratio) for every median more than threshold times the
+    baseline's, at the same scale and store.
+    """
+    if baseline.get("store") != report["store"]:
+        return []
+    regressions = []
+    for scale, result in report["scales"].items():
+        base_ops = baseline.get("scales", {}).get(scale, {}).get("ops", {})
+        for op, stats in result["ops"].items():
+            if op in base_ops and base_ops[op]["median_ms"] > 0:
+                ratio = stats["median_ms"] / base_ops[op]["median_ms"]
+                if ratio > threshold:
+                    regressions.append((scale, op, ratio))
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--scales",
+        type=lambda s: [int(x) for x in s.split(",")],
+        default=SCALES,
+        help="halts per DB, comma-separated",
+    )
+    parser.add_argument("--store", choices=["json", "sqlite"], default="json")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the results here, as JSON")
+    parser.add_argument("--baseline", help="results to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    import matplotlib
+
+    matplotlib.use("Agg")
+
+    report = {
+        "version": VERSION,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "store": args.store,
+        "seed": args.seed,
+        "scales": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_halts in args.scales:
+            result = _bench_scale(n_halts, args, tmp_dir)
+            report["scales"][str(n_halts)] = result
+            print(
+                f"{result['n_halts']:,} halts, {result['n_roads']:,} roads, "
+                f"{result['n_road_segments']:,} segments, "
+                f"{result['n_routes']:,} routes ({args.store})"
+            )
+            for op, stats in result["ops"].items():
+                print(
+                    f"  {op:<20} median {stats['median_ms']:>10.2f} ms"
+                    f"  p95 {stats['p95_ms']:>10.2f} ms  (n={stats['n']})"
+                )
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("store") != args.store:
+            print(f"baseline store is not {args.store}: nothing compared")
+        regressions = _regressions(report, baseline, args.threshold)
+        for scale, op, ratio in regressions:
+            print(f"FAIL: {op} at {scale} halts is x{ratio:.2f} the baseline")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
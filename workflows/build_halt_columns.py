@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""Write the halts of the db/ JSON tree as memory-mappable columns, under
+db/halt_columns/, for analytics workers to share.
+
+Columns already built from the tree as it is now are kept, unless
+--force; stale ones are rebuilt.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from bus.db.HaltColumns import HaltColumns
+
+_DB_DIR = os.path.join(os.path.dirname(__file__), "..", "db")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--db-dir", default=_DB_DIR)
+    parser.add_argument(
+        "--out", help="Output directory (default: <db-dir>/halt_columns)"
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="Rebuild even if up to date"
+    )
+    args = parser.parse_args()
+    out_dir = args.out or HaltColumns.path(args.db_dir)
+
+    if not args.force:
+        columns = HaltColumns.load_if_fresh(args.db_dir, out_dir)
+        if columns is not None:
+            print(
+                f"{os.path.relpath(out_dir)}: {len(columns)} halt(s), "
+                "up to date."
+            )
+            return
+
+    t_start = time.perf_counter()
+    columns = HaltColumns.from_json_tree(args.db_dir)
+    columns.save(out_dir)
+    dt = time.perf_counter() - t_start
+    print(
+        f"{os.path.relpath(out_dir)}: {len(columns)} halt(s) on "
+        f"{len(columns.road_ids)} road(s), in {dt * 1_000:.0f} ms."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""Compile the db/ JSON tree into db/snapshot.json for fast loading.
+
+Only files whose mtime, size and hash changed since the last build are
+re-parsed.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from bus.db.Snapshot import Snapshot
+
+_DB_DIR = os.path.join(os.path.dirname(__file__), "..", "db")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--db-dir", default=_DB_DIR)
+    args = parser.parse_args()
+
+    t_start = time.perf_counter()
+    n_files, n_parsed = Snapshot.build(args.db_dir)
+    dt = time.perf_counter() - t_start
+    print(
+        f"{os.path.relpath(Snapshot.path(args.db_dir))}: {n_files} file(s), "
+        f"{n_parsed} re-parsed, in {dt * 1_000:.0f} ms."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,12 @@
 #!/usr/bin/env python3
 """Console workflow for adding bus route data."""
 
+import argparse
 import json
 import os
 import subprocess
 import sys
 
-import contextily as ctx
-import matplotlib.pyplot as plt
-
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
 
 from rich.console import Console
@@ -19,16 +17,27 @@ from rich.table import Table
 from bus.core.Halt import Halt
 from bus.core.Road import Road
 from bus.core.RoadSegment import RoadSegment
+from bus.core.Route import Route
+from bus.db.BusDB import BusDB
+from bus.db.HaltImport import HaltImport
+from bus.db.Validator import Validator
+from bus.render.RouteMap import RouteMap
 from utils_future.LatLng import LatLng
 from utils_future.String import String
+from utils_future.TileCache import TileCache
 
 console = Console()
 
 _DB_DIR = os.path.join(os.path.dirname(__file__), "..", "db")
-HALTS_DIR = os.path.join(_DB_DIR, "halts")
-ROADS_DIR = os.path.join(_DB_DIR, "roads")
-ROAD_SEGMENTS_DIR = os.path.join(_DB_DIR, "road_segments")
-ROUTES_DIR = os.path.join(_DB_DIR, "routes")
+_TILE_CACHE_DIR = os.path.join(os.path.dirname(__file__), "..", ".tile_cache")
+_ROUTE_IMAGES_DIR = os.path.join(
+    os.path.dirname(__file__), "..", "images", "routes"
+)
+
+# Set by --db: a db/ directory, or an SQLite file (.sqlite/.sqlite3/.db).
+_db_path = _DB_DIR
+# Set by --offline: render basemaps from the tile cache only.
+_offline = False
 
 
 # ---------------------------------------------------------------------------
@@ -36,82 +45,28 @@ ROUTES_DIR = os.path.join(_DB_DIR, "routes")
 # ---------------------------------------------------------------------------
 
 
-def _ensure_dirs() -> None:
-    for d in [HALTS_DIR, ROADS_DIR, ROAD_SEGMENTS_DIR, ROUTES_DIR]:
-        os.makedirs(d, exist_ok=True)
-
-
-def _load_json(path: str) -> dict:
-    with open(path) as f:
-        return json.load(f)
-
-
-def _save_json(path: str, data: dict) -> None:
-    with open(path, "w") as f:
-        json.dump(data, f, indent=2)
+def _on_save(path: str) -> None:
     console.print(
         f"  [dim]Saved →[/dim] [green]{os.path.relpath(path)}[/green]"
     )
 
 
-def _list_db_ids(dir_path: str) -> list[str]:
-    if not os.path.exists(dir_path):
-        return []
-    return sorted(
-        f.removesuffix(".json")
-        for f in os.listdir(dir_path)
-        if f.endswith(".json")
-    )
+_db: BusDB | None = None
+
+
+def _get_db() -> BusDB:
+    """Load the DB on first use; later calls reuse the in-memory copy."""
+    global _db
+    if _db is None:
+        _db = BusDB(_db_path, on_save=_on_save)
+    return _db
 
 
 def _validate_halt_latlng(
     latlng: LatLng, road_id: str, road_index: int
 ) -> list[str]:
     """Return a list of validation error messages (empty list = valid)."""
-    errors = []
-    all_halt_ids = _list_db_ids(HALTS_DIR)
-
-    # Rule 1: at least 1 m from every existing halt
-    for hid in all_halt_ids:
-        try:
-            hdata = _load_json(os.path.join(HALTS_DIR, f"{hid}.json"))
-            ll = hdata.get("latlng", {})
-            other = LatLng(lat=ll["lat"], lng=ll["lng"])
-            dist = latlng.distance_m(other)
-            if dist < 1.0:
-                errors.append(
-                    f"Too close to [bold]{hid}[/bold] ({dist:.2f} m — must be ≥ 1 m)"
-                )
-        except (FileNotFoundError, KeyError):
-            continue
-
-    # Rule 2: no more than 1 km from the immediately preceding halt on the same road
-    prev_halts: list[tuple[int, LatLng, str]] = []
-    for hid in all_halt_ids:
-        if not hid.startswith(road_id + "-"):
-            continue
-        try:
-            hdata = _load_json(os.path.join(HALTS_DIR, f"{hid}.json"))
-            ridx = hdata.get("road_index", 0)
-            if ridx < road_index:
-                ll = hdata.get("latlng", {})
-                prev_halts.append(
-                    (ridx, LatLng(lat=ll["lat"], lng=ll["lng"]), hid)
-                )
-        except (FileNotFoundError, KeyError):
-            continue
-
-    if prev_halts:
-        prev_halts.sort(key=lambda h: h[0])
-        _, prev_latlng, prev_hid = prev_halts[-1]
-        dist = latlng.distance_m(prev_latlng)
-        if dist > 1_000.0:
-            errors.append(
-                f"Too far from previous halt [bold]{prev_hid}[/bold] "
-                f"({dist:.0f} m — must be ≤ 1 km)"
-            )
-
-    return errors
+    return Validator(_get_db()).check_halt_latlng(latlng, road_id, road_index)
 
 
 def _geocode(
@@ -157,7 +112,8 @@ def _geocode(
 
 def _select_or_create_road() -> tuple[str, str]:
     """Return (road_id, road_name). Creates a new road (with halts) if needed."""
-    existing = _list_db_ids(ROADS_DIR)
+    db = _get_db()
+    existing = sorted(db.roads)
 
     if existing:
         table = Table(
@@ -177,12 +133,9 @@ def _select_or_create_road() -> tuple[str, str]:
                 idx = int(raw.strip()) - 1
                 if 0 <= idx < len(existing):
                     road_id = existing[idx]
-                    road_data = _load_json(
-                        os.path.join(ROADS_DIR, f"{road_id}.json")
-                    )
                     console.print(f"  Using road [bold]{road_id}[/bold]")
-                    return road_id, road_data["name"]
-            except (ValueError, FileNotFoundError):
+                    return road_id, db.roads[road_id].name
+            except ValueError:
                 pass
             console.print(
                 "[red]Invalid selection — creating a new road.[/red]"
@@ -212,13 +165,10 @@ def _create_road() -> tuple[str, str]:
         if direction not in _VALID_DIRECTIONS:
             console.print("[red]Must be one of N, S, E, W.[/red]")
 
+    db = _get_db()
     road = Road(name=road_name, direction=direction)
     road_id = road.id
-
-    _save_json(
-        os.path.join(ROADS_DIR, f"{road_id}.json"),
-        {"name": road_name, "direction": direction},
-    )
+    db.save_road(road)
 
     # Collect halts
     console.print(
@@ -227,17 +177,8 @@ def _create_road() -> tuple[str, str]:
 
     def _next_road_index() -> int:
         """Highest road_index currently on this road + 1, or 0 if none."""
-        ids = _list_db_ids(HALTS_DIR)
-        indices = []
-        for hid in ids:
-            if not hid.startswith(road_id + "-"):
-                continue
-            try:
-                d = _load_json(os.path.join(HALTS_DIR, f"{hid}.json"))
-                indices.append(d.get("road_index", 0))
-            except (FileNotFoundError, KeyError):
-                pass
-        return max(indices) + 1 if indices else 0
+        max_index = db.road_halt_index.max_index(road_id)
+        return max_index + 1 if max_index is not None else 0
 
     halt_counter = 0
     while True:
@@ -248,9 +189,8 @@ def _create_road() -> tuple[str, str]:
             break
 
         # Duplicate check
-        existing_halt_ids = _list_db_ids(HALTS_DIR)
         candidate_id = f"{road_id}-{String.to_kebab_case(halt_name.strip())}"
-        if candidate_id in existing_halt_ids:
+        if candidate_id in db.halts:
             console.print(
                 f"  [red]Halt '[bold]{halt_name.strip()}[/bold]' already exists on this road — skipped.[/red]"
             )
@@ -279,67 +219,6 @@ def _create_road() -> tuple[str, str]:
                 )
                 road_index = end_index
 
-        # Shift existing halts with road_index >= road_index
-        if road_index < end_index:
-            ids_on_road = sorted(
-                [
-                    hid
-                    for hid in _list_db_ids(HALTS_DIR)
-                    if hid.startswith(road_id + "-")
-                ]
-            )
-            for hid in reversed(ids_on_road):
-                try:
-                    hdata = _load_json(os.path.join(HALTS_DIR, f"{hid}.json"))
-                    if hdata.get("road_index", 0) >= road_index:
-                        hdata["road_index"] += 1
-                        _save_json(
-                            os.path.join(HALTS_DIR, f"{hid}.json"), hdata
-                        )
-                except (FileNotFoundError, KeyError):
-                    pass
-            # Shift road segments on this road
-            for sid in _list_db_ids(ROAD_SEGMENTS_DIR):
-                seg_path = os.path.join(ROAD_SEGMENTS_DIR, f"{sid}.json")
-                try:
-                    seg = _load_json(seg_path)
-                except FileNotFoundError:
-                    continue
-                if seg.get("road_id") != road_id:
-                    continue
-                changed = False
-                if seg.get("start_road_index", 0) >= road_index:
-                    seg["start_road_index"] += 1
-                    changed = True
-                if seg.get("end_road_index", 0) >= road_index:
-                    seg["end_road_index"] += 1
-                    changed = True
-                if changed:
-                    new_seg_id = RoadSegment(
-                        road_id=road_id,
-                        start_road_index=seg["start_road_index"],
-                        end_road_index=seg["end_road_index"],
-                    ).id
-                    os.replace(
-                        seg_path,
-                        os.path.join(ROAD_SEGMENTS_DIR, f"{new_seg_id}.json"),
-                    )
-                    for rid in _list_db_ids(ROUTES_DIR):
-                        route_path = os.path.join(ROUTES_DIR, f"{rid}.json")
-                        try:
-                            rdata = _load_json(route_path)
-                            seg_list = rdata.get("road_segment_id_list", [])
-                            if sid in seg_list:
-                                seg_list[seg_list.index(sid)] = new_seg_id
-                                rdata["road_segment_id_list"] = seg_list
-                                _save_json(route_path, rdata)
-                        except (FileNotFoundError, KeyError):
-                            continue
-                    _save_json(
-                        os.path.join(ROAD_SEGMENTS_DIR, f"{new_seg_id}.json"),
-                        seg,
-                    )
-
         latlng = _geocode(
             halt_name.strip(),
             road_name,
@@ -352,15 +231,9 @@ def _create_road() -> tuple[str, str]:
             name=halt_name.strip(),
             latlng=latlng,
         )
-        _save_json(
-            os.path.join(HALTS_DIR, f"{halt.id}.json"),
-            {
-                "road_id": road_id,
-                "road_index": road_index,
-                "name": halt_name.strip(),
-                "latlng": {"lat": latlng.lat, "lng": latlng.lng},
-            },
-        )
+        # Shift existing halts with road_index >= road_index, and save the
+        # new halt, in one transaction
+        db.insert_halt(halt)
         halt_counter += 1
 
     return road_id, road_name
@@ -373,7 +246,7 @@ def _create_road() -> tuple[str, str]:
 
 def _select_or_create_road_segment() -> str:
     """Return a road_segment_id. Creates a new one if needed."""
-    existing = _list_db_ids(ROAD_SEGMENTS_DIR)
+    existing = sorted(_get_db().road_segments)
 
     if existing:
         table = Table(
@@ -414,8 +287,7 @@ def _create_road_segment() -> str:
     road_id, _road_name = _select_or_create_road()
 
     # Derive sensible default for end index from existing halts on this road
-    halt_ids = _list_db_ids(HALTS_DIR)
-    road_halt_count = sum(1 for h in halt_ids if h.startswith(road_id + "-"))
+    road_halt_count = len(_get_db().road_halt_index.halt_ids(road_id))
     default_end = str(max(0, road_halt_count - 1))
 
     start = int(Prompt.ask("  Start road index", default="0"))
@@ -424,12 +296,7 @@ def _create_road_segment() -> str:
     seg = RoadSegment(
         road_id=road_id, start_road_index=start, end_road_index=end
     )
-    seg_data = {
-        "road_id": road_id,
-        "start_road_index": start,
-        "end_road_index": end,
-    }
-    _save_json(os.path.join(ROAD_SEGMENTS_DIR, f"{seg.id}.json"), seg_data)
+    _get_db().save_road_segment(seg)
     return seg.id
 
 
@@ -437,12 +304,7 @@ def _create_road_segment() -> str:
 # Route
 # ---------------------------------------------------------------------------
 
-_DIRECTION_NAMES = {
-    "N": "northbound",
-    "S": "southbound",
-    "E": "eastbound",
-    "W": "westbound",
-}
+_DIRECTION_NAMES = Route.DIRECTION_NAMES
 
 
 def _new_route() -> None:
@@ -471,13 +333,12 @@ def _new_route() -> None:
         if more.strip().lower() == "n":
             break
 
-    route_id = f"{code}-{_DIRECTION_NAMES[direction]}"
-    route_data = {
-        "code": code,
-        "direction": direction,
-        "road_segment_id_list": road_segment_ids,
-    }
-    _save_json(os.path.join(ROUTES_DIR, f"{route_id}.json"), route_data)
+    route = Route(
+        code=code,
+        direction=direction,
+        road_segment_id_list=road_segment_ids,
+    )
+    _get_db().save_route(route)
 
     console.print(
         Panel(
@@ -493,9 +354,10 @@ def _new_route() -> None:
 # ---------------------------------------------------------------------------
 
 
-def _select_route() -> tuple[str, dict] | None:
-    """Prompt user to pick an existing route. Returns (route_id, route_data) or None."""
-    existing = _list_db_ids(ROUTES_DIR)
+def _select_route() -> tuple[str, Route] | None:
+    """Prompt user to pick an existing route. Returns (route_id, route) or None."""
+    db = _get_db()
+    existing = sorted(db.routes)
     if not existing:
         console.print("[yellow]No routes in DB yet.[/yellow]")
         return None
@@ -507,11 +369,7 @@ def _select_route() -> tuple[str, dict] | None:
     table.add_column("Route ID")
     table.add_column("Segments")
     for i, rid in enumerate(existing, 1):
-        try:
-            data = _load_json(os.path.join(ROUTES_DIR, f"{rid}.json"))
-            segs = ", ".join(data.get("road_segment_id_list", []))
-        except (FileNotFoundError, KeyError):
-            segs = ""
+        segs = ", ".join(db.routes[rid].road_segment_id_list)
         table.add_row(str(i), rid, segs)
     console.print(table)
 
@@ -520,10 +378,8 @@ def _select_route() -> tuple[str, dict] | None:
         idx = int(raw.strip()) - 1
         if 0 <= idx < len(existing):
             route_id = existing[idx]
-            return route_id, _load_json(
-                os.path.join(ROUTES_DIR, f"{route_id}.json")
-            )
-    except (ValueError, FileNotFoundError):
+            return route_id, db.routes[route_id]
+    except ValueError:
         pass
     console.print("[red]Invalid selection.[/red]")
     return None
@@ -536,9 +392,9 @@ def _add_segments_to_route() -> None:
     result = _select_route()
     if result is None:
         return
-    route_id, route_data = result
+    route_id, route = result
 
-    current_segs: list[str] = route_data.get("road_segment_id_list", [])
+    current_segs: list[str] = route.road_segment_id_list
     console.print(
         f"\n[bold]Route:[/bold] [cyan]{route_id}[/cyan] — "
         f"{len(current_segs)} segment(s) currently"
@@ -563,8 +419,8 @@ def _add_segments_to_route() -> None:
         if more.strip().lower() == "n":
             break
 
-    route_data["road_segment_id_list"] = current_segs
-    _save_json(os.path.join(ROUTES_DIR, f"{route_id}.json"), route_data)
+    route.road_segment_id_list = current_segs
+    _get_db().save_route(route)
 
     console.print(
         Panel(
@@ -585,7 +441,8 @@ def _update_halt_latlng() -> None:
     console.print(Panel("[bold]Update Halt LatLng[/bold]", expand=False))
 
     # --- pick a road ---
-    roads = _list_db_ids(ROADS_DIR)
+    db = _get_db()
+    roads = sorted(db.roads)
     if not roads:
         console.print("[yellow]No roads in DB yet.[/yellow]")
         return
@@ -611,8 +468,7 @@ def _update_halt_latlng() -> None:
 
     # --- loop over halts on that road ---
     while True:
-        all_halts = _list_db_ids(HALTS_DIR)
-        road_halts = [h for h in all_halts if h.startswith(road_id + "-")]
+        road_halts = sorted(db.road_halt_index.halt_ids(road_id))
         if not road_halts:
             console.print(
                 f"[yellow]No halts found for road [bold]{road_id}[/bold].[/yellow]"
@@ -628,12 +484,8 @@ def _update_halt_latlng() -> None:
         halt_table.add_column("Halt ID")
         halt_table.add_column("LatLng", style="dim")
         for i, hid in enumerate(road_halts, 1):
-            try:
-                data = _load_json(os.path.join(HALTS_DIR, f"{hid}.json"))
-                ll = data.get("latlng", {})
-                latlng_str = f"{ll.get('lat', '?')}, {ll.get('lng', '?')}"
-            except (FileNotFoundError, KeyError):
-                latlng_str = ""
+            ll = db.halts[hid].latlng
+            latlng_str = f"{ll.lat}, {ll.lng}"
             halt_table.add_row(str(i), hid, latlng_str)
         console.print(halt_table)
 
@@ -651,8 +503,7 @@ def _update_halt_latlng() -> None:
             continue
 
         halt_id = road_halts[hidx]
-        halt_path = os.path.join(HALTS_DIR, f"{halt_id}.json")
-        halt_data = _load_json(halt_path)
+        halt = db.halts[halt_id]
 
         while True:
             entry = Prompt.ask(
@@ -669,8 +520,8 @@ def _update_halt_latlng() -> None:
                 "[red]Enter as two numbers separated by a comma, e.g. 6.9171, 79.8656[/red]"
             )
 
-        halt_data["latlng"] = {"lat": lat, "lng": lng}
-        _save_json(halt_path, halt_data)
+        halt.latlng = LatLng(lat=lat, lng=lng)
+        db.save_halt(halt)
 
 
 # ---------------------------------------------------------------------------
@@ -685,144 +536,42 @@ def _render_route_map() -> None:
     result = _select_route()
     if result is None:
         return
-    route_id, route_data = result
-
-    seg_ids: list[str] = route_data.get("road_segment_id_list", [])
+    route_id, route = result
+    resolved = _get_db().resolve_route(route_id)
+    for sid in resolved.missing_segment_ids:
+        console.print(f"  [yellow]Segment file not found: {sid}[/yellow]")
 
-    # Load segment metadata
-    segments: list[dict] = []
-    for sid in seg_ids:
-        seg_path = os.path.join(ROAD_SEGMENTS_DIR, f"{sid}.json")
-        try:
-            segments.append(_load_json(seg_path))
-        except FileNotFoundError:
-            console.print(f"  [yellow]Segment file not found: {sid}[/yellow]")
-
-    all_halt_ids = _list_db_ids(HALTS_DIR)
-
-    # Build ordered list of halts per segment, sorted by road_index
-    # Each entry: (lat, lng, label)
-    segments_halts: list[list[tuple[float, float, str]]] = []
-
-    for seg in segments:
-        road_id = seg["road_id"]
-        start_idx = seg.get("start_road_index", 0)
-        end_idx = seg.get("end_road_index", 9999)
-
-        seg_halts: list[tuple[int, float, float, str]] = (
-            []
-        )  # (road_index, lat, lng, label)
-        for hid in all_halt_ids:
-            if not hid.startswith(road_id + "-"):
-                continue
-            try:
-                hdata = _load_json(os.path.join(HALTS_DIR, f"{hid}.json"))
-                ridx = hdata.get("road_index", 0)
-                if start_idx <= ridx <= end_idx:
-                    ll = hdata.get("latlng", {})
-                    lat = ll.get("lat")
-                    lng = ll.get("lng")
-                    if lat is not None and lng is not None:
-                        label = f"{road_id} [{ridx}]\n{hdata.get('name', hid)}"
-                        seg_halts.append((ridx, lat, lng, label))
-            except (FileNotFoundError, KeyError):
-                continue
-
-        seg_halts.sort(key=lambda h: h[0])
-        segments_halts.append(
-            [(lat, lng, label) for _, lat, lng, label in seg_halts]
-        )
-
-    # Flatten to ordered halt_points and record segment boundaries for linking
-    halt_points: list[tuple[float, float, str]] = []
-    for seg_h in segments_halts:
-        halt_points.extend(seg_h)
-
-    if not halt_points:
+    if not resolved.halts:
         console.print(
             "[yellow]No halts with latlng found for this route.[/yellow]"
         )
         return
 
-    console.print(f"  Plotting [bold]{len(halt_points)}[/bold] halt(s)…")
+    length_km = _get_db().route_profile(route_id).length_m / 1_000
+    console.print(
+        f"  Plotting [bold]{len(resolved.halts)}[/bold] halt(s), "
+        f"{length_km:.1f} km…"
+    )
 
-    try:
-        import matplotlib
+    # The plotting and geo stack is only needed here, so it is imported
+    # here rather than at module level, keeping console startup fast.
+    import matplotlib
 
+    try:
         matplotlib.use("TkAgg")
     except Exception:
         pass
 
-    fig, ax = plt.subplots(figsize=(8, 10))
-
-    lats = [p[0] for p in halt_points]
-    lngs = [p[1] for p in halt_points]
-
-    try:
-        import pyproj
-
-        transformer = pyproj.Transformer.from_crs(
-            "EPSG:4326", "EPSG:3857", always_xy=True
-        )
-        xs, ys = transformer.transform(lngs, lats)
-    except Exception:
-        xs, ys = lngs, lats
-        transformer = None
-
-    # Draw lines segment by segment (last of one links to first of next)
-    offset = 0
-    for seg_h in segments_halts:
-        n = len(seg_h)
-        if n == 0:
-            continue
-        seg_xs = xs[offset : offset + n]
-        seg_ys = ys[offset : offset + n]
-        ax.plot(seg_xs, seg_ys, color="steelblue", linewidth=1.5, zorder=4)
-        # Link last halt of this segment to first halt of next segment
-        if offset + n < len(halt_points):
-            ax.plot(
-                [xs[offset + n - 1], xs[offset + n]],
-                [ys[offset + n - 1], ys[offset + n]],
-                color="steelblue",
-                linewidth=1.5,
-                linestyle="dashed",
-                zorder=4,
-            )
-        offset += n
-
-    ax.scatter(xs, ys, zorder=5, color="crimson", s=60)
-    for x, y, label in zip(xs, ys, [p[2] for p in halt_points]):
-        ax.annotate(
-            label,
-            (x, y),
-            textcoords="offset points",
-            xytext=(6, 4),
-            fontsize=6,
-            zorder=6,
-        )
-
-    if transformer is not None:
-        try:
-            ctx.add_basemap(ax, source=ctx.providers.OpenStreetMap.Mapnik)
-        except Exception as exc:
-            console.print(f"  [yellow]Basemap unavailable: {exc}[/yellow]")
-
-    ax.set_title(f"Route {route_data.get('code', route_id)} — {route_id}")
-    ax.set_axis_off()
-    plt.tight_layout()
-
     img_path = os.path.abspath(
-        os.path.join(
-            os.path.dirname(__file__),
-            "..",
-            "images",
-            "routes",
-            f"{route_id}.png",
-        )
+        os.path.join(_ROUTE_IMAGES_DIR, f"{route_id}.png")
     )
-    os.makedirs(os.path.dirname(img_path), exist_ok=True)
-    plt.savefig(img_path, dpi=150, bbox_inches="tight")
-    plt.close(fig)
+    n_tiles = RouteMap(route, resolved).save(
+        img_path, TileCache(_TILE_CACHE_DIR, offline=_offline)
+    )
+    if n_tiles == 0:
+        console.print(
+            "  [yellow]Basemap unavailable: no tiles cached or fetched.[/yellow]"
+        )
     console.print(f"  [green]Saved →[/green] {img_path}")
 
     # Open with the OS default image viewer
@@ -842,7 +591,8 @@ def _insert_halt() -> None:
     console.print(Panel("[bold]Insert Halt[/bold]", expand=False))
 
     # 1. Select road
-    roads = _list_db_ids(ROADS_DIR)
+    db = _get_db()
+    roads = sorted(db.roads)
     if not roads:
         console.print("[yellow]No roads in DB yet.[/yellow]")
         return
@@ -864,17 +614,7 @@ def _insert_halt() -> None:
         return
 
     # 2. Show current halts on the road sorted by road_index
-    all_halt_ids = _list_db_ids(HALTS_DIR)
-    road_halts: list[tuple[int, str, dict]] = []  # (road_index, halt_id, data)
-    for hid in all_halt_ids:
-        if not hid.startswith(road_id + "-"):
-            continue
-        try:
-            hdata = _load_json(os.path.join(HALTS_DIR, f"{hid}.json"))
-            road_halts.append((hdata.get("road_index", 0), hid, hdata))
-        except (FileNotFoundError, KeyError):
-            continue
-    road_halts.sort(key=lambda h: h[0])
+    road_halts = db.halts_on_road(road_id)
 
     if not road_halts:
         console.print(
@@ -887,8 +627,8 @@ def _insert_halt() -> None:
     )
     halt_table.add_column("Index", style="cyan", width=6)
     halt_table.add_column("Halt ID")
-    for ridx, hid, _ in road_halts:
-        halt_table.add_row(str(ridx), hid)
+    for halt in road_halts:
+        halt_table.add_row(str(halt.road_index), halt.id)
     console.print(halt_table)
 
     # 3. Ask for insert position
@@ -901,61 +641,9 @@ def _insert_halt() -> None:
         console.print("[red]Invalid index.[/red]")
         return
 
-    # 4. Shift all halts with road_index >= insert_at
-    for ridx, hid, hdata in reversed(road_halts):
-        if ridx < insert_at:
-            continue
-        old_path = os.path.join(HALTS_DIR, f"{hid}.json")
-        new_ridx = ridx + 1
-        hdata["road_index"] = new_ridx
-        # Rebuild halt id (road_id + kebab name, no index in id — just overwrite same file)
-        _save_json(old_path, hdata)
-
-    # 5. Update road segments whose end_road_index >= insert_at for this road
-    for sid in _list_db_ids(ROAD_SEGMENTS_DIR):
-        seg_path = os.path.join(ROAD_SEGMENTS_DIR, f"{sid}.json")
-        try:
-            seg = _load_json(seg_path)
-        except FileNotFoundError:
-            continue
-        if seg.get("road_id") != road_id:
-            continue
-        changed = False
-        if seg.get("start_road_index", 0) >= insert_at:
-            seg["start_road_index"] += 1
-            changed = True
-        if seg.get("end_road_index", 0) >= insert_at:
-            seg["end_road_index"] += 1
-            changed = True
-        if changed:
-            # Rename segment file to reflect new indices
-            new_seg_id = RoadSegment(
-                road_id=road_id,
-                start_road_index=seg["start_road_index"],
-                end_road_index=seg["end_road_index"],
-            ).id
-            os.replace(
-                seg_path, os.path.join(ROAD_SEGMENTS_DIR, f"{new_seg_id}.json")
-            )
-            # Update routes that referenced old segment id
-            for rid in _list_db_ids(ROUTES_DIR):
-                route_path = os.path.join(ROUTES_DIR, f"{rid}.json")
-                try:
-                    rdata = _load_json(route_path)
-                    seg_list = rdata.get("road_segment_id_list", [])
-                    if sid in seg_list:
-                        seg_list[seg_list.index(sid)] = new_seg_id
-                        rdata["road_segment_id_list"] = seg_list
-                        _save_json(route_path, rdata)
-                except (FileNotFoundError, KeyError):
-                    continue
-            _save_json(
-                os.path.join(ROAD_SEGMENTS_DIR, f"{new_seg_id}.json"), seg
-            )
-
-    # 6. Prompt for new halt
-    road_data = _load_json(os.path.join(ROADS_DIR, f"{road_id}.json"))
-    road_name = road_data.get("name", road_id)
+    # 4. Prompt for new halt. Halts before insert_at keep their index, so
+    # the new halt can be validated before anything is shifted.
+    road_name = db.roads[road_id].name
     halt_name = Prompt.ask(f"  New halt name at index {insert_at}").strip()
     latlng = _geocode(
         halt_name, road_name, road_id=road_id, road_index=insert_at
@@ -966,15 +654,11 @@ def _insert_halt() -> None:
         name=halt_name,
         latlng=latlng,
     )
-    _save_json(
-        os.path.join(HALTS_DIR, f"{halt.id}.json"),
-        {
-            "road_id": road_id,
-            "road_index": insert_at,
-            "name": halt_name,
-            "latlng": {"lat": latlng.lat, "lng": latlng.lng},
-        },
-    )
+
+    # 5. Shift halts and road segments with road_index >= insert_at, update
+    # routes that referenced a renamed segment, and save the new halt, all
+    # in one transaction
+    db.insert_halt(halt)
     console.print(
         Panel(
             f"[bold green]Inserted halt [cyan]{halt_name}[/cyan] at index {insert_at} on {road_id}.[/bold green]",
@@ -984,56 +668,115 @@ def _insert_halt() -> None:
 
 
 # ---------------------------------------------------------------------------
-# Validate DB
+# Batch import halts from CSV or GeoJSON
 # ---------------------------------------------------------------------------
 
 
-def _validate_db() -> None:
-    """Check road index continuity and route ordering for all roads/routes."""
-    console.print(Panel("[bold]Validate DB[/bold]", expand=False))
-    ok = True
+def _import_halts(path: str | None = None, dry_run: bool = False) -> bool:
+    """Import roads and their ordered halts from a file (see HaltImport).
 
-    # ------------------------------------------------------------------
-    # 1. Road index continuity: road with N halts must have indices 0..N-1
-    # ------------------------------------------------------------------
-    console.print("\n[bold cyan]1. Road index continuity[/bold cyan]")
-    all_halt_ids = _list_db_ids(HALTS_DIR)
+    Every row is validated first, against the DB and the rest of the file;
+    nothing is written unless all of them pass. Returns True if they did.
+    """
+    console.print(Panel("[bold]Batch Import Halts[/bold]", expand=False))
+    if path is None:
+        path = Prompt.ask(
+            "CSV or GeoJSON file (road_name, direction, halt_name, lat, lng)"
+        ).strip()
+    try:
+        rows, n_roads, n_halts = HaltImport(_get_db()).run(path, dry_run)
+    except (OSError, ValueError) as e:
+        console.print(f"[red]{e}[/red]")
+        return False
 
-    # Group halts by road_id
-    road_to_halts: dict[str, list[tuple[int, str]]] = {}
-    for hid in all_halt_ids:
-        try:
-            hdata = _load_json(os.path.join(HALTS_DIR, f"{hid}.json"))
-            rid = hdata.get("road_id", "")
-            ridx = hdata.get("road_index", -1)
-            road_to_halts.setdefault(rid, []).append((ridx, hid))
-        except (FileNotFoundError, KeyError):
-            continue
+    failed = [row for row in rows if not row.ok]
+    for row in failed:
+        console.print(
+            f"  [red][bold]{row.row}[/bold] {row.halt_name or '?'} — "
+            + "; ".join(row.errors)
+            + "[/red]"
+        )
+    if failed:
+        console.print(
+            Panel(
+                f"[bold red]{len(failed)} of {len(rows)} row(s) invalid — "
+                "nothing written.[/bold red]",
+                expand=False,
+            )
+        )
+        return False
+    if dry_run:
+        console.print(
+            Panel(
+                f"[bold green]All {len(rows)} row(s) valid (dry run).[/bold green]",
+                expand=False,
+            )
+        )
+        return True
+    console.print(
+        Panel(
+            f"[bold green]Imported {n_halts} halt(s), "
+            f"{n_roads} new road(s).[/bold green]",
+            expand=False,
+        )
+    )
+    return True
 
-    for rid, entries in sorted(road_to_halts.items()):
-        indices = sorted(e[0] for e in entries)
-        n = len(indices)
-        expected = list(range(n))
-        if indices != expected:
-            ok = False
-            missing = sorted(set(expected) - set(indices))
-            extra = sorted(set(indices) - set(expected))
-            parts = []
-            if missing:
-                parts.append(f"missing indices {missing}")
-            if extra:
-                parts.append(f"unexpected indices {extra}")
+
+# ---------------------------------------------------------------------------
+# Validate DB
+# ---------------------------------------------------------------------------
+
+
+def _validate_db(
+    full: bool = False,
+    report_path: str | None = None,
+    workers: int | None = None,
+) -> bool:
+    """Validate roads, road segments and routes. Returns True if all pass.
+
+    Only units whose inputs changed since the last run are re-checked,
+    unless full; the rest report their cached verdicts. If report_path is
+    given, a JSON report is also written there.
+    """
+    console.print(Panel("[bold]Validate DB[/bold]", expand=False))
+    results = Validator(
+        _get_db(), cache_path=Validator.cache_path_for(_db_path)
+    ).run(full=full, workers=workers)
+    if report_path is not None:
+        with open(report_path, "w") as f:
+            json.dump(Validator.report(results), f, indent=2)
+
+    _SECTIONS = {
+        "roads": "1. Roads: index continuity and halt spacing",
+        "road_segments": "2. Road segments: halt ranges",
+        "routes": "3. Routes: segment continuity",
+    }
+    for kind, title in _SECTIONS.items():
+        console.print(f"\n[bold cyan]{title}[/bold cyan]")
+        kind_results = [r for r in results if r.kind == kind]
+        for r in kind_results:
+            cached = " [dim](cached)[/dim]" if r.cached else ""
+            if r.ok:
+                if kind == "roads":
+                    console.print(f"  [green]✓[/green] {r.unit_id}{cached}")
+                continue
             console.print(
-                f"  [red][bold]{rid}[/bold] — " + "; ".join(parts) + "[/red]"
+                f"  [red][bold]{r.unit_id}[/bold] — "
+                + "; ".join(r.errors)
+                + f"[/red]{cached}"
             )
-        else:
-            console.print(f"  [green]✓[/green] {rid} ({n} halt(s))")
+        n_ok = sum(r.ok for r in kind_results)
+        console.print(f"  {n_ok}/{len(kind_results)} passed")
 
-    # ------------------------------------------------------------------
     # ------------------------------------------------------------------
     # Summary
     # ------------------------------------------------------------------
-    console.print()
+    n_cached = sum(r.cached for r in results)
+    console.print(
+        f"\n[dim]{len(results) - n_cached} checked, {n_cached} cached.[/dim]"
+    )
+    ok = all(r.ok for r in results)
     if ok:
         console.print(
             Panel("[bold green]All checks passed.[/bold green]", expand=False)
@@ -1045,10 +788,68 @@ def _validate_db() -> None:
                 expand=False,
             )
         )
+    return ok
 
 
 def main() -> None:
-    _ensure_dirs()
+    global _db_path, _offline
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--db",
+        default=_DB_DIR,
+        help="db/ directory, or SQLite file (.sqlite/.sqlite3/.db)",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Render basemaps from the local tile cache only",
+    )
+    parser.add_argument(
+        "--validate",
+        action="store_true",
+        help="Validate the DB and exit (non-zero status on anomalies)",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="With --validate, re-check everything, ignoring the cache",
+    )
+    parser.add_argument(
+        "--report",
+        metavar="PATH",
+        help="With --validate, also write a JSON report to PATH",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="With --validate, processes to check with (default: CPUs)",
+    )
+    parser.add_argument(
+        "--import",
+        dest="import_path",
+        metavar="PATH",
+        help="Import halts from a CSV or GeoJSON file and exit "
+        "(non-zero status if any row is invalid)",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="With --import, validate only",
+    )
+    args = parser.parse_args()
+    _db_path, _offline = args.db, args.offline
+
+    if args.import_path is not None:
+        ok = _import_halts(args.import_path, dry_run=args.dry_run)
+        raise SystemExit(0 if ok else 1)
+
+    if args.validate:
+        ok = _validate_db(
+            full=args.full, report_path=args.report, workers=args.workers
+        )
+        raise SystemExit(0 if ok else 1)
+
+    _get_db()
     console.print(
         Panel("[bold blue]Bus Route Data Entry[/bold blue]", expand=False)
     )
@@ -1058,6 +859,7 @@ def main() -> None:
         "A": ("Add Segments to Route", _add_segments_to_route),
         "H": ("Update Halt LatLng", _update_halt_latlng),
         "I": ("Insert Halt at Index", _insert_halt),
+        "B": ("Batch Import Halts", _import_halts),
         "M": ("Render Route Map", _render_route_map),
         "V": ("Validate DB", _validate_db),
         "Q": ("Quit", None),
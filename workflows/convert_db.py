@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""Convert the DB between the db/ JSON tree and an SQLite file.
+
+Each side is a db/ directory, or an SQLite file (.sqlite/.sqlite3/.db).
+The destination ends up holding exactly the source's entities.
+
+    python workflows/convert_db.py db bus.sqlite     # import into SQLite
+    python workflows/convert_db.py bus.sqlite db     # export to JSON tree
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from bus.db.BusDB import BusDB
+from bus.db.SQLiteStore import SQLiteStore
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("src")
+    parser.add_argument("dst")
+    args = parser.parse_args()
+
+    n_copied = SQLiteStore.copy(
+        BusDB.open_store(args.src), BusDB.open_store(args.dst)
+    )
+    print(f"{args.src} → {args.dst}: {n_copied} entities.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Export the db/ JSON tree as a GTFS feed (see GTFSExport).
+
+Rows are streamed from the entity files to the .txt files, so memory
+does not grow with the DB. For an SQLite DB, convert it to a db/ tree
+first with convert_db.py.
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from bus.gtfs.GTFSExport import GTFSExport
+
+_DB_DIR = os.path.join(os.path.dirname(__file__), "..", "db")
+_GTFS_DIR = os.path.join(os.path.dirname(__file__), "..", "gtfs")
+
+
+def _gtfs_date(value: str) -> str:
+    datetime.strptime(value, GTFSExport.DATE_FORMAT)
+    return value
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--db-dir", default=_DB_DIR)
+    parser.add_argument("--out-dir", default=_GTFS_DIR)
+    parser.add_argument("--agency-name", default="Bus")
+    parser.add_argument(
+        "--agency-url", default="https://github.com/nuuuwan/bus_py"
+    )
+    parser.add_argument("--agency-timezone", default="Asia/Colombo")
+    parser.add_argument(
+        "--start-date",
+        type=_gtfs_date,
+        help="first day of service, YYYYMMDD (default: today)",
+    )
+    parser.add_argument(
+        "--end-date",
+        type=_gtfs_date,
+        help=(
+            "last day of service, YYYYMMDD "
+            f"(default: {GTFSExport.SERVICE_DAYS} days after the start)"
+        ),
+    )
+    args = parser.parse_args()
+
+    t_start = time.perf_counter()
+    n_rows = GTFSExport(
+        args.db_dir,
+        agency_name=args.agency_name,
+        agency_url=args.agency_url,
+        agency_timezone=args.agency_timezone,
+        start_date=args.start_date,
+        end_date=args.end_date,
+    ).write(args.out_dir)
+    dt = time.perf_counter() - t_start
+    for file_name, n in n_rows.items():
+        print(f"  {file_name:<14} {n:>10,} row(s)")
+    print(
+        f"{os.path.relpath(args.out_dir)}: {sum(n_rows.values()):,} rows "
+        f"in {dt:.2f} s"
+    )
+
+
+if __name__ == "__main__":
+    main()
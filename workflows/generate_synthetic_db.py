@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Generate a synthetic DB (see SyntheticDB) into a db/ directory or an
+SQLite file (.sqlite/.sqlite3/.db), for benchmarks at scale.
+
+The target must not already hold a DB.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from bus.db.JSONStore import JSONStore
+from bus.db.Snapshot import Snapshot
+from bus.db.SQLiteStore import SQLiteStore
+from bus.sim.SyntheticDB import SyntheticDB
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path")
+    parser.add_argument("--n-roads", type=int, default=20)
+    parser.add_argument("--halts-per-road", type=int, default=41)
+    parser.add_argument("--halts-per-segment", type=int, default=5)
+    parser.add_argument("--n-routes", type=int, default=10)
+    parser.add_argument("--segments-per-route", type=int, default=8)
+    parser.add_argument("--halt-spacing-m", type=float, default=400.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--snapshot",
+        action="store_true",
+        help="also build snapshot.json (db/ directories only)",
+    )
+    args = parser.parse_args()
+
+    if os.path.exists(args.path) and (
+        SQLiteStore.is_sqlite_path(args.path)
+        or any(
+            os.listdir(os.path.join(args.path, kind))
+            for kind in JSONStore.KINDS
+            if os.path.isdir(os.path.join(args.path, kind))
+        )
+    ):
+        parser.error(f"{args.path} already holds a DB")
+
+    synthetic = SyntheticDB(
+        n_roads=args.n_roads,
+        halts_per_road=args.halts_per_road,
+        halts_per_segment=args.halts_per_segment,
+        n_routes=args.n_routes,
+        segments_per_route=args.segments_per_route,
+        halt_spacing_m=args.halt_spacing_m,
+        seed=args.seed,
+    )
+    t_start = time.perf_counter()
+    n_entities = synthetic.write(args.path)
+    dt = time.perf_counter() - t_start
+    print(
+        f"{args.path}: {synthetic.n_roads:,} road(s), "
+        f"{synthetic.n_halts:,} halt(s), "
+        f"{synthetic.n_road_segments:,} road segment(s), "
+        f"{synthetic.n_routes:,} route(s); "
+        f"{n_entities:,} entities in {dt:.1f} s"
+    )
+    if args.snapshot and not SQLiteStore.is_sqlite_path(args.path):
+        Snapshot.build(args.path)
+        print(f"{os.path.relpath(Snapshot.path(args.path))} built")
+
+
+if __name__ == "__main__":
+    main()
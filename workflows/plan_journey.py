@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Plan the fastest journey between two halts, with at most k transfers.
+
+The journey graph is precomputed into db/journey_graph.npz on first use
+(or with --build) and loaded from there afterwards, until the DB's files
+or the walk radius change.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from rich.console import Console
+from rich.table import Table
+
+from bus.db.BusDB import BusDB
+from bus.db.Snapshot import Snapshot
+from bus.plan.JourneyGraph import JourneyGraph
+from bus.plan.JourneyPlanner import JourneyPlanner
+
+console = Console()
+
+_DB_DIR = os.path.join(os.path.dirname(__file__), "..", "db")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("from_halt_id")
+    parser.add_argument("to_halt_id")
+    parser.add_argument("--max-transfers", type=int, default=2)
+    parser.add_argument(
+        "--walk-radius",
+        type=float,
+        default=400.0,
+        help="Walking transfer radius in metres",
+    )
+    parser.add_argument(
+        "--build", action="store_true", help="Rebuild the journey graph"
+    )
+    parser.add_argument("--db-dir", default=_DB_DIR)
+    args = parser.parse_args()
+
+    graph_path = JourneyGraph.path(args.db_dir)
+    fingerprint = Snapshot.fingerprint(args.db_dir)
+    graph = (
+        None
+        if args.build
+        else JourneyGraph.load(graph_path, fingerprint, args.walk_radius)
+    )
+    if graph is None:
+        t_start = time.perf_counter()
+        graph = JourneyGraph.build(
+            BusDB(args.db_dir),
+            walk_radius_m=args.walk_radius,
+            fingerprint=fingerprint,
+        )
+        graph.save(graph_path)
+        console.print(
+            f"[dim]Built {os.path.relpath(graph_path)}: "
+            f"{len(graph.stop_ids)} halt(s), {len(graph.route_ids)} route(s), "
+            f"in {(time.perf_counter() - t_start) * 1_000:.0f} ms.[/dim]"
+        )
+
+    for halt_id in (args.from_halt_id, args.to_halt_id):
+        if halt_id not in graph.stop_id_to_stop:
+            parser.error(f"unknown halt: {halt_id}")
+
+    t_start = time.perf_counter()
+    journey = JourneyPlanner(graph).plan(
+        args.from_halt_id, args.to_halt_id, max_transfers=args.max_transfers
+    )
+    dt = time.perf_counter() - t_start
+    if journey is None:
+        console.print(
+            f"[yellow]No journey within {args.max_transfers} "
+            f"transfer(s).[/yellow] [dim]({dt * 1_000:.1f} ms)[/dim]"
+        )
+        raise SystemExit(1)
+
+    table = Table(show_header=True, header_style="bold cyan")
+    table.add_column("Mode")
+    table.add_column("Route")
+    table.add_column("From")
+    table.add_column("To")
+    table.add_column("Distance", justify="right")
+    table.add_column("Time", justify="right")
+    for leg in journey.legs:
+        table.add_row(
+            leg.mode,
+            leg.route_id or "",
+            leg.from_halt_id,
+            leg.to_halt_id,
+            f"{leg.distance_m:.0f} m",
+            f"{leg.duration_s / 60:.1f} min",
+        )
+    console.print(table)
+    console.print(
+        f"[bold]{journey.duration_s / 60:.1f} min[/bold], "
+        f"{journey.distance_m / 1_000:.1f} km, "
+        f"{journey.n_transfers} transfer(s) "
+        f"[dim](planned in {dt * 1_000:.1f} ms)[/dim]"
+    )
+
+
+if __name__ == "__main__":
+    main()
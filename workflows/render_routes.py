@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Render route maps headlessly (Agg) across a process pool.
+
+Routes whose route, segments and halts are unchanged since their last
+render, over tiles from the same source, are skipped by comparing
+content hashes kept in a manifest. A route last rendered without any
+tiles is rendered again.
+
+Workers share the tile cache but never evict from it; the parent
+process evicts once the pool is done.
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from bus.db.BusDB import BusDB
+from bus.render.RouteMap import RouteMap
+from utils_future.TileCache import TileCache
+
+_DB_DIR = os.path.join(os.path.dirname(__file__), "..", "db")
+_TILE_CACHE_DIR = os.path.join(os.path.dirname(__file__), "..", ".tile_cache")
+_ROUTE_IMAGES_DIR = os.path.join(
+    os.path.dirname(__file__), "..", "images", "routes"
+)
+_MANIFEST_PATH = os.path.join(_ROUTE_IMAGES_DIR, "manifest.json")
+
+# Per-worker state, set once by _init_worker.
+_db: BusDB | None = None
+_tile_cache: TileCache | None = None
+
+
+def _init_worker(db_dir: str, tile_cache_dir: str, offline: bool) -> None:
+    global _db, _tile_cache
+    import matplotlib
+
+    matplotlib.use("Agg")
+    _db = BusDB(db_dir)
+    # No eviction here, so no worker deletes a tile another is reading.
+    _tile_cache = TileCache(tile_cache_dir, max_bytes=None, offline=offline)
+
+
+def _render(route_id: str, img_path: str) -> tuple[str, int]:
+    n_tiles = RouteMap(_db.routes[route_id], _db.resolve_route(route_id)).save(
+        img_path, _tile_cache
+    )
+    return route_id, n_tiles
+
+
+def _load_manifest() -> dict[str, str]:
+    if not os.path.exists(_MANIFEST_PATH):
+        return {}
+    with open(_MANIFEST_PATH) as f:
+        return json.load(f)
+
+
+def _save_manifest(manifest: dict[str, str]) -> None:
+    os.makedirs(_ROUTE_IMAGES_DIR, exist_ok=True)
+    with open(_MANIFEST_PATH, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "route_ids", nargs="*", help="Routes to render (default: all)"
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument(
+        "--force", action="store_true", help="Re-render unchanged routes"
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Render basemaps from the local tile cache only",
+    )
+    args = parser.parse_args()
+
+    db = BusDB(_DB_DIR)
+    route_ids = args.route_ids or sorted(db.routes)
+    unknown = [rid for rid in route_ids if rid not in db.routes]
+    if unknown:
+        parser.error(f"unknown route(s): {', '.join(unknown)}")
+
+    basemap_source = TileCache(_TILE_CACHE_DIR).source
+    manifest = _load_manifest()
+    todo: dict[str, RouteMap] = {}
+    for route_id in route_ids:
+        resolved = db.resolve_route(route_id)
+        if not resolved.halts:
+            print(f"  {route_id}: no halts, skipped")
+            continue
+        # What the manifest holds after a render that drew tiles.
+        route_map = RouteMap(db.routes[route_id], resolved)
+        content_hash = route_map.content_hash(basemap_source, has_tiles=True)
+        img_path = os.path.join(_ROUTE_IMAGES_DIR, f"{route_id}.png")
+        if (
+            not args.force
+            and manifest.get(route_id) == content_hash
+            and os.path.exists(img_path)
+        ):
+            print(f"  {route_id}: unchanged, skipped")
+            continue
+        todo[route_id] = route_map
+
+    if todo:
+        with ProcessPoolExecutor(
+            max_workers=args.workers,
+            initializer=_init_worker,
+            initargs=(_DB_DIR, _TILE_CACHE_DIR, args.offline),
+        ) as executor:
+            futures = [
+                executor.submit(
+                    _render,
+                    route_id,
+                    os.path.join(_ROUTE_IMAGES_DIR, f"{route_id}.png"),
+                )
+                for route_id in todo
+            ]
+            try:
+                for future in futures:
+                    route_id, n_tiles = future.result()
+                    manifest[route_id] = todo[route_id].content_hash(
+                        basemap_source, has_tiles=n_tiles > 0
+                    )
+                    print(f"  {route_id}: rendered ({n_tiles} tile(s))")
+            finally:
+                # Keep the hashes of routes that did render.
+                _save_manifest(manifest)
+        if not args.offline:
+            TileCache(_TILE_CACHE_DIR).evict()
+
+    print(f"{len(todo)} rendered, {len(route_ids) - len(todo)} skipped.")
+
+
+if __name__ == "__main__":
+    main()
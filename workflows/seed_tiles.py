@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Pre-seed the basemap tile cache over the bounding box of all halts."""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from bus.db.BusDB import BusDB
+from utils_future.TileCache import TileCache
+
+_DB_DIR = os.path.join(os.path.dirname(__file__), "..", "db")
+_TILE_CACHE_DIR = os.path.join(os.path.dirname(__file__), "..", ".tile_cache")
+
+# Padding around the halts' bounding box, in degrees (~500 m).
+BBOX_MARGIN_DEG = 0.005
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--zooms", type=int, nargs="+", default=[12, 13, 14, 15, 16]
+    )
+    parser.add_argument("--url", default=TileCache.OSM_MAPNIK_URL)
+    parser.add_argument("--provider", default="osm-mapnik")
+    parser.add_argument("--max-mb", type=float, default=500)
+    parser.add_argument("--cache-dir", default=_TILE_CACHE_DIR)
+    args = parser.parse_args()
+
+    db = BusDB(_DB_DIR)
+    if not db.halts:
+        print("No halts in DB.")
+        return
+    lats = [halt.latlng.lat for halt in db.halts.values()]
+    lngs = [halt.latlng.lng for halt in db.halts.values()]
+
+    tile_cache = TileCache(
+        args.cache_dir,
+        provider=args.provider,
+        url_template=args.url,
+        max_bytes=int(args.max_mb * 1_000_000),
+    )
+    n_tiles, n_fetched = tile_cache.seed(
+        min(lats) - BBOX_MARGIN_DEG,
+        min(lngs) - BBOX_MARGIN_DEG,
+        max(lats) + BBOX_MARGIN_DEG,
+        max(lngs) + BBOX_MARGIN_DEG,
+        args.zooms,
+    )
+    n_missing = sum(
+        not tile_cache.has(zoom, x, y)
+        for zoom in args.zooms
+        for x, y in TileCache.tiles_for_bbox(
+            min(lats) - BBOX_MARGIN_DEG,
+            min(lngs) - BBOX_MARGIN_DEG,
+            max(lats) + BBOX_MARGIN_DEG,
+            max(lngs) + BBOX_MARGIN_DEG,
+            zoom,
+        )
+    )
+    # Also applies --max-mb to a cache seeded with a larger limit.
+    tile_cache.evict()
+    print(
+        f"{n_tiles} tile(s) at zoom {args.zooms}: {n_fetched} fetched, "
+        f"{n_missing} missing, {tile_cache.total_bytes / 1_000_000:.1f} MB "
+        "cached."
+    )
+
+
+if __name__ == "__main__":
+    main()